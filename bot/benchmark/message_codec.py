@@ -0,0 +1,202 @@
+"""Measures encode and parse throughput of every websocket message type.
+
+Run from the bot directory with ``python -m benchmark.message_codec``. Install ``orjson`` or
+``ujson`` to compare JSON encoders, the one in use is printed first.
+
+``--parse-only`` times client message parsing alone, against a copy of the generic parse path
+that predates the compiled validators. The copy only relies on ``VALID_MESSAGES``, so the same
+file can be dropped into an older tree to compare both parsers there as well.
+"""
+import argparse
+import discord
+import functools
+import json
+import timeit
+from typing import Callable, Dict, List, Optional, Tuple
+
+import uita.audio
+import uita.auth
+import uita.exceptions
+import uita.message
+import uita.types
+
+
+def sample_messages() -> List[uita.message.AbstractMessage]:
+    """Builds one message of every type, with queues and channel lists of a realistic size."""
+    user = uita.types.DiscordUser("1" * 18, "User Name", "http://example.com/avatar.png", None)
+    session = uita.auth.Session(handle="1" * 18, secret="b" * 64)
+    channels = [
+        uita.types.DiscordChannel(
+            str(i) * 18, f"Channel {i}", discord.ChannelType.voice, None, i
+        )
+        for i in range(20)
+    ]
+    servers = [
+        uita.types.DiscordServer(str(i) * 18, f"Server {i}", {}, {}, None) for i in range(10)
+    ]
+    tracks = [
+        uita.audio.Track(
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ", user, f"Track Title {i}", 212.0,
+            False, False
+        )
+        for i in range(100)
+    ]
+    samples: List[uita.message.AbstractMessage] = [
+        uita.message.AuthCodeMessage("c" * 30),
+        uita.message.AuthSessionMessage(session.handle, session.secret),
+        uita.message.AuthSucceedMessage(user, session),
+        uita.message.ChannelActiveSendMessage(channels[0]),
+        uita.message.ChannelJoinMessage(channels[0].id),
+        uita.message.ChannelListSendMessage(channels),
+        uita.message.ErrorFileInvalidMessage("Uploaded file exceeds maximum size"),
+        uita.message.FileUploadStartMessage(5000000),
+        uita.message.PlayQueueInsertSendMessage(1, 0, tracks[:10]),
+        uita.message.PlayQueueMoveMessage(tracks[0].id, 5),
+        uita.message.PlayQueueMoveSendMessage(2, tracks[0].id, 5),
+        uita.message.PlayQueuePlaySendMessage(3, tracks[0]),
+        uita.message.PlayQueueRemoveMessage(tracks[0].id),
+        uita.message.PlayQueueRemoveSendMessage(4, tracks[0].id),
+        uita.message.PlayQueueSendMessage(tracks, 5),
+        uita.message.PlayStatusSendMessage(uita.audio.Status.PLAYING),
+        uita.message.PlayURLMessage("https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+        uita.message.ServerJoinMessage(servers[0].id),
+        uita.message.ServerListSendMessage(servers),
+        uita.message.ServerStateSendMessage(
+            channels, channels[0], tracks, 5, uita.audio.Status.PLAYING
+        )
+    ]
+    # Messages without properties
+    for message_type, properties in uita.message.VALID_MESSAGES.values():
+        if len(properties) == 0:
+            samples.append(message_type())
+    return sorted(samples, key=lambda m: m.header)
+
+
+def ops_per_second(function: Callable[[], object], seconds: float) -> float:
+    """Runs a function repeatedly for roughly the given duration."""
+    timer = timeit.Timer(function)
+    number, elapsed = timer.autorange()
+    repeats = max(1, int(seconds / elapsed))
+    return number * repeats / timer.timeit(number * repeats)
+
+
+def try_parse(data: object) -> Optional[uita.message.AbstractMessage]:
+    """Server sent messages don't parse back into messages, these are skipped."""
+    try:
+        return uita.message.parse(data)  # type: ignore
+    except Exception:
+        return None
+
+
+def legacy_parse(message: str) -> uita.message.AbstractMessage:
+    """JSON parse path used before validators were compiled per header.
+
+    Checks that required properties are present and passes the decoded object straight to the
+    message constructor.
+    """
+    if len(message) > uita.message.MAX_CLIENT_MESSAGE_LENGTH:
+        raise uita.exceptions.MalformedMessage("Message exceeded maximum length")
+    try:
+        msg = json.loads(message, parse_int=str, parse_float=str)
+    except (json.JSONDecodeError, TypeError):
+        raise uita.exceptions.MalformedMessage("Expected JSON encoded object")
+    if "header" not in msg or not isinstance(msg["header"], str) or not len(msg["header"]):
+        raise uita.exceptions.MalformedMessage("Has no header property")
+    if len(msg["header"]) > uita.message.MAX_HEADER_LENGTH:
+        raise uita.exceptions.MalformedMessage("Header exceeds maximum length")
+    try:
+        header = msg["header"]
+        for prop in uita.message.VALID_MESSAGES[header][1]:
+            if prop not in msg:
+                raise uita.exceptions.MalformedMessage(f"Missing {prop} property")
+        del msg["header"]
+        return uita.message.VALID_MESSAGES[header][0](**msg)  # type: ignore
+    except KeyError:
+        raise uita.exceptions.MalformedMessage("Invalid header")
+
+
+def parse_frames() -> List[Tuple[str, str]]:
+    """Builds JSON frames of every message a client can send, followed by malformed frames."""
+    frames = [
+        (message.header, uita.message.encode(message))
+        for message in sample_messages() if try_parse(uita.message.encode(message)) is not None
+    ]
+    body = "a" * 3000
+    frames.append(("(unknown header)", f'{{"header":"bad.header","body":"{body}"}}'))
+    frames.append(("(missing property)", f'{{"header":"play.url","body":"{body}"}}'))
+    return [(name, frame) for name, frame in frames if isinstance(frame, str)]
+
+
+def ignore_malformed(
+    parse: Callable[[str], uita.message.AbstractMessage]
+) -> Callable[[str], Optional[uita.message.AbstractMessage]]:
+    """Lets malformed frames be timed, rejecting them is part of the work being measured."""
+    def wrapper(frame: str) -> Optional[uita.message.AbstractMessage]:
+        try:
+            return parse(frame)
+        except uita.exceptions.MalformedMessage:
+            return None
+    return wrapper
+
+
+def main_parse(seconds: float) -> None:
+    parsers = {
+        "legacy parse": ignore_malformed(legacy_parse),
+        "parse": ignore_malformed(uita.message.parse)
+    }
+    print(f"{'header':<28}{'json size':>11}" + "".join(f"{c:>16}" for c in parsers))
+    for name, frame in parse_frames():
+        results = [
+            ops_per_second(functools.partial(parse, frame), seconds) for parse in parsers.values()
+        ]
+        print(f"{name:<28}{len(frame):>11}" + "".join(f"{r:>14,.0f}/s" for r in results))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "-s", "--seconds", type=float, default=0.2, help="time spent on each measurement"
+    )
+    parser.add_argument(
+        "--parse-only", action="store_true", help="compare client message parsing only"
+    )
+    args = parser.parse_args()
+
+    if args.parse_only:
+        main_parse(args.seconds)
+        return
+    print(f"JSON encoder: {uita.message._json_encoder}")
+    columns = ["json encode", "msgpack encode", "json parse", "msgpack parse"]
+    print(
+        f"{'header':<28}{'json size':>11}{'msgpack size':>14}" +
+        "".join(f"{c:>16}" for c in columns)
+    )
+    for message in sample_messages():
+        json_frame = uita.message.encode(message)
+        msgpack_frame = uita.message.encode(message, uita.message.MSGPACK_SUBPROTOCOL)
+        results: Dict[str, Optional[float]] = {
+            "json encode": ops_per_second(lambda: uita.message.encode(message), args.seconds),
+            "msgpack encode": ops_per_second(
+                lambda: uita.message.encode(message, uita.message.MSGPACK_SUBPROTOCOL),
+                args.seconds
+            ),
+            "json parse": None,
+            "msgpack parse": None
+        }
+        if try_parse(json_frame) is not None:
+            results["json parse"] = ops_per_second(
+                lambda: uita.message.parse(json_frame), args.seconds
+            )
+            results["msgpack parse"] = ops_per_second(
+                lambda: uita.message.parse(msgpack_frame), args.seconds
+            )
+        print(
+            f"{message.header:<28}{len(json_frame):>11}{len(msgpack_frame):>14}" + "".join(
+                f"{results[c]:>14,.0f}/s" if results[c] is not None else f"{'-':>16}"
+                for c in columns
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
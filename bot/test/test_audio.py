@@ -4,7 +4,9 @@ from unittest.mock import Mock
 import asyncio
 from pathlib import Path
 import math
+import random
 import shutil
+import time
 
 import uita.audio
 import uita.types
@@ -39,6 +41,64 @@ def test_track_unique_ids():
     assert a.id != b.id
 
 
+def test_track_list():
+    tracks = [uita.audio.Track(str(i), None, str(i), 0.0, False, True) for i in range(200)]
+    track_list = uita.audio.TrackList(tracks[:100])
+    expected = tracks[:100]
+    assert list(track_list) == expected
+
+    # Compare against a plain list through a random mix of operations
+    rng = random.Random(0)
+    for track in tracks[100:]:
+        index = rng.randrange(len(expected) + 1)
+        track_list.insert(index, track)
+        expected.insert(index, track)
+        moved = rng.choice(expected)
+        assert track_list.remove(moved.id) is moved
+        expected.remove(moved)
+        index = rng.randrange(len(expected) + 1)
+        track_list.insert(index, moved)
+        expected.insert(index, moved)
+    assert list(track_list) == expected
+    assert len(track_list) == len(expected)
+    for index, track in enumerate(expected):
+        assert track_list[index] is track
+        assert track_list.index(track.id) == index
+        assert track.id in track_list
+    assert track_list[-1] is expected[-1]
+
+    assert track_list.popleft() is expected[0]
+    assert track_list.get(expected[0].id) is None
+    assert track_list.remove(expected[0].id) is None
+    with pytest.raises(ValueError):
+        track_list.index(expected[0].id)
+    with pytest.raises(ValueError):
+        track_list.append(expected[1])
+    with pytest.raises(IndexError):
+        track_list[len(track_list)]
+
+
+def test_frame_buffer():
+    buffer = uita.audio.FrameBuffer(4, 2)
+
+    assert buffer.put(b"abcd", timeout=0)
+    assert buffer.put(b"ef", timeout=0)
+    # Buffer is full until the consumer is done with a frame
+    assert not buffer.put(b"gh", timeout=0)
+
+    assert bytes(buffer.get(timeout=0.1)) == b"abcd"
+    # Previous frame is still held by the consumer
+    assert buffer.reserve(timeout=0) is None
+    assert bytes(buffer.get(timeout=0.1)) == b"ef"
+
+    slot = buffer.reserve(timeout=0)
+    assert slot is not None and len(slot) == 4
+    slot[:3] = b"ijk"
+    buffer.commit(3)
+    assert bytes(buffer.get(timeout=0.1)) == b"ijk"
+    assert buffer.get(timeout=0.01) is None
+
+
 @pytest.mark.asyncio
 async def test_enqueue_file(init_queue):
     queue, mock_queue_change, mock_status_change = await init_queue("1")
@@ -52,6 +112,7 @@ async def test_enqueue_file(init_queue):
     assert math.isclose(track.duration, 5.0)
     assert not track.live
     assert track.local
+    assert track.codec == "flac"
 
 
 @pytest.mark.asyncio
@@ -73,6 +134,262 @@ async def test_play(init_queue):
     await queue.stop()
 
 
+@pytest.mark.asyncio
+async def test_opus_passthrough(init_queue):
+    queue, _, _ = await init_queue("1")
+    track = queue.queue()[0]
+    encoder = Mock(CHANNELS=2, SAMPLING_RATE=48000, FRAME_SIZE=3840)
+
+    # Non-Opus sources are always transcoded
+    stream = uita.audio.FfmpegStream(track, encoder, opus_passthrough=True)
+    assert not stream.is_opus()
+    stream.stop()
+
+    track.codec = "opus"
+    stream = uita.audio.FfmpegStream(track, encoder, opus_passthrough=False)
+    assert not stream.is_opus()
+    stream.stop()
+
+    stream = uita.audio.FfmpegStream(track, encoder, opus_passthrough=True)
+    assert stream.is_opus()
+    stream.stop()
+
+
+def test_ogg_packet_parser():
+    def page(*segments):
+        header = b"OggS" + bytes(22) + bytes([len(segments)]) + bytes(map(len, segments))
+        return header + b"".join(segments)
+
+    # Second packet spans two pages, split into maximum size segments
+    data = page(b"a" * 10, b"b" * 255) + page(b"b" * 5, b"c" * 255, b"")
+    parser = uita.audio.OggPacketParser()
+    # Pages can be fed in arbitrarily sized chunks
+    for i in range(0, len(data), 7):
+        parser.feed(data[i:i + 7])
+    assert parser.next_packet() == b"a" * 10
+    assert parser.next_packet() == b"b" * 260
+    assert parser.next_packet() == b"c" * 255
+    assert parser.next_packet() is None
+
+    with pytest.raises(ValueError):
+        parser.feed(b"NotAnOggPage" * 3)
+
+
+@pytest.mark.asyncio
+async def test_prefetch(init_queue):
+    queue, mock_queue_change, mock_status_change = await init_queue("1", "2", "3")
+    flag = asyncio.Event(loop=queue.loop)
+
+    def on_status_change(_): flag.set()
+    mock_status_change.side_effect = on_status_change
+    await queue.play(Mock(**{
+        "is_connected.return_value": True,
+        "encoder.FRAME_SIZE": 4096
+    }))
+    await flag.wait()
+    # Tracks are shorter than the prefetch window so the next track is buffered right away
+    await asyncio.sleep(0.1)
+    head = queue.queue()[1]
+    assert queue._prefetch is not None
+    assert queue._prefetch[0] is head
+
+    # Removing the queue head discards its stream and prefetches the new head
+    stream = queue._prefetch[1]
+    await queue.remove(head.id)
+    assert stream._is_stopped
+    assert queue._prefetch[0] is queue.queue()[1]
+
+    await queue.stop()
+    assert queue._prefetch is None
+
+
+@pytest.mark.asyncio
+async def test_enqueue_playlist(init_queue, user, monkeypatch):
+    queue, mock_queue_change, _ = await init_queue()
+    scraped_urls = []
+
+    async def scrape_stub(url, loop=None, stream=True):
+        scraped_urls.append(url)
+        if url == "playlist":
+            return {"extractor": "YoutubePlaylist", "_type": "playlist", "entries": [
+                {"id": "vid1", "title": "Video 1", "duration": 5},
+                {"id": "vid2", "title": None, "duration": None},
+                {"id": "vid3", "title": "Video 3", "duration": 5},
+                {"id": "removed", "title": None, "duration": None}
+            ]}
+        if url == uita.youtube_api.build_url("removed"):
+            raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
+        return {
+            "extractor": "Youtube", "id": "vid2", "title": "Video 2", "duration": 10,
+            "url": "https://r1.googlevideo.com/videoplayback?expire=1600000000", "acodec": "opus",
+            "abr": 160, "is_live": None
+        }
+    monkeypatch.setattr(uita.youtube_api, "scrape", scrape_stub)
+
+    await queue.enqueue_url("playlist", user)
+    # Only entries missing metadata are scraped at enqueue time
+    assert scraped_urls == [
+        "playlist",
+        uita.youtube_api.build_url("vid2"),
+        uita.youtube_api.build_url("removed")
+    ]
+    # Playlist order is kept and unavailable entries are skipped
+    tracks = queue.queue()
+    assert [t.title for t in tracks] == ["Video 1", "Video 2", "Video 3"]
+    # First entry is sent out right away, the rest are sent together once scraped
+    assert mock_queue_change.call_count == 2
+    assert tracks[0].path is None and tracks[0].duration == 5
+    assert tracks[0].url == uita.youtube_api.build_url("vid1")
+    assert tracks[1].expires == 1600000000
+
+
+@pytest.mark.asyncio
+async def test_resolve(init_queue, user, monkeypatch):
+    queue, _, mock_status_change = await init_queue("1")
+    path = queue.queue()[0].path
+    scraped_urls = []
+
+    async def scrape_stub(url, loop=None):
+        scraped_urls.append(url)
+        return {"url": path, "acodec": "flac"}
+    monkeypatch.setattr(uita.youtube_api, "scrape", scrape_stub)
+
+    # Queued tracks without a path are resolved once they are about to play
+    track = uita.audio.Track(None, user, "2", 1.0, live=False, local=False, url="2")
+    assert not track.is_resolved()
+    queue._queue.append(track)
+    # Expired paths are resolved again
+    expired = uita.audio.Track("3", user, "3", 1.0, False, False, url="3", expires=time.time())
+    assert not expired.is_resolved()
+    queue._queue.append(expired)
+    await queue._notify_queue_change()
+
+    flag = asyncio.Event(loop=queue.loop)
+
+    def on_status_change(_): flag.set()
+    mock_status_change.side_effect = on_status_change
+    await queue.play(Mock(**{
+        "is_connected.return_value": True,
+        "encoder.FRAME_SIZE": 4096
+    }))
+    await flag.wait()
+    # Tracks are shorter than the resolve window so the next track is resolved right away
+    await asyncio.sleep(0.1)
+    assert scraped_urls == ["2"]
+    assert track.path == path and track.is_resolved()
+
+    await queue.remove(track.id)
+    await asyncio.sleep(0.1)
+    assert scraped_urls == ["2", "3"]
+    assert expired.path == path and expired.expires is None
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_stop_resolve(init_queue, user, monkeypatch):
+    queue, _, _ = await init_queue()
+    scraping = asyncio.Event(loop=queue.loop)
+
+    async def scrape_stub(url, loop=None):
+        scraping.set()
+        await asyncio.sleep(60)
+    monkeypatch.setattr(uita.youtube_api, "scrape", scrape_stub)
+
+    track = uita.audio.Track(None, user, "2", 1.0, live=False, local=False, url="2")
+    queue._queue.append(track)
+    queue._resolve_armed = True
+    await queue._notify_queue_change()
+    await scraping.wait()
+    task = queue._resolve[1]
+
+    # Lookups running ahead of time are abandoned once the queue stops
+    await queue.stop()
+    assert queue._resolve is None
+    await asyncio.sleep(0)
+    assert task.cancelled()
+
+
+@pytest.mark.asyncio
+async def test_resolve_unlocked(init_queue, user, monkeypatch):
+    queue, _, mock_status_change = await init_queue("1")
+    path = queue.queue()[0].path
+    await queue.remove(queue.queue()[0].id)
+    scraping = asyncio.Event(loop=queue.loop)
+    scraped = asyncio.Event(loop=queue.loop)
+
+    async def scrape_stub(url, loop=None):
+        scraping.set()
+        await scraped.wait()
+        return {"url": path, "acodec": "flac"}
+    monkeypatch.setattr(uita.youtube_api, "scrape", scrape_stub)
+
+    track = uita.audio.Track(None, user, "2", 1.0, live=False, local=False, url="2")
+    other = uita.audio.Track(None, user, "3", 1.0, live=False, local=False, url="3")
+    queue._queue.append(track)
+    queue._queue.append(other)
+    await queue._notify_queue_change()
+    await queue.play(Mock(**{
+        "is_connected.return_value": True,
+        "encoder.FRAME_SIZE": 4096
+    }))
+    await scraping.wait()
+
+    # Queue stays editable while the stream of the next track is being resolved
+    await asyncio.wait_for(queue.remove(other.id), 1.0)
+    assert [t.id for t in queue.queue()] == [track.id]
+    await asyncio.wait_for(queue.remove(track.id), 1.0)
+    assert queue.queue() == []
+    # Removed track is skipped once it has been resolved
+    scraped.set()
+    await asyncio.sleep(0.1)
+    assert mock_status_change.call_count == 0
+    assert queue._now_playing is None and queue._stream is None
+    await queue.stop()
+
+
+@pytest.mark.asyncio
+async def test_queue_changes(init_queue):
+    queue, mock_queue_change, _ = await init_queue("1", "2", "3")
+    tracks = queue.queue()
+
+    def last_changes():
+        return [
+            (c.type, c.version, [t.id for t in c.tracks], c.position)
+            for c in mock_queue_change.call_args[0][1]
+        ]
+    assert queue.version == 3
+    assert last_changes() == [(uita.audio.QueueChangeType.INSERT, 3, [tracks[2].id], 2)]
+
+    await queue.move(tracks[2].id, 0)
+    assert last_changes() == [(uita.audio.QueueChangeType.MOVE, 4, [tracks[2].id], 0)]
+    await queue.remove(tracks[0].id)
+    assert last_changes() == [(uita.audio.QueueChangeType.REMOVE, 5, [tracks[0].id], 0)]
+    # Unknown tracks don't change anything
+    await queue.remove(tracks[0].id)
+    assert queue.version == 5
+    assert [t.id for t in queue.queue()] == [tracks[2].id, tracks[1].id]
+
+
+@pytest.mark.asyncio
+async def test_snapshot(init_queue):
+    queue, _, _ = await init_queue("1", "2")
+    snapshot = queue.snapshot()
+    assert queue.snapshot() is snapshot
+    assert snapshot.version == 2
+    assert [t.id for t in snapshot.to_list()] == [t.id for t in snapshot.tracks]
+
+    await queue.remove(snapshot.tracks[1].id)
+    assert queue.snapshot() is not snapshot
+    assert len(queue.snapshot()) == 1
+    assert len(snapshot) == 2
+
+    # Offset of the playing track is applied when it is read
+    playing = uita.audio.QueueSnapshot(0, snapshot.tracks, time.perf_counter() - 2.0)
+    assert playing.track(0).offset >= 2.0
+    assert playing.tracks[0].offset == 0.0
+    assert playing.track(1).offset == 0.0
+
+
 @pytest.mark.asyncio
 async def test_move(init_queue):
     queue, _, _ = await init_queue("1", "2")
@@ -24,6 +24,26 @@ async def test_verify_session_expired(config, database):
         await uita.auth.verify_session(uita.auth.Session("1", "2"), database, config)
 
 
+@pytest.mark.asyncio
+async def test_verify_session_unavailable(config, database):
+    session = database.add_session("token", 0)
+    with patch("uita.auth.uita.discord_api.get") as mock_get:
+        async def get(*args, **kwargs):
+            raise uita.exceptions.AuthenticationUnavailable("Rate limited")
+        mock_get.side_effect = get
+        with pytest.raises(uita.exceptions.AuthenticationUnavailable):
+            await uita.auth.verify_session(session, database, config)
+        # Session should survive the Discord API being unavailable
+        assert database.get_access_token(session) == "token"
+
+        async def get_invalid(*args, **kwargs):
+            raise uita.exceptions.AuthenticationError("Invalid token")
+        mock_get.side_effect = get_invalid
+        with pytest.raises(uita.exceptions.AuthenticationError):
+            await uita.auth.verify_session(session, database, config)
+        assert database.get_access_token(session) is None
+
+
 @pytest.mark.asyncio
 async def test_verify_code(config, database, data_dir):
     raw_response = json.load(data_dir / "discord-api-auth.json")
@@ -26,8 +26,10 @@ def test_server_role(database):
     assert database.get_server_role(server_id) is None
     database.set_server_role(server_id, role_id)
     assert database.get_server_role(server_id) == role_id
+    assert database.get_server_roles() == {server_id: role_id}
     database.set_server_role(server_id, None)
     assert database.get_server_role(server_id) is None
+    assert database.get_server_roles() == {}
 
 
 def test_persistence(tmp_path):
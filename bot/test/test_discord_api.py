@@ -1,29 +1,37 @@
 import pytest
-from unittest.mock import Mock, patch
+from unittest.mock import patch
 
+import asyncio
 import json
 
 import uita.discord_api
+import uita.http_client
 
 
 @pytest.mark.asyncio
 async def test_auth(data_dir, config, event_loop):
     code = "oauth2code"
     response_json = json.load(data_dir / "discord-api-auth.json")
-    with patch("uita.discord_api.requests.post") as mock_post:
+    with patch("uita.http_client.client.request") as mock_post:
         with pytest.raises(uita.exceptions.AuthenticationError):
             await uita.discord_api.auth("bad.code", config, event_loop)
 
+        async def forbidden(*args, **kwargs):
+            return uita.http_client.Response(403, None)
+        mock_post.side_effect = forbidden
         with pytest.raises(uita.exceptions.AuthenticationError):
-            mock_post.return_value.status_code = 403
             await uita.discord_api.auth(code, config, event_loop)
 
-        def data_check(url, data, headers):
+        async def unreachable(*args, **kwargs):
+            raise uita.exceptions.HTTPError("Connection refused")
+        mock_post.side_effect = unreachable
+        with pytest.raises(uita.exceptions.AuthenticationUnavailable):
+            await uita.discord_api.auth(code, config, event_loop)
+
+        async def data_check(method, url, headers=None, data=None, loop=None):
+            assert method == "POST"
             assert data["code"] == code
-            response = Mock()
-            response.status_code = 200
-            response.json.return_value = response_json
-            return response
+            return uita.http_client.Response(200, response_json)
         mock_post.side_effect = data_check
 
         auth_response = await uita.discord_api.auth(code, config, event_loop)
@@ -35,15 +43,11 @@ async def test_get(data_dir, event_loop):
     token = "goodtoken"
     end_point = "/user/@me"
     response_json = json.load(data_dir / "discord-api-user.json")
-    with patch("uita.discord_api.requests.get") as mock_get:
-        def data_check(url, headers):
-            response = Mock()
+    with patch("uita.http_client.client.request") as mock_get:
+        async def data_check(method, url, headers=None, data=None, loop=None):
             if headers["Authorization"] == f"Bearer {token}":
-                response.status_code = 200
-            else:
-                response.status_code = 403
-            response.json.return_value = response_json
-            return response
+                return uita.http_client.Response(200, response_json)
+            return uita.http_client.Response(403, response_json)
         mock_get.side_effect = data_check
 
         with pytest.raises(uita.exceptions.AuthenticationError):
@@ -53,6 +57,121 @@ async def test_get(data_dir, event_loop):
         assert get_response == response_json
 
 
+@pytest.mark.asyncio
+async def test_rate_limiter(event_loop):
+    rate_limiter = uita.discord_api.RateLimiter(retries=1, max_wait=1.0)
+    url = uita.discord_api.API_URL + "/users/@me"
+    headers = {"Authorization": "Bearer token"}
+    with patch("uita.http_client.client.request") as mock_request:
+        sent = []
+
+        async def limited(*args, **kwargs):
+            sent.append(event_loop.time())
+            if len(sent) == 1:
+                return uita.http_client.Response(429, {"retry_after": 50, "global": False})
+            return uita.http_client.Response(200, {}, {
+                "X-RateLimit-Limit": "1",
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset-After": "0.05"
+            })
+        mock_request.side_effect = limited
+
+        # Rate limited requests are retried after retry_after
+        response = await rate_limiter.request("GET", url, headers, loop=event_loop)
+        assert response.status == 200
+        assert sent[1] - sent[0] >= 0.05
+        # Requests wait for an exhausted bucket to reset
+        response = await rate_limiter.request("GET", url, headers, loop=event_loop)
+        assert response.status == 200
+        assert sent[2] - sent[1] >= 0.05
+        # Buckets are separate for each token
+        await rate_limiter.request("GET", url, {"Authorization": "Bearer other"}, loop=event_loop)
+        assert sent[3] - sent[2] < 0.05
+
+        async def global_limited(*args, **kwargs):
+            sent.append(event_loop.time())
+            return uita.http_client.Response(429, None, {
+                "Retry-After": "0.05",
+                "X-RateLimit-Global": "true"
+            })
+        mock_request.side_effect = global_limited
+        sent.clear()
+
+        # Requests give up once retries are exhausted
+        response = await rate_limiter.request("GET", url, headers, loop=event_loop)
+        assert response.status == 429
+        assert len(sent) == 2
+        assert sent[1] - sent[0] >= 0.05
+        # Requests give up without sending if rate limits outlast max_wait
+        rate_limiter.max_wait = 0.0
+        response = await rate_limiter.request("GET", url, {}, loop=event_loop)
+        assert response.status == 429
+        assert len(sent) == 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limiter_concurrent(event_loop):
+    rate_limiter = uita.discord_api.RateLimiter(retries=0, max_wait=1.0)
+    url = uita.discord_api.AUTH_URL
+    with patch("uita.http_client.client.request") as mock_request:
+        sent = []
+        in_flight = []
+
+        async def limited(*args, **kwargs):
+            sent.append(event_loop.time())
+            in_flight.append(len(in_flight) + 1)
+            await asyncio.sleep(0.01)
+            in_flight.pop()
+            return uita.http_client.Response(200, {}, {
+                "X-RateLimit-Limit": "1",
+                "X-RateLimit-Remaining": "0",
+                "X-RateLimit-Reset-After": "0.05"
+            })
+        mock_request.side_effect = limited
+
+        # Requests to a route without known limits wait for the first response, and then for
+        # each window to be reported instead of all going out once a window expires
+        responses = await asyncio.gather(*[
+            rate_limiter.request("POST", url, {}, loop=event_loop) for _ in range(4)
+        ], loop=event_loop)
+        assert [r.status for r in responses] == [200] * 4
+        assert len(sent) == 4
+        assert all(b - a >= 0.05 for a, b in zip(sent, sent[1:]))
+
+        async def unlimited(*args, **kwargs):
+            sent.append(event_loop.time())
+            in_flight.append(len(in_flight) + 1)
+            await asyncio.sleep(0.01)
+            assert len(in_flight) == 1
+            in_flight.pop()
+            return uita.http_client.Response(200, {})
+        mock_request.side_effect = unlimited
+        sent.clear()
+
+        # Routes that never report limits only have one request in flight at a time
+        await asyncio.gather(*[
+            rate_limiter.request("POST", url + "/other", {}, loop=event_loop) for _ in range(3)
+        ], loop=event_loop)
+        assert len(sent) == 3
+
+
+@pytest.mark.asyncio
+async def test_get_unavailable(event_loop):
+    with patch("uita.http_client.client.request") as mock_get:
+        async def overloaded(*args, **kwargs):
+            return uita.http_client.Response(503, None)
+        mock_get.side_effect = overloaded
+        with pytest.raises(uita.exceptions.AuthenticationUnavailable):
+            await uita.discord_api.get("/users/@me", "token", event_loop)
+
+        async def limited(*args, **kwargs):
+            return uita.http_client.Response(429, {"retry_after": 60000, "global": True})
+        mock_get.side_effect = limited
+        with patch.object(uita.discord_api.rate_limiter, "max_wait", 0.0):
+            with pytest.raises(uita.exceptions.AuthenticationUnavailable):
+                await uita.discord_api.get("/users/@me", "token", event_loop)
+
+
 @pytest.mark.asyncio
 async def test_avatar_url(data_dir):
     user = json.load(data_dir / "discord-api-user.json")
@@ -0,0 +1,54 @@
+import pytest
+
+import aiohttp.test_utils
+import aiohttp.web
+
+import uita.exceptions
+import uita.http_client
+
+
+@pytest.fixture
+@pytest.mark.asyncio
+async def http_server(event_loop):
+    async def handler(request):
+        # Reports which client connection the request came in on
+        return aiohttp.web.json_response({
+            "port": request.transport.get_extra_info("peername")[1],
+            "referer": request.headers.get("referer")
+        })
+
+    async def text_handler(request):
+        return aiohttp.web.Response(text="text")
+    app = aiohttp.web.Application()
+    app.router.add_get("/json", handler)
+    app.router.add_get("/text", text_handler)
+    runner = aiohttp.web.AppRunner(app)
+    await runner.setup()
+    port = aiohttp.test_utils.unused_port()
+    await aiohttp.web.TCPSite(runner, "127.0.0.1", port).start()
+    yield f"http://127.0.0.1:{port}"
+    await runner.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_request(http_server, event_loop):
+    client = uita.http_client.HTTPClient()
+    try:
+        first = await client.request("GET", f"{http_server}/json", loop=event_loop)
+        second = await client.request(
+            "GET", f"{http_server}/json", headers={"referer": "uita"}, loop=event_loop
+        )
+        assert first.status == 200 and second.data["referer"] == "uita"
+        # Connections are kept alive between requests
+        assert first.data["port"] == second.data["port"]
+
+        response = await client.request("GET", f"{http_server}/text", loop=event_loop)
+        assert response.status == 200 and response.data is None
+        response = await client.request("GET", f"{http_server}/missing", loop=event_loop)
+        assert response.status == 404
+    finally:
+        await client.close()
+
+    with pytest.raises(uita.exceptions.HTTPError):
+        await client.request("GET", "http://127.0.0.1:1/json", loop=event_loop)
+    await client.close()
@@ -1,3 +1,5 @@
+import json
+import msgpack
 import pytest
 
 import uita.message
@@ -28,9 +30,76 @@ def test_parse():
     with pytest.raises(uita.exceptions.MalformedMessage):
         message = '{"header":"auth.code"}'
         uita.message.parse(message)
+    # Required property has the wrong type
+    with pytest.raises(uita.exceptions.MalformedMessage):
+        message = '{"header":"auth.code", "code":["goodcode"]}'
+        uita.message.parse(message)
+    # Header does not exist and the rest of the message is never decoded
+    with pytest.raises(uita.exceptions.MalformedMessage):
+        message = '{"header":"bad.header", "property":' + '[' * 1000 + '}'
+        uita.message.parse(message)
+    # Not an object
+    with pytest.raises(uita.exceptions.MalformedMessage):
+        message = '["auth.code"]'
+        uita.message.parse(message)
+    # Unexpected property types never escape as other exceptions
+    for header, (message_type, properties) in uita.message.VALID_MESSAGES.items():
+        for value in [{"id": "1"}, [{"id": "1"}]] if len(properties) > 0 else []:
+            with pytest.raises(uita.exceptions.MalformedMessage):
+                message = json.dumps(dict({name: value for name in properties}, header=header))
+                uita.message.parse(message)
     # Finally success
     code = "goodcode"
     message = '{"header":"auth.code", "code":"' + code + '"}'
     parsed_message = uita.message.parse(message)
     assert isinstance(parsed_message, uita.message.AuthCodeMessage)
     assert parsed_message.code == code
+
+
+def test_parse_msgpack():
+    # Mangled MessagePack
+    with pytest.raises(uita.exceptions.MalformedMessage):
+        uita.message.parse(b"\xc1")
+    # Not an object
+    with pytest.raises(uita.exceptions.MalformedMessage):
+        uita.message.parse(msgpack.packb(["auth.code"]))
+    # Same validation as JSON messages
+    with pytest.raises(uita.exceptions.MalformedMessage):
+        uita.message.parse(msgpack.packb({"header": "auth.code"}))
+    message = uita.message.PlayQueueMoveMessage("abc", 2)
+    encoded = uita.message.encode(message, uita.message.MSGPACK_SUBPROTOCOL)
+    assert isinstance(encoded, bytes)
+    parsed_message = uita.message.parse(encoded)
+    assert isinstance(parsed_message, uita.message.PlayQueueMoveMessage)
+    assert parsed_message.properties() == message.properties()
+    assert uita.message.encode(message) == str(message)
+
+
+def test_encode_constant():
+    # Messages without properties reuse the same frames
+    message = uita.message.ServerKickMessage()
+    assert uita.message.encode(message) is uita.message.encode(uita.message.ServerKickMessage())
+    assert uita.message.encode(message) == str(message)
+    msgpack_frame = uita.message.encode(message, uita.message.MSGPACK_SUBPROTOCOL)
+    assert msgpack_frame == bytes(message)
+    assert isinstance(uita.message.parse(msgpack_frame), uita.message.ServerKickMessage)
+
+
+def test_play_queue_send_serialize():
+    user = uita.types.DiscordUser("1", "name", "http://example.com/img.png", None)
+    tracks = tuple(
+        uita.audio.Track(str(i), user, f"title {i}", 5.0, False, False, url="url")
+        for i in range(3)
+    )
+    for queue in [(), tracks]:
+        snapshot = uita.audio.QueueSnapshot(4, queue)
+        expected = json.loads(str(uita.message.PlayQueueSendMessage(list(queue), 4)))
+        assert json.loads(uita.message.PlayQueueSendMessage.serialize(snapshot)) == expected
+        # Encoded tracks are kept on the snapshot and reused
+        assert len(snapshot.encoded_tracks.get("json", ())) == max(len(queue) - 1, 0)
+        assert json.loads(uita.message.PlayQueueSendMessage.serialize(snapshot)) == expected
+        expected_bytes = bytes(uita.message.PlayQueueSendMessage(list(queue), 4))
+        for _ in range(2):
+            assert uita.message.PlayQueueSendMessage.serialize(
+                snapshot, uita.message.MSGPACK_SUBPROTOCOL
+            ) == expected_bytes
@@ -2,8 +2,10 @@ import pytest
 from unittest.mock import Mock, patch
 
 import discord
+import json
 import websockets
 
+import uita.audio
 import uita.message
 import uita.server_events
 import uita.ui_server
@@ -43,10 +45,13 @@ def event(request, config, event_loop):
             yield mock_event
 
 
-@pytest.mark.asyncio
-async def test_channel_active_get(event):
-    await uita.server_events.channel_active_get(event)
-    message = uita.message.parse(event.socket.send.call_args[0][0])
+@pytest.fixture
+def query(event):
+    return uita.ui_server.Query(event.message, event.user, None, event.active_server)
+
+
+def test_channel_active_get(query):
+    message = uita.message.parse(uita.server_events.channel_active_get(query))
     assert isinstance(message, uita.message.ChannelActiveSendMessage)
     assert message.channel is None
 
@@ -70,11 +75,10 @@ async def test_channel_leave(event):
         assert mock_disconnect.call_count == 1
 
 
-@pytest.mark.asyncio
-async def test_channel_list_get(event):
-    channels = list(event.active_server.channels.values())
-    await uita.server_events.channel_list_get(event)
-    assert str(uita.message.ChannelListSendMessage(channels)) == event.socket.send.call_args[0][0]
+def test_channel_list_get(query):
+    channels = list(query.active_server.channels.values())
+    data = uita.server_events.channel_list_get(query)
+    assert str(uita.message.ChannelListSendMessage(channels)) == data
 
 
 @pytest.mark.asyncio
@@ -124,36 +128,42 @@ async def test_server_join(event):
 
     # Check that join works
     await uita.server_events.server_join(event)
-    assert event.user.active_server_id == event.active_server.id
+    uita.server.set_active_server.assert_called_with(event.user, event.active_server.id)
+    state = json.loads(str(uita.server.send.call_args[0][0]))
+    assert uita.server.send.call_args[0][1] is event.socket
+    assert state["header"] == uita.message.ServerStateSendMessage.header
+    assert state["channels"][0]["id"] == "1a1a1a1a1a"
+    assert state["channel"] is None
+    assert state["queue"] == []
+    assert state["status"] == uita.audio.Status.PAUSED.value
 
     # Check that join kicks users without access
     uita.state.server_remove_user(event.active_server.id, event.user.id)
     await uita.server_events.server_join(event)
-    assert isinstance(
-        uita.message.parse(event.socket.send.call_args[0][0]),
-        uita.message.ServerKickMessage
-    )
+    uita.server.set_active_server.assert_called_with(event.user, None)
+    assert isinstance(uita.server.send.call_args[0][0], uita.message.ServerKickMessage)
 
 
-@pytest.mark.asyncio
-async def test_server_list_get(event):
-    servers = [event.active_server]
-    await uita.server_events.server_list_get(event)
-    assert str(uita.message.ServerListSendMessage(servers)) == event.socket.send.call_args[0][0]
+def test_server_list_get(query):
+    servers = [query.active_server]
+    data = uita.server_events.server_list_get(query)
+    assert str(uita.message.ServerListSendMessage(servers)) == data
 
 
-@pytest.mark.asyncio
-async def test_play_queue_get(event):
-    await uita.server_events.play_queue_get(event)
-    message = uita.message.parse(event.socket.send.call_args[0][0])
+def test_play_queue_get(query):
+    message = uita.message.parse(uita.server_events.play_queue_get(query))
     assert isinstance(message, uita.message.PlayQueueSendMessage)
     assert message.queue == []
 
-    tracks = [uita.audio.Track("path", event.user, "title", 5, False, False)]
-    queue_mock = Mock(return_value=tracks)
-    uita.state.voice_connections[event.active_server.id].queue = queue_mock
-    await uita.server_events.play_queue_get(event)
-    assert str(uita.message.PlayQueueSendMessage(tracks)) == event.socket.send.call_args[0][0]
+    tracks = [
+        uita.audio.Track("path", query.user, "title", 5, False, False),
+        uita.audio.Track("path", query.user, "title 2", 5, False, False, url="url")
+    ]
+    snapshot = uita.audio.QueueSnapshot(3, tuple(tracks))
+    snapshot_mock = Mock(return_value=snapshot)
+    uita.state.voice_connections[query.active_server.id].queue_snapshot = snapshot_mock
+    expected = str(uita.message.PlayQueueSendMessage(tracks, 3))
+    assert json.loads(expected) == json.loads(uita.server_events.play_queue_get(query))
 
 
 @pytest.mark.asyncio
@@ -176,14 +186,12 @@ async def test_play_queue_remove(event):
     assert id == remove_mock.call_args[0][0]
 
 
-@pytest.mark.asyncio
-async def test_play_status_get(event):
+def test_play_status_get(query):
     status = uita.audio.Status.PLAYING
     status_mock = Mock(return_value=status)
-    uita.state.voice_connections[event.active_server.id].status = status_mock
-    await uita.server_events.play_status_get(event)
+    uita.state.voice_connections[query.active_server.id].status = status_mock
     message = uita.message.PlayStatusSendMessage(status)
-    assert str(message) == event.socket.send.call_args[0][0]
+    assert str(message) == uita.server_events.play_status_get(query)
 
 
 @pytest.mark.asyncio
@@ -11,7 +11,7 @@ def test_initialize_from_bot(event_loop):
     with patch("uita.server") as mock_server, \
          patch("uita.utils.verify_channel_visibility", return_value=True), \
          patch("uita.utils.verify_user_permissions", return_value=True):
-        mock_server.database.get_server_role.return_value = None
+        mock_server.database.get_server_roles.return_value = {}
         mock_bot = Mock(**{
             "guilds": [Mock(**{
                 "id": 99999,
@@ -42,7 +42,7 @@ def test_initialize_from_bot(event_loop):
 
 def test_channel(event_loop):
     with patch("uita.server") as mock_server:
-        mock_server.database.get_server_role.return_value = None
+        mock_server.database.get_server_roles.return_value = {}
         channel = uita.types.DiscordChannel("12345", "channel", discord.ChannelType.voice, "9", 1)
         server = uita.types.DiscordServer("54321", "server", {}, {}, None)
 
@@ -62,7 +62,7 @@ def test_channel(event_loop):
 
 def test_server(event_loop):
     with patch("uita.server") as mock_server:
-        mock_server.database.get_server_role.return_value = None
+        mock_server.database.get_server_roles.return_value = {}
         server = uita.types.DiscordServer("12345", "server", {}, {}, None)
 
     state = uita.types.DiscordState()
@@ -78,7 +78,7 @@ def test_server(event_loop):
 
 def test_user(event_loop):
     with patch("uita.server") as mock_server:
-        mock_server.database.get_server_role.return_value = None
+        mock_server.database.get_server_roles.return_value = {}
         user = uita.types.DiscordUser("12345", "user", "http://example.com/image.png", None)
         server = uita.types.DiscordServer("54321", "server", {}, {}, None)
 
@@ -96,17 +96,60 @@ def test_user(event_loop):
     assert user.id not in state.servers[server.id].users
 
 
+def test_user_servers(event_loop):
+    with patch("uita.server") as mock_server:
+        mock_server.database.get_server_roles.return_value = {}
+        user = uita.types.DiscordUser("12345", "user", "http://example.com/image.png", None)
+        server = uita.types.DiscordServer("54321", "server", {}, {user.id: user.name}, None)
+        other_server = uita.types.DiscordServer("98765", "other", {}, {}, "icon")
+        renamed_server = uita.types.DiscordServer("54321", "renamed", {}, {}, None)
+
+    state = uita.types.DiscordState()
+    assert state.user_servers(user.id) == []
+
+    state.server_add(server, Mock(loop=event_loop))
+    state.server_add(other_server, Mock(loop=event_loop))
+    summary = uita.types.DiscordServerSummary("54321", "server", None)
+    assert state.user_servers(user.id) == [summary]
+
+    state.server_add_user(other_server.id, user.id, user.name)
+    assert state.user_servers(user.id)[1] == uita.types.DiscordServerSummary(
+        "98765", "other", "icon"
+    )
+
+    state.server_remove_user(other_server.id, user.id)
+    assert [s.id for s in state.user_servers(user.id)] == [server.id]
+
+    # Updated servers replace the users and summary of the old one
+    renamed_server.users[user.id] = user.name
+    state.server_add(renamed_server, Mock(loop=event_loop))
+    summary = uita.types.DiscordServerSummary("54321", "renamed", None)
+    assert state.user_servers(user.id) == [summary]
+
+    state.server_remove(server.id)
+    assert state.user_servers(user.id) == []
+
+
 def test_role(event_loop):
     with patch("uita.server") as mock_server:
         state = uita.types.DiscordState()
         server = uita.types.DiscordServer("12345", "server", {}, {}, None)
-        server.role = "321"
 
-        mock_server.database.get_server_role.return_value = "123"
+        mock_server.database.get_server_roles.return_value = {server.id: "123"}
         assert state.server_get_role(server.id) == "123"
+        assert state.server_get_role("54321") is None
 
         state.server_add(server, Mock(loop=event_loop))
-        assert state.server_get_role(server.id) == "321"
+        assert state.server_get_role(server.id) == "123"
 
+        # Writes go through to the database
         state.server_set_role(server.id, "999")
+        mock_server.database.set_server_role.assert_called_with(server.id, "999")
         assert state.server_get_role(server.id) == "999"
+        state.server_set_role(server.id, None)
+        mock_server.database.set_server_role.assert_called_with(server.id, None)
+        assert state.server_get_role(server.id) is None
+
+        # Roles are loaded once instead of queried per server
+        assert mock_server.database.get_server_roles.call_count == 1
+        assert mock_server.database.get_server_role.call_count == 0
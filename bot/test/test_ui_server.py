@@ -1,11 +1,16 @@
 import pytest
 from unittest.mock import Mock, patch
 
+import asyncio
 import json
+import logging
+import msgpack
 import websockets
 
+import uita.audio
 import uita.message
 import uita.ui_server
+import uita.youtube_api
 
 
 async def authenticate(socket, user=None, session=None):
@@ -24,7 +29,8 @@ async def authenticate(socket, user=None, session=None):
         mock_verify.side_effect = return_user
         message = uita.message.AuthSessionMessage(session.handle, session.secret)
         await socket.send(str(message))
-        message = json.loads(await socket.recv())
+        data = await socket.recv()
+        message = json.loads(data) if isinstance(data, str) else msgpack.unpackb(data, raw=False)
 
         return user, session, message
 
@@ -73,6 +79,26 @@ async def test_auth(config, event_loop):
     await server.stop()
 
 
+@pytest.mark.asyncio
+async def test_auth_unavailable(config, event_loop):
+    server = uita.ui_server.Server()
+    url = uita.utils.build_websocket_url(config)
+    await server.start(config.bot.database, config, loop=event_loop)
+
+    async with websockets.connect(url, loop=event_loop) as socket:
+        with patch("uita.auth.verify_session") as mock_verify:
+            async def unavailable(*args, **kwargs):
+                raise uita.exceptions.AuthenticationUnavailable("Rate limited")
+            mock_verify.side_effect = unavailable
+            await socket.send(str(uita.message.AuthSessionMessage("123", "abc")))
+            # Client is told to try again later instead of being sent to the login page
+            with pytest.raises(websockets.exceptions.ConnectionClosed) as error:
+                await socket.recv()
+    assert error.value.code == uita.ui_server.CLOSE_TRY_AGAIN_LATER
+
+    await server.stop()
+
+
 @pytest.mark.asyncio
 async def test_on_message(connection, event_loop):
     socket, user, server = connection
@@ -85,11 +111,130 @@ async def test_on_message(connection, event_loop):
     assert await socket.recv() == "good"
 
 
+@pytest.mark.asyncio
+async def test_on_query(connection, event_loop):
+    socket, user, server = connection
+
+    @server.on_query(uita.message.PlayStatusGetMessage, require_active_server=False)
+    def test_query(query):
+        assert query.user.id == user.id
+        return "good"
+
+    @server.on_query(uita.message.PlayQueueGetMessage)
+    def test_query_server(query):
+        return "bad"
+
+    # Heartbeats have no callback and are not answered
+    await socket.send(str(uita.message.HeartbeatMessage()))
+    await socket.send(str(uita.message.PlayStatusGetMessage()))
+    assert await socket.recv() == "good"
+    await socket.send(str(uita.message.PlayQueueGetMessage()))
+    message = uita.message.parse(await socket.recv())
+    assert isinstance(message, uita.message.ServerKickMessage)
+
+
+def test_connection_send(event_loop):
+    conn = uita.ui_server.Connection(None, Mock(), event_loop, maxlen=2, max_lag=10)
+    status = uita.message.PlayStatusSendMessage.header
+    assert conn.send("a", status) is True
+    assert conn.send("b", uita.message.HeartbeatMessage.header) is True
+
+    # Full queues make room by dropping superseded state messages
+    assert conn.send("c", status) is True
+    assert conn.queued == 2
+    assert conn.dropped == 1
+
+    # State messages with nothing to replace are dropped, and the client should be evicted once
+    # it falls behind
+    channels = uita.message.ChannelListSendMessage.header
+    assert conn.send("d", channels) is True
+    assert conn.dropped == 2
+    with patch.object(event_loop, "time", return_value=event_loop.time() + 11):
+        assert conn.send("e", channels) is False
+    assert conn.dropped == 3
+
+    # Clients can't recover from missing other messages, so they are evicted right away
+    assert conn.send("f", uita.message.PlayQueueRemoveSendMessage.header) is False
+    assert conn.queued == 2
+    assert conn.dropped == 4
+
+
+@pytest.mark.asyncio
+async def test_send_overflow(connection):
+    socket, user, server = connection
+    server.set_active_server(user, "123")
+    conn = next(iter(server.connections.values()))
+    conn.maxlen = 0
+
+    # Dropping a queue delta would leave the client out of sync, so it is disconnected instead
+    server.send_all(uita.message.PlayQueueRemoveSendMessage(1, "abc"), "123")
+    with pytest.raises(websockets.exceptions.ConnectionClosed) as error:
+        await socket.recv()
+    assert error.value.code == 1008
+    assert conn.evicted
+
+
+@pytest.mark.asyncio
+async def test_send_stats(connection, event_loop, caplog):
+    socket, user, server = connection
+    server.set_active_server(user, "123")
+    conn = next(iter(server.connections.values()))
+    stats = server.send_stats()
+    assert stats == uita.ui_server.SendQueueStats(1, 0, 0, 0, 0)
+    with caplog.at_level(logging.DEBUG, logger="uita.ui_server"):
+        server._report_stats(stats)
+    assert "0 dropped, 0 evicted" in caplog.text
+    cache_stats = uita.youtube_api.cache.stats()
+    assert f"Scrape cache: {cache_stats.entries} entries, {cache_stats.hits} hits" in caplog.text
+    caplog.clear()
+
+    # Superseded state messages are dropped from full queues
+    conn.maxlen = 0
+    assert conn.send("{}", uita.message.PlayStatusSendMessage.header) is True
+    with caplog.at_level(logging.INFO, logger="uita.ui_server"):
+        stats = server._report_stats(stats)
+    assert stats == uita.ui_server.SendQueueStats(1, 0, 0, 1, 0)
+    assert "1 dropped, 0 evicted" in caplog.text
+
+    # Counters of evicted connections are kept once they close
+    server.send_all(uita.message.PlayQueueRemoveSendMessage(1, "abc"), "123")
+    with pytest.raises(websockets.exceptions.ConnectionClosed):
+        await socket.recv()
+    for _ in range(100):
+        if not server.connections:
+            break
+        await asyncio.sleep(0.01)
+    caplog.clear()
+    with caplog.at_level(logging.INFO, logger="uita.ui_server"):
+        stats = server._report_stats(stats)
+    assert stats == uita.ui_server.SendQueueStats(0, 0, 0, 2, 1)
+    assert "1 dropped, 1 evicted" in caplog.text
+
+
+@pytest.mark.asyncio
+async def test_send(connection):
+    socket, user, server = connection
+    server.set_active_server(user, "123")
+
+    @server.on_message(uita.message.ServerJoinMessage, require_active_server=False)
+    async def test_message(event):
+        server.send_all(uita.message.HeartbeatMessage(), "123")
+        raise uita.exceptions.ClientError(uita.message.ErrorQueueFullMessage())
+
+    # Replies are queued behind broadcasts that were sent before them
+    await socket.send(str(uita.message.ServerJoinMessage("123")))
+    assert isinstance(uita.message.parse(await socket.recv()), uita.message.HeartbeatMessage)
+    assert isinstance(uita.message.parse(await socket.recv()), uita.message.ErrorQueueFullMessage)
+
+    # Sockets without a connection are ignored
+    server.send(uita.message.HeartbeatMessage(), Mock())
+
+
 @pytest.mark.asyncio
 async def test_send_all(connection):
     socket, user, server = connection
 
-    user.active_server_id = "123"
+    server.set_active_server(user, "123")
 
     server.send_all(uita.message.ServerKickMessage(), "ABC")
     server.send_all(uita.message.HeartbeatMessage(), "123")
@@ -97,6 +242,50 @@ async def test_send_all(connection):
 
     assert isinstance(message, uita.message.HeartbeatMessage)
 
+    # Broadcasts are encoded once, not once per connection
+    message_type = uita.message.PlayQueueRemoveSendMessage
+    with patch.object(message_type, "__str__", return_value="{}") as encode:
+        server.send_all(message_type(1, "abc"), "ABC")
+        assert encode.call_count == 0
+        server.send_all(message_type(1, "abc"), "123")
+        assert encode.call_count == 1
+    assert await socket.recv() == "{}"
+
+
+@pytest.mark.asyncio
+async def test_msgpack_subprotocol(config, event_loop):
+    server = uita.ui_server.Server()
+    url = uita.utils.build_websocket_url(config)
+    await server.start(config.bot.database, config, loop=event_loop)
+
+    subprotocols = [uita.message.MSGPACK_SUBPROTOCOL]
+    async with websockets.connect(url, loop=event_loop, subprotocols=subprotocols) as socket:
+        assert socket.subprotocol == uita.message.MSGPACK_SUBPROTOCOL
+        user, _, _ = await authenticate(socket)
+        server.set_active_server(user, "123")
+        server.send_all(uita.message.HeartbeatMessage(), "123")
+        data = await socket.recv()
+        assert isinstance(data, bytes)
+        assert isinstance(uita.message.parse(data), uita.message.HeartbeatMessage)
+
+    await server.stop()
+
+
+@pytest.mark.asyncio
+async def test_send_all_coalesced(connection):
+    socket, user, server = connection
+    server.set_active_server(user, "123")
+
+    # Only the latest state message of each type is sent, other messages are not held back
+    playing = uita.message.PlayStatusSendMessage(uita.audio.Status.PLAYING)
+    server.send_all(uita.message.PlayStatusSendMessage(uita.audio.Status.PAUSED), "123")
+    server.send_all(playing, "123")
+    server.send_all(uita.message.HeartbeatMessage(), "123")
+    assert isinstance(uita.message.parse(await socket.recv()), uita.message.HeartbeatMessage)
+    assert await socket.recv() == str(playing)
+    server.send_all(uita.message.HeartbeatMessage(), "123")
+    assert isinstance(uita.message.parse(await socket.recv()), uita.message.HeartbeatMessage)
+
 
 @pytest.mark.asyncio
 async def test_verify_active_servers(connection, event_loop):
@@ -107,21 +296,30 @@ async def test_verify_active_servers(connection, event_loop):
     uita.state.server_add(discord_server, Mock(loop=event_loop))
 
     # Use a server ID that doesn't exist
-    user.active_server_id = "fakeid"
+    server.set_active_server(user, "fakeid")
     await server.verify_active_servers()
     assert user.active_server_id is None
     assert isinstance(uita.message.parse(await socket.recv()), uita.message.ServerKickMessage)
 
     # Use a server that exists but does not have the user as a member
-    user.active_server_id = discord_server.id
+    server.set_active_server(user, discord_server.id)
     await server.verify_active_servers()
     assert user.active_server_id is None
     assert isinstance(uita.message.parse(await socket.recv()), uita.message.ServerKickMessage)
 
     # Use a server that has the user as a member
-    user.active_server_id = discord_server.id
+    server.set_active_server(user, discord_server.id)
     uita.state.server_add_user(discord_server.id, user.id, user.name)
     await server.verify_active_servers()
     server.send_all(uita.message.HeartbeatMessage(), discord_server.id)
     assert user.active_server_id == discord_server.id
     assert isinstance(uita.message.parse(await socket.recv()), uita.message.HeartbeatMessage)
+
+    # Scoped checks skip connections outside the given server or user
+    uita.state.server_remove_user(discord_server.id, user.id)
+    await server.verify_active_servers(server_id="fakeid")
+    await server.verify_active_servers(user_id="fakeid")
+    assert user.active_server_id == discord_server.id
+    await server.verify_active_servers(discord_server.id, user.id)
+    assert user.active_server_id is None
+    assert isinstance(uita.message.parse(await socket.recv()), uita.message.ServerKickMessage)
@@ -1,32 +1,37 @@
 import pytest
 from unittest.mock import Mock, patch
 
+import asyncio
 import json
 import re
+import time
+import youtube_dl
 
+import uita.exceptions
+import uita.http_client
 import uita.youtube_api
 
 
 @pytest.mark.asyncio
 async def test_search(data_dir, event_loop):
-    with patch("requests.get") as mock_get:
-        def find_json(*args, **kwargs):
+    with patch("uita.http_client.client.request") as mock_get:
+        async def find_json(method, url, headers=None, data=None, loop=None):
             # Press X
-            url = args[0]
+            assert "referer" not in uita.youtube_api.BASE_HEADERS
             path = None
             if re.match(r".*\/search\/.*", url):
                 path = data_dir / "youtube-api-search.json"
             elif re.match(r".*\/videos\/.*", url):
                 path = data_dir / "youtube-api-search-details.json"
             assert path is not None
+            assert headers["referer"] == "http://example.com"
             with open(path, "rb") as f:
-                content = f.read()
-            mock_response = Mock(status_code=200, content=content)
-            mock_response.json.return_value = json.loads(content)
-            return mock_response
+                return uita.http_client.Response(200, json.load(f))
         mock_get.side_effect = find_json
 
-        results = await uita.youtube_api.search("chocobanana", api_key="real-key", loop=event_loop)
+        results = await uita.youtube_api.search(
+            "chocobanana", api_key="real-key", referrer="http://example.com", loop=event_loop
+        )
         assert len(results) == 5
         assert results[0]["title"] == "Video 1"
         assert results[0]["duration"] == 5
@@ -46,3 +51,156 @@ def test_parse_time():
 
 def test_build_url():
     assert uita.youtube_api.build_url("vid1") == "https://youtube.com/watch?v=vid1"
+
+
+def test_stream_expiry():
+    assert uita.youtube_api.stream_expiry(
+        "https://r1.googlevideo.com/videoplayback?expire=1600000000&id=o-abc&itag=251"
+    ) == 1600000000.0
+    assert uita.youtube_api.stream_expiry(
+        "https://manifest.googlevideo.com/api/manifest/hls_playlist/expire/1600000000/id/abc"
+    ) == 1600000000.0
+    assert uita.youtube_api.stream_expiry("https://example.com/audio.ogg") is None
+
+
+def test_cache_key():
+    video = "video:dQw4w9WgXcQ"
+    assert uita.youtube_api.cache_key("https://www.youtube.com/watch?v=dQw4w9WgXcQ") == video
+    assert uita.youtube_api.cache_key("https://youtu.be/dQw4w9WgXcQ") == video
+    assert uita.youtube_api.cache_key("https://m.youtube.com/watch?v=dQw4w9WgXcQ&t=5") == video
+    assert uita.youtube_api.cache_key("https://youtube.com/shorts/dQw4w9WgXcQ") == video
+    assert uita.youtube_api.cache_key(
+        "https://www.youtube.com/playlist?list=PL123"
+    ) == "playlist:PL123"
+    # Videos in playlists and unknown sites are cached by URL
+    url = "https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=PL123"
+    assert uita.youtube_api.cache_key(url) == url
+    assert uita.youtube_api.cache_key("https://example.com/audio.ogg") == (
+        "https://example.com/audio.ogg"
+    )
+
+
+@pytest.mark.asyncio
+async def test_scrape_cache(event_loop):
+    cache = uita.youtube_api.ScrapeCache(max_entries=2)
+    url = "https://youtu.be/dQw4w9WgXcQ"
+    stream_url = f"https://r1.googlevideo.com/videoplayback?expire={int(time.time()) + 3600}"
+    info = {"id": "dQw4w9WgXcQ", "url": stream_url, "title": "Video", "is_live": None}
+    with patch("uita.youtube_api.cache", new=cache), \
+            patch("uita.youtube_api.extractor_pool", new=uita.youtube_api.ExtractorPool(0)), \
+            patch("youtube_dl.YoutubeDL") as mock_youtube_dl:
+        mock_youtube_dl.return_value.extract_info.side_effect = lambda *a, **kw: dict(info)
+
+        # Different links to the same video are only scraped once
+        await uita.youtube_api.scrape(url, loop=event_loop)
+        result = await uita.youtube_api.scrape(
+            "https://www.youtube.com/watch?v=dQw4w9WgXcQ", loop=event_loop
+        )
+        assert result["url"] == stream_url and result["extractor"] == "Youtube"
+        assert mock_youtube_dl.return_value.extract_info.call_count == 1
+        assert cache.stats() == uita.youtube_api.ScrapeCacheStats(entries=1, hits=1, misses=1)
+
+        # Expired stream URLs are scraped again unless only metadata is needed
+        cache.stream_ttl = 0
+        result = await uita.youtube_api.scrape(url, loop=event_loop, stream=False)
+        assert "url" not in result and result["title"] == "Video"
+        assert mock_youtube_dl.return_value.extract_info.call_count == 1
+        await uita.youtube_api.scrape(url, loop=event_loop)
+        assert mock_youtube_dl.return_value.extract_info.call_count == 2
+
+        # URLs that no extractor accepts are cached as invalid without scraping them
+        mock_youtube_dl.return_value.extract_info.side_effect = youtube_dl.utils.DownloadError("")
+        for _ in range(2):
+            with pytest.raises(uita.exceptions.ClientError):
+                await uita.youtube_api.scrape("invalid", loop=event_loop)
+        assert mock_youtube_dl.return_value.extract_info.call_count == 2
+        assert cache.stats() == uita.youtube_api.ScrapeCacheStats(entries=2, hits=3, misses=3)
+
+        # Failed extractions may only be temporary, so they aren't cached
+        for _ in range(2):
+            with pytest.raises(uita.exceptions.ClientError):
+                await uita.youtube_api.scrape("https://youtu.be/aaaaaaaaaaa", loop=event_loop)
+        assert mock_youtube_dl.return_value.extract_info.call_count == 4
+        assert cache.stats() == uita.youtube_api.ScrapeCacheStats(entries=2, hits=3, misses=5)
+
+
+@pytest.mark.asyncio
+async def test_extractor_pool(event_loop):
+    # Starting a worker takes longer than this
+    pool = uita.youtube_api.ExtractorPool(workers=1, timeout=0.01)
+    try:
+        # Workers that time out are killed
+        with pytest.raises(asyncio.TimeoutError):
+            await pool.extract("scrape", "invalid", ie_key="Youtube", loop=event_loop)
+        assert len(pool._idle) == 0
+
+        # URLs that don't match the extractor fail without any network requests
+        pool.timeout = 30
+        for _ in range(2):
+            with pytest.raises(youtube_dl.utils.DownloadError):
+                await pool.extract("scrape", "invalid", ie_key="Youtube", loop=event_loop)
+        # Workers are reused
+        assert len(pool._idle) == 1
+
+        # Workers that stop unexpectedly are replaced
+        worker = pool._idle[0]
+        with patch.object(worker, "call", side_effect=EOFError):
+            with pytest.raises(uita.exceptions.ExtractorStopped):
+                await pool.extract("scrape", "invalid", ie_key="Youtube", loop=event_loop)
+        # Killed workers are reaped instead of left as zombies
+        assert worker.process.exitcode is not None
+        assert len(pool._idle) == 1 and pool._idle[0] is not worker
+    finally:
+        pool.close()
+
+
+@pytest.mark.asyncio
+async def test_scrape_worker_stopped(event_loop):
+    cache = uita.youtube_api.ScrapeCache()
+    url = "https://youtu.be/dQw4w9WgXcQ"
+    with patch("uita.youtube_api.cache", new=cache), \
+            patch("uita.youtube_api.extractor_pool") as mock_pool:
+        async def stopped(*args, **kwargs):
+            raise uita.exceptions.ExtractorStopped("Extractor worker stopped unexpectedly")
+        mock_pool.extract.side_effect = stopped
+
+        # Crashes say nothing about the URL, so it isn't cached as invalid
+        with pytest.raises(uita.exceptions.ClientError):
+            await uita.youtube_api.scrape(url, loop=event_loop)
+        assert cache.get(url) is None
+        assert mock_pool.extract.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_scrape_shared(event_loop):
+    stream_url = f"https://r1.googlevideo.com/videoplayback?expire={int(time.time()) + 3600}"
+    release = asyncio.Event(loop=event_loop)
+    extract = Mock()
+
+    async def extract_stub(kind, query, ie_key=None, loop=None):
+        extract(query)
+        await release.wait()
+        return {"id": "dQw4w9WgXcQ", "url": stream_url, "title": "Video", "is_live": None}
+    with patch("uita.youtube_api.cache", new=uita.youtube_api.ScrapeCache()), \
+            patch("uita.youtube_api.extractor_pool") as mock_pool:
+        mock_pool.extract.side_effect = extract_stub
+
+        # Concurrent scrapes of the same video share one extraction
+        tasks = [
+            event_loop.create_task(uita.youtube_api.scrape(url, loop=event_loop))
+            for url in [
+                "https://youtu.be/dQw4w9WgXcQ",
+                "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+                "https://youtu.be/dQw4w9WgXcQ"
+            ]
+        ]
+        await asyncio.sleep(0, loop=event_loop)
+        # Cancelling one caller doesn't cancel the extraction for the others
+        tasks[0].cancel()
+        await asyncio.sleep(0, loop=event_loop)
+        release.set()
+        results = await asyncio.gather(*tasks[1:], loop=event_loop)
+        assert extract.call_count == 1
+        assert results[0] == results[1] and results[0] is not results[1]
+        assert tasks[0].cancelled()
+        assert uita.youtube_api._flights == {}
@@ -0,0 +1,41 @@
+from typing import Any, Optional
+
+
+class UnpackException(Exception):
+    ...
+
+
+class UnpackValueError(UnpackException, ValueError):
+    ...
+
+
+class ExtraData(UnpackValueError):
+    ...
+
+
+class FormatError(ValueError, UnpackException):
+    ...
+
+
+class StackError(ValueError, UnpackException):
+    ...
+
+
+class Packer:
+    def __init__(self, use_bin_type: bool = ...) -> None: ...
+
+    def pack(self, obj: Any) -> bytes: ...
+
+    def pack_array_header(self, n: int) -> bytes: ...
+
+    def pack_map_header(self, n: int) -> bytes: ...
+
+
+def packb(o: Any, use_bin_type: bool = ...) -> bytes: ...
+
+
+def unpackb(
+    packed: bytes,
+    raw: bool = ...,
+    max_buffer_size: Optional[int] = ...
+) -> Any: ...
@@ -0,0 +1,4 @@
+from typing import Any
+
+
+def dumps(obj: Any) -> bytes: ...
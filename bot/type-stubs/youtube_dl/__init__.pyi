@@ -1,5 +1,6 @@
 from typing import Any, Dict, Optional
 
+from youtube_dl import extractor as extractor  # noqa: F401
 from youtube_dl import utils as utils  # noqa: F401
 
 
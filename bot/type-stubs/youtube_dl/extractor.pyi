@@ -0,0 +1,9 @@
+from typing import Type
+
+
+class InfoExtractor:
+    @classmethod
+    def suitable(cls, url: str) -> bool: ...
+
+
+def get_info_extractor(ie_name: str) -> Type[InfoExtractor]: ...
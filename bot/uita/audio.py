@@ -7,12 +7,15 @@ import discord
 import enum
 import json
 import os
-import queue
+import random
 import subprocess
 import threading
 import time
 import uuid
-from typing import cast, Any, Awaitable, Callable, Deque, List, Optional
+from typing import (
+    cast, Any, Awaitable, Callable, Deque, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+)
+from typing_extensions import Final
 
 import uita.exceptions
 import uita.youtube_api
@@ -21,39 +24,54 @@ import logging
 log = logging.getLogger(__name__)
 
 
+# Playlist entries that need a full scrape are looked up by this many concurrent workers
+PLAYLIST_WORKERS: Final = 4
+# Minimum seconds between queue updates while a playlist is being expanded
+PLAYLIST_NOTIFY_INTERVAL: Final = 1.0
+
+
 class Track():
     """Container for audio resource metadata.
 
     Args:
-        path: Path to audio resource for ffmpeg to load.
+        path: Path to audio resource for ffmpeg to load, ``None`` if the stream URL of a remote
+            track has not been resolved yet.
         user: User that requested track.
         title: Title of track.
         duration: Track duration in seconds.
         live: Determines if the track is a remote livestream.
         local: Determines if the track is a local file or not.
         url: The public URL of the track if it exists, ``None`` otherwise.
+        codec: Audio codec of the resource if known, ``None`` otherwise.
+        expires: Unix time that ``path`` stops being valid at, ``None`` if it does not expire.
 
     Attributes:
         id (str): Unique 32 character long ID.
-        path (str): Path to audio resource for ffmpeg to load.
+        path (typing.Optional[str]): Path to audio resource for ffmpeg to load, ``None`` if the
+            stream URL of a remote track has not been resolved yet.
         user (uita.types.DiscordUser): User that requested track.
         title (str): Title of track.
         duration (int): Track duration in seconds.
         live (bool): Determines if the track is a remote livestream.
         local (bool): Determines if the track is a local file or not.
         url (typing.Optional[str]): The public URL of the track if it exists, ``None`` otherwise.
+        codec (typing.Optional[str]): Audio codec of the resource if known, ``None`` otherwise.
+        expires (typing.Optional[float]): Unix time that ``path`` stops being valid at, ``None``
+            if it does not expire.
         offset (float): Offset in seconds to start track from.
 
     """
     def __init__(
         self,
-        path: str,
+        path: Optional[str],
         user: "uita.types.DiscordUser",
         title: str,
         duration: float,
         live: bool,
         local: bool,
-        url: Optional[str] = None
+        url: Optional[str] = None,
+        codec: Optional[str] = None,
+        expires: Optional[float] = None
     ):
         self.id = uuid.uuid4().hex
         self.path = path
@@ -63,8 +81,249 @@ class Track():
         self.live = live
         self.local = local
         self.url = url
+        self.codec = codec
+        self.expires = expires
         self.offset: float = 0.0
 
+    def is_resolved(self, margin: float = 0.0) -> bool:
+        """Tests if the track can be loaded by ffmpeg.
+
+        Args:
+            margin: Seconds from now that ``path`` needs to stay valid for, default ``0``.
+
+        Returns:
+            True if ``path`` is set and will not expire within ``margin`` seconds.
+
+        """
+        if self.path is None:
+            return False
+        return self.expires is None or self.expires - time.time() > margin
+
+
+class _TrackNode():
+    __slots__ = ["track", "priority", "size", "left", "right", "parent"]
+
+    def __init__(self, track: Track) -> None:
+        self.track = track
+        self.priority = random.random()
+        self.size = 1
+        self.left: Optional[_TrackNode] = None
+        self.right: Optional[_TrackNode] = None
+        self.parent: Optional[_TrackNode] = None
+
+
+class TrackList():
+    """Ordered list of tracks indexed by track ID.
+
+    Tracks are kept in a randomized balanced binary tree ordered by position, with a map from
+    track IDs to tree nodes. Looking up, inserting, removing and accessing tracks by position or
+    by ID all take O(log n) time.
+
+    Args:
+        tracks: Tracks to initially fill the list with.
+
+    """
+    def __init__(self, tracks: Iterable[Track] = ()) -> None:
+        self._root: Optional[_TrackNode] = None
+        self._nodes: Dict[str, _TrackNode] = {}
+        for track in tracks:
+            self.append(track)
+
+    def __len__(self) -> int:
+        return len(self._nodes)
+
+    def __iter__(self) -> Iterator[Track]:
+        # In-order traversal without recursion
+        stack: List[_TrackNode] = []
+        node = self._root
+        while len(stack) > 0 or node is not None:
+            if node is not None:
+                stack.append(node)
+                node = node.left
+            else:
+                node = stack.pop()
+                yield node.track
+                node = node.right
+
+    def __getitem__(self, index: int) -> Track:
+        if index < 0:
+            index += len(self)
+        if index < 0 or index >= len(self):
+            raise IndexError("TrackList index out of range")
+        node = self._root
+        while node is not None:
+            left_size = _size(node.left)
+            if index < left_size:
+                node = node.left
+            elif index == left_size:
+                return node.track
+            else:
+                index -= left_size + 1
+                node = node.right
+        raise IndexError("TrackList index out of range")
+
+    def __contains__(self, track_id: object) -> bool:
+        return track_id in self._nodes
+
+    def get(self, track_id: str) -> Optional[Track]:
+        """Retrieves a track by ID.
+
+        Args:
+            track_id: Track ID of audio resource to find.
+
+        Returns:
+            Track with a matching ID, ``None`` if it isn't in the list.
+
+        """
+        node = self._nodes.get(track_id)
+        return node.track if node is not None else None
+
+    def index(self, track_id: str) -> int:
+        """Finds the position of a track.
+
+        Args:
+            track_id: Track ID of audio resource to find.
+
+        Returns:
+            Index position of the track.
+
+        Raises:
+            ValueError: If the track isn't in the list.
+
+        """
+        node = self._nodes.get(track_id)
+        if node is None:
+            raise ValueError("Track is not in TrackList")
+        index = _size(node.left)
+        while node.parent is not None:
+            if node is node.parent.right:
+                index += _size(node.parent.left) + 1
+            node = node.parent
+        return index
+
+    def insert(self, index: int, track: Track) -> None:
+        """Inserts a track before the given position.
+
+        Args:
+            index: Index position for the track to be inserted at. Clamped to the list bounds.
+            track: Track to be inserted.
+
+        Raises:
+            ValueError: If a track with the same ID is already in the list.
+
+        """
+        if track.id in self._nodes:
+            raise ValueError("Track is already in TrackList")
+        left, right = _split(self._root, max(0, min(index, len(self))))
+        node = _TrackNode(track)
+        self._nodes[track.id] = node
+        self._set_root(_merge(_merge(left, node), right))
+
+    def append(self, track: Track) -> None:
+        """Adds a track to the end of the list.
+
+        Args:
+            track: Track to be added.
+
+        """
+        self.insert(len(self), track)
+
+    def appendleft(self, track: Track) -> None:
+        """Adds a track to the start of the list.
+
+        Args:
+            track: Track to be added.
+
+        """
+        self.insert(0, track)
+
+    def remove(self, track_id: str) -> Optional[Track]:
+        """Removes a track by ID.
+
+        Args:
+            track_id: Track ID of audio resource to be removed.
+
+        Returns:
+            The removed track, ``None`` if it isn't in the list.
+
+        """
+        if track_id not in self._nodes:
+            return None
+        index = self.index(track_id)
+        node = self._nodes.pop(track_id)
+        left, right = _split(self._root, index)
+        _, right = _split(right, 1)
+        self._set_root(_merge(left, right))
+        return node.track
+
+    def popleft(self) -> Track:
+        """Removes and returns the first track.
+
+        Returns:
+            The first track in the list.
+
+        Raises:
+            IndexError: If the list is empty.
+
+        """
+        if self._root is None:
+            raise IndexError("pop from an empty TrackList")
+        track = self[0]
+        self.remove(track.id)
+        return track
+
+    def _set_root(self, root: Optional[_TrackNode]) -> None:
+        self._root = root
+        if root is not None:
+            root.parent = None
+
+
+def _size(node: Optional[_TrackNode]) -> int:
+    return node.size if node is not None else 0
+
+
+def _update(node: _TrackNode) -> None:
+    node.size = 1 + _size(node.left) + _size(node.right)
+    if node.left is not None:
+        node.left.parent = node
+    if node.right is not None:
+        node.right.parent = node
+
+
+def _split(
+    node: Optional[_TrackNode],
+    count: int
+) -> Tuple[Optional[_TrackNode], Optional[_TrackNode]]:
+    # Splits a tree into its first count nodes and the rest. Parent pointers of the returned
+    # roots are fixed up once they are attached to something or set as the root
+    if node is None:
+        return None, None
+    if _size(node.left) >= count:
+        left, node.left = _split(node.left, count)
+        _update(node)
+        return left, node
+    node.right, right = _split(node.right, count - _size(node.left) - 1)
+    _update(node)
+    return node, right
+
+
+def _merge(
+    left: Optional[_TrackNode],
+    right: Optional[_TrackNode]
+) -> Optional[_TrackNode]:
+    # Joins two trees where every node of left comes before every node of right
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
 
 # NOTE: These values must be synced with the enum used in utils/Message.js:PlayStatusSendMessage
 class Status(enum.IntEnum):
@@ -73,24 +332,145 @@ class Status(enum.IntEnum):
     PAUSED = 2
 
 
+class QueueChangeType(enum.Enum):
+    """Kind of change made to the playback queue."""
+    INSERT = 1
+    REMOVE = 2
+    MOVE = 3
+    PLAY = 4
+
+
+class QueueChange():
+    """Describes a single change made to the playback queue.
+
+    Positions refer to the queue as returned by :meth:`~uita.audio.Queue.queue`, where the
+    currently playing track (if any) is the first entry.
+
+    Args:
+        type: Kind of change made.
+        version: Queue version that this change produced.
+        tracks: Tracks that were inserted, or the single track that was removed, moved or started
+            playing.
+        position: Index position that tracks were inserted at or moved to, default ``0``.
+
+    Attributes:
+        type (uita.audio.QueueChangeType): Kind of change made.
+        version (int): Queue version that this change produced.
+        tracks (List[uita.audio.Track]): Tracks that were inserted, or the single track that was
+            removed, moved or started playing.
+        position (int): Index position that tracks were inserted at or moved to.
+
+    """
+    def __init__(
+        self,
+        type: QueueChangeType,
+        version: int,
+        tracks: List[Track],
+        position: int = 0
+    ) -> None:
+        self.type = type
+        self.version = version
+        self.tracks = tracks
+        self.position = position
+
+
+class QueueSnapshot():
+    """Read-only view of the playback queue at a single point in time.
+
+    Snapshots are cached by :class:`~uita.audio.Queue` and shared until the queue changes, so
+    neither the snapshot nor its tracks may be modified. The first track keeps playing after the
+    snapshot is taken, so its playback offset is only calculated when it is read.
+
+    Args:
+        version: Queue version that this snapshot belongs to.
+        tracks: Queued tracks, starting with the currently playing track if there is one.
+        play_start_time: Value of ``time.perf_counter()`` when the first track started playing,
+            ``None`` if it isn't playing.
+
+    Attributes:
+        version (int): Queue version that this snapshot belongs to.
+        tracks (Tuple[uita.audio.Track, ...]): Queued tracks, starting with the currently playing
+            track if there is one. Offsets of these tracks are not kept up to date.
+        encoded_tracks (Dict[str, Tuple[Any, ...]]): Encoded tracks after the first one, filled
+            in by :meth:`~uita.message.PlayQueueSendMessage.serialize` for each encoding. Freed
+            along with the snapshot once the queue changes.
+
+    """
+    __slots__ = ("version", "tracks", "encoded_tracks", "_play_start_time")
+
+    def __init__(
+        self,
+        version: int,
+        tracks: Tuple[Track, ...],
+        play_start_time: Optional[float] = None
+    ) -> None:
+        self.version = version
+        self.tracks = tracks
+        self.encoded_tracks: Dict[str, Tuple[Any, ...]] = {}
+        self._play_start_time = play_start_time
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def track(self, index: int) -> Track:
+        """Retrieves a track with its current playback offset.
+
+        Args:
+            index: Index position of the track.
+
+        Returns:
+            Queued track. The currently playing track is copied so that its offset can be updated.
+
+        """
+        track = self.tracks[index]
+        if index == 0 and self._play_start_time is not None:
+            # To maintain timer precision we want to avoid modifying the current tracks offset
+            # outside of pause/resumes
+            track = copy.copy(track)
+            track.offset += max(time.perf_counter() - self._play_start_time, 0.0)
+        return track
+
+    def to_list(self) -> List[Track]:
+        """Builds a list of every track with their current playback offsets.
+
+        Returns:
+            Ordered list of audio resources queued for playback.
+
+        """
+        if len(self.tracks) == 0:
+            return []
+        return [self.track(0)] + list(self.tracks[1:])
+
+
 class Queue():
     """Queues audio resources to be played by a looping task.
 
     Args:
         maxlen: Maximum queue size. Default is ``None``, which is unlimited.
         on_queue_change: Callback that is triggered everytime the state of the playback queue
-            changes. Function accepts a list of :class:`~uita.audio.Track` as its only argument.
+            changes. Function accepts the :class:`~uita.audio.QueueSnapshot` returned by
+            :meth:`~uita.audio.Queue.snapshot`, a list of every :class:`~uita.audio.QueueChange`
+            made since the last callback and the user responsible for the change, if any.
         on_status_change: Callback that is triggered everytime the playback status changes.
             Function accepts a :class:`~uita.audio.Status` as its only argument.
         loop: Event loop for audio tasks to run in.
+        opus_passthrough: Send Opus encoded tracks to Discord without transcoding them, default
+            ``False``.
+        prefetch_seconds: Seconds before the end of the current track to start buffering the next
+            queued track, so playback continues without a gap. ``0`` disables prefetching,
+            default ``5``.
+        resolve_seconds: Seconds before the end of the current track to resolve the stream URL of
+            the next queued track, default ``60``. Tracks are otherwise resolved right before
+            playing.
 
     Attributes:
         loop (asyncio.AbstractEventLoop): Event loop for audio tasks to run in.
         status (uita.audio.Status): Current playback status (playing, paused, etc).
+        version (int): Incremented by every change to the playback queue.
 
     """
     QueueCallbackType = Callable[
-        [List[Track], Optional["uita.types.DiscordUser"]], Awaitable[None]
+        [QueueSnapshot, List[QueueChange], Optional["uita.types.DiscordUser"]], Awaitable[None]
     ]
     StatusCallbackType = Callable[[Status], None]
 
@@ -99,10 +479,13 @@ class Queue():
         maxlen: Optional[int] = None,
         on_queue_change: Optional[QueueCallbackType] = None,
         on_status_change: Optional[StatusCallbackType] = None,
-        loop: Optional[asyncio.AbstractEventLoop] = None
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        opus_passthrough: bool = False,
+        prefetch_seconds: float = 5.0,
+        resolve_seconds: float = 60.0
     ) -> None:
         # async lambdas don't exist
-        async def dummy_queue_change(q: Any, u: Any) -> None: pass
+        async def dummy_queue_change(q: Any, c: Any, u: Any) -> None: pass
         self._on_queue_change = on_queue_change or dummy_queue_change
 
         async def dummy_status_change(s: Any) -> None: pass
@@ -110,11 +493,27 @@ class Queue():
 
         self.loop = loop or asyncio.get_event_loop()
         self.status = Status.PAUSED
+        self.version = 0
         self._now_playing: Optional[Track] = None
-        self._queue: Deque[Track] = collections.deque()
+        self._queue = TrackList()
+        # Changes that have not been passed to on_queue_change yet
+        self._changes: List[QueueChange] = []
+        # Snapshot of the queue along with the state it was taken from
+        self._snapshot: Optional[QueueSnapshot] = None
+        self._snapshot_key: Optional[Tuple[int, Optional[Track], Optional[float]]] = None
         self._queue_lock = asyncio.Lock(loop=self.loop)
         self._queue_update_flag = asyncio.Event(loop=self.loop)
         self._queue_maxlen = maxlen
+        self._opus_passthrough = opus_passthrough
+        self._prefetch_seconds = prefetch_seconds
+        self._resolve_seconds = resolve_seconds
+        # Stream URL lookup for the head of the queue running ahead of time, along with its track
+        self._resolve: Optional[Tuple[Track, asyncio.Task[None]]] = None
+        self._resolve_armed = False
+        # Stream for the head of the queue that is buffered ahead of time, along with its track
+        self._prefetch: Optional[Tuple[Track, FfmpegStream]] = None
+        self._prefetch_armed = False
+        self._prefetch_task: Optional[asyncio.Task[None]] = None
         self._play_task: Optional[asyncio.Task[Any]] = None
         self._play_start_time: Optional[float] = None
         self._stream: Optional[FfmpegStream] = None
@@ -127,17 +526,31 @@ class Queue():
             Ordered list of audio resources queued for playback.
 
         """
-        if self._now_playing is not None:
-            # To maintain timer precision we want to avoid modifying the current tracks offset
-            # outside of pause/resumes
-            now_playing = copy.copy(self._now_playing)
-            if self._play_start_time is not None:
-                now_playing.offset += max(
-                    time.perf_counter() - self._play_start_time,
-                    0.0
+        return self.snapshot().to_list()
+
+    def snapshot(self) -> QueueSnapshot:
+        """Retrieves a read-only view of the currently queued audio resources.
+
+        The same snapshot is returned until the queue changes.
+
+        Returns:
+            Snapshot of the queue, starting with the currently playing track if there is one.
+
+        """
+        # Besides the version, the playing track and its start time change the offsets in the
+        # snapshot without changing the order of the queue
+        key = (self.version, self._now_playing, self._play_start_time)
+        if self._snapshot is None or self._snapshot_key != key:
+            if self._now_playing is not None:
+                self._snapshot = QueueSnapshot(
+                    self.version,
+                    (self._now_playing,) + tuple(self._queue),
+                    self._play_start_time
                 )
-            return [now_playing] + list(self._queue)
-        return list(self._queue)
+            else:
+                self._snapshot = QueueSnapshot(self.version, tuple(self._queue))
+            self._snapshot_key = key
+        return self._snapshot
 
     def queue_full(self) -> bool:
         """Tests if the queue is at capacity.
@@ -146,7 +559,7 @@ class Queue():
             True if the queue is full.
 
         """
-        return self._queue_maxlen is not None and len(self.queue()) >= self._queue_maxlen
+        return self._queue_maxlen is not None and self._length() >= self._queue_maxlen
 
     async def play(self, voice: discord.VoiceClient) -> None:
         """Starts a new playlist task that awaits and plays new queue inputs.
@@ -178,6 +591,9 @@ class Queue():
                 self._now_playing = None
             self._play_task.cancel()
             await self._play_task
+        self._disarm_prefetch()
+        self._discard_prefetch()
+        self._cancel_resolve()
         self._end_stream()
 
     async def enqueue_file(self, path: str, user: "uita.types.DiscordUser") -> None:
@@ -232,14 +648,17 @@ class Queue():
         # This check cannot have any awaits between it and the following queue.append()s
         if self.queue_full():
             raise uita.exceptions.ClientError(uita.message.ErrorQueueFullMessage())
-        self._queue.append(Track(
+        track = Track(
             filename,
             user,
             title,
             float(probe["format"]["duration"]),
             live=False,
-            local=True
-        ))
+            local=True,
+            codec=probe["streams"][0].get("codec_name")
+        )
+        self._queue.append(track)
+        self._record_change(QueueChangeType.INSERT, [track], self._length() - 1)
         await self._notify_queue_change(user)
 
     async def enqueue_url(self, url: str, user: "uita.types.DiscordUser") -> None:
@@ -253,28 +672,20 @@ class Queue():
             uita.exceptions.ClientError: If called with an unusable audio path.
 
         """
-        info = await uita.youtube_api.scrape(url, loop=self.loop)
+        # Stream URLs that expired in the cache are resolved once the track gets close to playing
+        info = await uita.youtube_api.scrape(url, loop=self.loop, stream=False)
         # This check cannot have any awaits between it and the following queue.append()s
         if self.queue_full():
             raise uita.exceptions.ClientError(uita.message.ErrorQueueFullMessage())
         if info["extractor"] == "Youtube":
-            log.info(f"[{user.name}:{user.id}] Enqueue [YouTube]{info['title']}({info['id']}) "
-                     f"{info['acodec']}@{info['abr']}abr, {info['duration']}s")
-            self._queue.append(Track(
-                info["url"],
-                user,
-                info["title"],
-                float(info["duration"]),
-                info["is_live"] or False,  # is_live is either True or None?? Thanks ytdl
-                local=False,
-                url=f"https://youtube.com/watch?v={info['id']}"
-            ))
+            track = self._track_from_info(info, user)
+            self._queue.append(track)
+            self._record_change(QueueChangeType.INSERT, [track], self._length() - 1)
             await self._notify_queue_change(user)
         elif info["extractor"] == "YoutubePlaylist":
             if info["_type"] != "playlist":
                 raise uita.exceptions.ServerError("Unknown playlist type")
-            for entry in info["entries"]:
-                await self.enqueue_url(f"https://youtube.com/watch?v={entry['id']}", user)
+            await self._enqueue_playlist(list(info["entries"]), user)
         else:
             raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
 
@@ -287,7 +698,7 @@ class Queue():
 
         """
         async with self._queue_lock:
-            if position >= len(self.queue()) or position < 0:
+            if position >= self._length() or position < 0:
                 log.debug("Requested queue index out of bounds")
                 return
             # Check if re-ordering the queue will change the currently playing song
@@ -300,15 +711,17 @@ class Queue():
                     self._queue.appendleft(self._now_playing)
                     self._now_playing = None
                     self._voice.stop()
-                # Since now_playing will not be added to the queue, offset the index to compensate
-                else:
-                    position -= 1
-            for index, track in enumerate(self._queue):
-                if track.id == track_id:
-                    del self._queue[index]
-                    self._queue.insert(position, track)
-                    await self._notify_queue_change()
-                    return
+            track = self._queue.remove(track_id)
+            if track is not None:
+                # Since now_playing is not in the queue, offset the index to compensate
+                offset = self._length() - len(self._queue)
+                self._queue.insert(max(position - offset, 0), track)
+                self._record_change(
+                    QueueChangeType.MOVE,
+                    [track],
+                    self._queue.index(track.id) + offset
+                )
+                await self._notify_queue_change()
 
     async def remove(self, track_id: str) -> None:
         """Removes a track from the playback queue.
@@ -321,16 +734,142 @@ class Queue():
             if self._now_playing is not None and self._now_playing.id == track_id:
                 if self._voice is not None:
                     self._voice.stop()
-                return
-            for track in self._queue:
-                if track.id == track_id:
-                    self._queue.remove(track)
+                else:
+                    # Still resolving its stream, the play loop skips it once that's done
+                    self._record_change(QueueChangeType.REMOVE, [self._now_playing])
+                    self._now_playing = None
                     await self._notify_queue_change()
-                    return
+                return
+            track = self._queue.remove(track_id)
+            if track is not None:
+                self._record_change(QueueChangeType.REMOVE, [track])
+                await self._notify_queue_change()
+
+    async def _enqueue_playlist(
+        self,
+        entries: List[Dict[str, Any]],
+        user: "uita.types.DiscordUser"
+    ) -> None:
+        # Flat playlist entries usually carry enough metadata to queue them right away, their
+        # stream URLs are resolved once they get close to playing. Entries missing metadata are
+        # scraped by a limited number of concurrent workers instead
+        tracks: List[Optional[Track]] = [None] * len(entries)
+        finished = [False] * len(entries)
+        workers = asyncio.Semaphore(PLAYLIST_WORKERS, loop=self.loop)
+
+        async def scrape_entry(index: int, url: str) -> None:
+            try:
+                async with workers:
+                    info = await uita.youtube_api.scrape(url, loop=self.loop, stream=False)
+                if info["extractor"] == "Youtube":
+                    tracks[index] = self._track_from_info(info, user)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                log.warning(f"Skipping unavailable playlist entry {url}: {e}")
+            finally:
+                finished[index] = True
+
+        pending: Set[asyncio.Future[None]] = set()
+        for index, entry in enumerate(entries):
+            if entry.get("title") is None or entry.get("duration") is None:
+                url = uita.youtube_api.build_url(entry["id"])
+                pending.add(self.loop.create_task(scrape_entry(index, url)))
+            else:
+                tracks[index] = self._track_from_entry(entry, user)
+                finished[index] = True
+
+        # Tracks are appended in playlist order as soon as every entry before them is finished,
+        # with queue updates sent out at most once per interval
+        appended = 0
+        next_index = 0
+        notified = True
+        notified_time = 0.0
+        try:
+            while True:
+                # Appended tracks are sent out as a single change, there can't be any awaits
+                # between the queue.append()s and recording the change
+                flushed: List[Track] = []
+                queue_full = False
+                while next_index < len(entries) and finished[next_index]:
+                    track = tracks[next_index]
+                    if track is not None:
+                        if self.queue_full():
+                            queue_full = True
+                            break
+                        self._queue.append(track)
+                        flushed.append(track)
+                    next_index += 1
+                if len(flushed) > 0:
+                    self._record_change(
+                        QueueChangeType.INSERT,
+                        flushed,
+                        self._length() - len(flushed)
+                    )
+                    appended += len(flushed)
+                    notified = False
+                if queue_full:
+                    raise uita.exceptions.ClientError(uita.message.ErrorQueueFullMessage())
+                if not notified and (
+                    len(pending) == 0 or
+                    time.perf_counter() - notified_time >= PLAYLIST_NOTIFY_INTERVAL
+                ):
+                    notified = True
+                    notified_time = time.perf_counter()
+                    await self._notify_queue_change(user)
+                if len(pending) == 0:
+                    break
+                _, pending = await asyncio.wait(
+                    pending,
+                    loop=self.loop,
+                    timeout=PLAYLIST_NOTIFY_INTERVAL,
+                    return_when=asyncio.FIRST_COMPLETED
+                )
+        finally:
+            for task in pending:
+                task.cancel()
+            if not notified:
+                await self._notify_queue_change(user)
+        if appended == 0 and len(entries) > 0:
+            raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
+
+    def _track_from_info(self, info: Dict[str, Any], user: "uita.types.DiscordUser") -> Track:
+        # Cached metadata without a stream URL
+        if "url" not in info:
+            return self._track_from_entry(info, user)
+        log.info(f"[{user.name}:{user.id}] Enqueue [YouTube]{info['title']}({info['id']}) "
+                 f"{info['acodec']}@{info['abr']}abr, {info['duration']}s")
+        return Track(
+            info["url"],
+            user,
+            info["title"],
+            float(info["duration"]),
+            info["is_live"] or False,  # is_live is either True or None?? Thanks ytdl
+            local=False,
+            url=uita.youtube_api.build_url(info["id"]),
+            codec=info["acodec"],
+            expires=uita.youtube_api.stream_expiry(info["url"])
+        )
+
+    def _track_from_entry(self, entry: Dict[str, Any], user: "uita.types.DiscordUser") -> Track:
+        log.info(f"[{user.name}:{user.id}] Enqueue [YouTube]{entry['title']}({entry['id']}), "
+                 f"{entry['duration']}s")
+        return Track(
+            None,
+            user,
+            entry["title"],
+            float(entry["duration"]),
+            live=False,
+            local=False,
+            url=uita.youtube_api.build_url(entry["id"])
+        )
 
     async def _after_song(self) -> None:
         async with self._queue_lock:
+            if self._now_playing is not None:
+                self._record_change(QueueChangeType.REMOVE, [self._now_playing])
             self._now_playing = None
+            self._disarm_prefetch()
             self._change_status(Status.PAUSED)
             await self._notify_queue_change()
             self._end_stream()
@@ -343,33 +882,71 @@ class Queue():
         try:
             while voice.is_connected():
                 self._queue_update_flag.clear()
+                track: Optional[Track] = None
+                stream: Optional[FfmpegStream] = None
                 async with self._queue_lock:
                     if self._voice is None and len(self._queue) > 0:
-                        self._now_playing = self._queue.popleft()
-                        log.info(f"[{self._now_playing.user.name}:{self._now_playing.user.id}] "
-                                 f"Now playing {self._now_playing.title}")
-                        # Launch ffmpeg process
-                        self._stream = FfmpegStream(
-                            self._now_playing,
-                            discord.opus.Encoder()
-                        )
-                        self._voice = voice
-                        # Waits until ffmpeg has buffered audio before playing
-                        await self._stream.wait_ready(loop=self.loop)
-                        # Wait an extra second for livestreams so player clock runs behind input
-                        if self._now_playing.live is True:
-                            await asyncio.sleep(1, loop=self.loop)
-                        # Sync play start time to player start
-                        self._play_start_time = time.perf_counter()
-                        self._voice.play(
-                            # About the same as a max volume YouTube video, I think
-                            discord.PCMVolumeTransformer(self._stream, volume=0.3),
-                            after=lambda err: asyncio.run_coroutine_threadsafe(
-                                self._after_song(),
-                                loop=self.loop
-                            )
+                        track = self._now_playing = self._queue.popleft()
+                        log.info(f"[{track.user.name}:{track.user.id}] "
+                                 f"Now playing {track.title}")
+                        # Use the stream buffered ahead of time or launch a new ffmpeg process
+                        stream = self._take_prefetch(track)
+                if track is None:
+                    await self._queue_update_flag.wait()
+                    continue
+                # Resolving can take a whole scrape, so leave the queue editable in the meantime
+                error: Optional[Exception] = None
+                if stream is None:
+                    try:
+                        await self._wait_resolved(track)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        error = e
+                async with self._queue_lock:
+                    # Skip the track if it was removed while its stream was resolved
+                    if self._now_playing is not track:
+                        if stream is not None:
+                            stream.stop()
+                        continue
+                    if stream is None:
+                        if error is not None:
+                            log.warning(f"Skipping {track.title}, unable to "
+                                        f"resolve stream: {error}")
+                            self._record_change(QueueChangeType.REMOVE, [track])
+                            self._now_playing = None
+                            await self._notify_queue_change()
+                            continue
+                        stream = self._create_stream(track)
+                    self._stream = stream
+                    self._voice = voice
+                    # Waits until ffmpeg has buffered audio before playing
+                    await self._stream.wait_ready()
+                    # Wait an extra second for livestreams so player clock runs behind input
+                    if track.live is True:
+                        await asyncio.sleep(1, loop=self.loop)
+                    # Sync play start time to player start
+                    self._play_start_time = time.perf_counter()
+                    # Opus packets can't be volume adjusted without decoding them
+                    source: discord.AudioSource = self._stream
+                    if not self._stream.is_opus():
+                        # About the same as a max volume YouTube video, I think
+                        source = discord.PCMVolumeTransformer(self._stream, volume=0.3)
+                    self._voice.play(
+                        source,
+                        after=lambda err: asyncio.run_coroutine_threadsafe(
+                            self._after_song(),
+                            loop=self.loop
                         )
-                        self._change_status(Status.PLAYING)
+                    )
+                    self._change_status(Status.PLAYING)
+                    self._schedule_prefetch(track)
+                    # Lets listeners sync up the playback offset of the track
+                    self._record_change(
+                        QueueChangeType.PLAY,
+                        [copy.copy(track)]
+                    )
+                    await self._notify_queue_change()
                 await self._queue_update_flag.wait()
         except asyncio.CancelledError:
             pass
@@ -378,7 +955,133 @@ class Queue():
 
     async def _notify_queue_change(self, user: Optional["uita.types.DiscordUser"] = None) -> None:
         self._queue_update_flag.set()
-        await self._on_queue_change(self.queue(), user)
+        self._update_prefetch()
+        changes = self._changes
+        self._changes = []
+        await self._on_queue_change(self.snapshot(), changes, user)
+
+    def _record_change(
+        self,
+        change_type: QueueChangeType,
+        tracks: List[Track],
+        position: int = 0
+    ) -> None:
+        # Must be called in the same step as the change itself, so that the version always
+        # matches the contents of self.queue()
+        self.version += 1
+        self._changes.append(QueueChange(change_type, self.version, tracks, position))
+
+    def _length(self) -> int:
+        return len(self._queue) + (1 if self._now_playing is not None else 0)
+
+    def _create_stream(self, track: Track) -> "FfmpegStream":
+        return FfmpegStream(
+            track,
+            discord.opus.Encoder(),
+            opus_passthrough=self._opus_passthrough,
+            loop=self.loop
+        )
+
+    async def _resolve_track(self, track: Track) -> None:
+        # Only YouTube tracks are queued without a path or with one that expires
+        if track.url is None:
+            raise ValueError("Track has no URL to resolve")
+        info = await uita.youtube_api.scrape(track.url, loop=self.loop)
+        track.path = info["url"]
+        track.codec = info["acodec"]
+        track.expires = uita.youtube_api.stream_expiry(info["url"])
+        log.debug(f"Resolved {track.title}")
+
+    async def _wait_resolved(self, track: Track) -> None:
+        # Wait on the lookup already running ahead of time instead of starting another one
+        if self._resolve is not None and self._resolve[0] is track:
+            await asyncio.wait([self._resolve[1]], loop=self.loop)
+        if not track.is_resolved(self._resolve_seconds):
+            await self._resolve_track(track)
+
+    def _on_resolve_done(self, task: "asyncio.Task[None]") -> None:
+        if not task.cancelled() and task.exception() is not None:
+            log.warning(f"Unable to resolve stream ahead of time: {task.exception()}")
+        self._update_prefetch()
+
+    def _schedule_prefetch(self, track: Track) -> None:
+        # Livestreams have no known end to prefetch ahead of
+        if track.live:
+            return
+
+        async def arm_prefetch(resolve_delay: float, prefetch_delay: float) -> None:
+            # The next track needs to be resolved before it can be prefetched, so the resolve
+            # window always opens first
+            await asyncio.sleep(resolve_delay, loop=self.loop)
+            async with self._queue_lock:
+                self._resolve_armed = True
+                self._update_prefetch()
+            if self._prefetch_seconds <= 0:
+                return
+            await asyncio.sleep(prefetch_delay - resolve_delay, loop=self.loop)
+            async with self._queue_lock:
+                self._prefetch_armed = True
+                self._update_prefetch()
+        remaining = track.duration - track.offset
+        prefetch_delay = max(remaining - self._prefetch_seconds, 0.0)
+        resolve_delay = min(max(remaining - self._resolve_seconds, 0.0), prefetch_delay)
+        self._prefetch_task = self.loop.create_task(arm_prefetch(resolve_delay, prefetch_delay))
+
+    def _update_prefetch(self) -> None:
+        # Throw away the prefetched stream if the queue head was reordered or removed
+        if self._prefetch is not None and (
+            len(self._queue) == 0 or self._queue[0] is not self._prefetch[0]
+        ):
+            self._discard_prefetch()
+        if len(self._queue) == 0:
+            return
+        track = self._queue[0]
+        # Look up the stream URL of the queue head once the current track is about to end. Each
+        # head only gets one attempt ahead of time, failures are retried right before playing
+        if (
+            self._resolve_armed and
+            not track.is_resolved(self._resolve_seconds) and
+            (self._resolve is None or self._resolve[0] is not track)
+        ):
+            log.debug(f"Resolving {track.title}")
+            task = self.loop.create_task(self._resolve_track(track))
+            task.add_done_callback(self._on_resolve_done)
+            self._resolve = (track, task)
+        # Prefetch the queue head once the current track is about to end, this also covers tracks
+        # that were queued up or moved to the head after the prefetch window started
+        if (
+            self._prefetch_armed and
+            self._prefetch is None and
+            not track.live and
+            track.is_resolved()
+        ):
+            log.debug(f"Prefetching {track.title}")
+            self._prefetch = (track, self._create_stream(track))
+
+    def _take_prefetch(self, track: Track) -> Optional["FfmpegStream"]:
+        if self._prefetch is not None and self._prefetch[0] is track:
+            stream = self._prefetch[1]
+            self._prefetch = None
+            return stream
+        self._discard_prefetch()
+        return None
+
+    def _disarm_prefetch(self) -> None:
+        self._resolve_armed = False
+        self._prefetch_armed = False
+        if self._prefetch_task is not None:
+            self._prefetch_task.cancel()
+            self._prefetch_task = None
+
+    def _discard_prefetch(self) -> None:
+        if self._prefetch is not None:
+            self._prefetch[1].stop()
+            self._prefetch = None
+
+    def _cancel_resolve(self) -> None:
+        if self._resolve is not None:
+            self._resolve[1].cancel()
+            self._resolve = None
 
     def _end_stream(self) -> None:
         if self._stream is not None:
@@ -389,24 +1092,207 @@ class Queue():
             self._voice = None
 
 
+class FrameBuffer():
+    """Preallocated ring buffer of audio frames for a single producer and a single consumer.
+
+    Frames are written directly into fixed size slots of one contiguous ``bytearray``, so
+    buffering audio does not allocate any new objects. Producers reserve a slot, fill it, and then
+    commit it. Consumers receive a ``memoryview`` of the slot which stays valid until their next
+    read, at which point the slot is handed back to the producer.
+
+    Args:
+        frame_size: Size of each slot in bytes. Frames larger than this cannot be buffered.
+        capacity: Number of slots in the buffer.
+
+    Attributes:
+        frame_size (int): Size of each slot in bytes.
+        capacity (int): Number of slots in the buffer.
+
+    """
+    def __init__(self, frame_size: int, capacity: int) -> None:
+        self.frame_size = frame_size
+        self.capacity = capacity
+        self._array = bytearray(frame_size * capacity)
+        self._data = memoryview(self._array)
+        self._lengths = [0] * capacity
+        self._read_index = 0
+        self._write_index = 0
+        self._holding = False
+        # Counts slots available for each side, these are the only synchronization needed since
+        # each index is only ever advanced by one thread
+        self._free = threading.Semaphore(capacity)
+        self._filled = threading.Semaphore(0)
+
+    def reserve(self, timeout: float) -> Optional[memoryview]:
+        """Reserves the next writable slot for the producer.
+
+        Must be followed by a call to :meth:`~uita.audio.FrameBuffer.commit`.
+
+        Args:
+            timeout: Seconds to wait for a free slot. ``0`` does not wait.
+
+        Returns:
+            Writable view of the full slot, or ``None`` if the buffer stayed full.
+
+        """
+        if timeout > 0:
+            acquired = self._free.acquire(timeout=timeout)
+        else:
+            acquired = self._free.acquire(blocking=False)
+        if not acquired:
+            return None
+        start = self._write_index * self.frame_size
+        return self._data[start:start + self.frame_size]
+
+    def commit(self, length: int) -> None:
+        """Publishes the reserved slot to the consumer.
+
+        Args:
+            length: Number of bytes written to the slot. ``0`` marks the end of the stream.
+
+        """
+        self._lengths[self._write_index] = length
+        self._write_index = (self._write_index + 1) % self.capacity
+        self._filled.release()
+
+    def put(self, data: bytes, timeout: float) -> bool:
+        """Copies a frame into the buffer.
+
+        Args:
+            data: Frame to copy. Must not be larger than ``frame_size``.
+            timeout: Seconds to wait for a free slot. ``0`` does not wait.
+
+        Returns:
+            ``True`` if the frame was buffered, ``False`` if the buffer stayed full.
+
+        """
+        if self.reserve(timeout) is None:
+            return False
+        start = self._write_index * self.frame_size
+        self._array[start:start + len(data)] = data
+        self.commit(len(data))
+        return True
+
+    def get(self, timeout: float) -> Optional[memoryview]:
+        """Retrieves the oldest buffered frame.
+
+        Releases the frame returned by the previous call back to the producer.
+
+        Args:
+            timeout: Seconds to wait for a frame.
+
+        Returns:
+            View of the frame, or ``None`` if nothing was buffered in time. An empty
+            view marks the end of the stream.
+
+        """
+        if self._holding:
+            self._holding = False
+            self._free.release()
+        if not self._filled.acquire(timeout=timeout):
+            return None
+        index = self._read_index
+        self._read_index = (index + 1) % self.capacity
+        self._holding = True
+        start = index * self.frame_size
+        return self._data[start:start + self._lengths[index]]
+
+
+class OggPacketParser():
+    """Incrementally splits an Ogg bitstream into the packets it carries.
+
+    Unlike ``discord.oggparse``, data can be fed in as it arrives from a non-blocking pipe and
+    partial pages are kept until the rest of their data shows up.
+
+    """
+    def __init__(self) -> None:
+        self._data = bytearray()
+        self._partial_packet = bytearray()
+        self._packets: Deque[bytes] = collections.deque()
+
+    def feed(self, data: bytes) -> None:
+        """Adds bitstream data to be parsed.
+
+        Args:
+            data: Next chunk of the Ogg bitstream.
+
+        Raises:
+            ValueError: If the bitstream is not a valid Ogg stream.
+
+        """
+        self._data += data
+        while len(self._data) >= 27:
+            if self._data[:4] != b"OggS":
+                raise ValueError("Invalid Ogg page header")
+            # Page header is 27 bytes followed by a table of segment sizes
+            header_size = 27 + self._data[26]
+            if len(self._data) < header_size:
+                return
+            segments = self._data[27:header_size]
+            page_size = header_size + sum(segments)
+            if len(self._data) < page_size:
+                return
+            offset = header_size
+            for segment_size in segments:
+                self._partial_packet += self._data[offset:offset + segment_size]
+                offset += segment_size
+                # Packets end on the first segment shorter than 255 bytes, otherwise they continue
+                # into the next segment (or page)
+                if segment_size < 255:
+                    self._packets.append(bytes(self._partial_packet))
+                    del self._partial_packet[:]
+            del self._data[:page_size]
+
+    def next_packet(self) -> Optional[bytes]:
+        """Retrieves the oldest complete packet.
+
+        Returns:
+            Packet data, or ``None`` if no complete packets have been parsed.
+
+        """
+        return self._packets.popleft() if self._packets else None
+
+
 class FfmpegStream(discord.AudioSource):
     """Provides a data stream interface from an ffmpeg process for a ``discord.StreamPlayer``
 
     Compared to the ffmpeg stream player provided by ``discord.FFmpegPCMAudio``,
     this implementation will attempt to pre-fetch and cache (buffer) a sizable amount of audio
-    data in a concurrently running thread to minimize any hiccups while fetching audio data for
-    the consumer thread. This noticably cuts down on stuttering during playback, especially for
-    live streams.
+    data ahead of the consumer thread to minimize any hiccups while fetching audio data. This
+    noticably cuts down on stuttering during playback, especially for live streams.
+
+    The ffmpeg output pipe is read without blocking by the event loop, so buffering any number of
+    streams does not need any extra threads.
+
+    If ``opus_passthrough`` is enabled and the track is already Opus encoded, ffmpeg only remuxes
+    the audio into an Ogg container and the buffered Opus packets are handed directly to Discord.
+    This skips both decoding in ffmpeg and re-encoding in the player thread.
 
     Args:
         track: Track to be played.
         encoder: Opus encoder is needed to configure sampling rate for FFmpeg.
+        opus_passthrough: Pass Opus encoded tracks through without transcoding, default
+            ``False``.
+        loop: Event loop to read ffmpeg output from. Stream must be created from this loop.
+
+    Raises:
+        ValueError: If the track has not been resolved.
 
     """
 
-    def __init__(self, track: Track, encoder: discord.opus.Encoder) -> None:
+    def __init__(
+        self,
+        track: Track,
+        encoder: discord.opus.Encoder,
+        opus_passthrough: bool = False,
+        loop: Optional[asyncio.AbstractEventLoop] = None
+    ) -> None:
+        self._loop = loop or asyncio.get_event_loop()
         self._track = track
         self._encoder = encoder
+        if track.path is None:
+            raise ValueError("Track must be resolved before it can be streamed")
+        self._passthrough = opus_passthrough and track.codec == "opus"
         process_options = [
             "ffmpeg"
         ]
@@ -419,11 +1305,21 @@ class FfmpegStream(discord.AudioSource):
             ]
         process_options += [
             "-ss", str(track.offset if not track.live else 0.0),
-            "-i", track.path,
-            "-f", "s16le",
-            "-ac", str(self._encoder.CHANNELS),
-            "-ar", str(self._encoder.SAMPLING_RATE),
-            "-acodec", "pcm_s16le",
+            "-i", track.path
+        ]
+        if self._passthrough:
+            process_options += [
+                "-f", "ogg",
+                "-acodec", "copy"
+            ]
+        else:
+            process_options += [
+                "-f", "s16le",
+                "-ac", str(self._encoder.CHANNELS),
+                "-ar", str(self._encoder.SAMPLING_RATE),
+                "-acodec", "pcm_s16le"
+            ]
+        process_options += [
             "-vn",
             "-loglevel", "quiet",
             "pipe:1"
@@ -433,20 +1329,29 @@ class FfmpegStream(discord.AudioSource):
         # Ensure ffmpeg processes are cleaned up at exit, since Python handles this horribly
         atexit.register(self.stop)
 
-        # Expecting a frame size of 3840 currently, queue should max out at 3.5MB~ of memory
-        self._buffer: queue.Queue[bytes] = queue.Queue(maxsize=1000)
-        # Run audio production and consumption in separate threads, buffering as much as possible
-        # This cuts down on audio dropping out during playback (especially for livestreams)
-        self._buffer_thread = threading.Thread(target=self._buffer_audio_packets)
-        # Causes thread to force exit on shutdown without cleaning up resources
-        # Python is really pretty bad for concurrency, maybe they intend for you to use events to
-        # trigger resource cleanup except this totally defeats the purpose of being able to use
-        # blocking calls in threads which is exactly how most of these threadable data structures
-        # are meant to be used!! It's very poorly designed!!!
-        self._buffer_thread.daemon = True
-        self._buffer_thread.start()
         # Set once queue has buffered audio data available
-        self._is_ready = threading.Event()
+        self._is_ready: asyncio.Future[None] = self._loop.create_future()
+        # Streams can be prefetched and left unread for a while before playback starts
+        self._is_reading = False
+        self._is_stopped = False
+        self._is_closed = False
+        # Expecting a frame size of 3840 currently, buffer is preallocated at 3.5MB~ of memory
+        # Opus packets are always smaller than a PCM frame so they fit in the same slots
+        self._buffer = FrameBuffer(self._encoder.FRAME_SIZE, 1000)
+        # PCM frames are read into a reserved buffer slot in as many pieces as the pipe needs
+        self._slot: Optional[memoryview] = None
+        self._slot_length = 0
+        # Opus packets are parsed out of the Ogg container and copied into the buffer
+        self._ogg = OggPacketParser()
+        self._pending_packet: Optional[bytes] = None
+        # Time that the producer started waiting on a full buffer
+        self._full_since: Optional[float] = None
+        # Run audio production on the event loop and consumption in the player thread, buffering
+        # as much as possible. This cuts down on audio dropping out during playback (especially
+        # for livestreams)
+        self._fd = self._process.stdout.fileno()
+        os.set_blocking(self._fd, False)
+        self._loop.add_reader(self._fd, self._on_readable)
 
     def read(self) -> bytes:
         """Returns an array of raw audio data.
@@ -454,78 +1359,179 @@ class FfmpegStream(discord.AudioSource):
         Returns:
             Array of raw audio data. Size of array is equal to (or less than if EOF has been
             reached) the ``FRAME_SIZE`` of the opus Encoder parameter passed into the object
-            constructor.
+            constructor. If the stream is in Opus passthrough mode a single Opus packet is
+            returned instead. The returned view is only valid until the next call to ``read``.
 
         """
-        try:
-            return self._buffer.get(timeout=10)
-        except queue.Empty:
+        self._is_reading = True
+        data = self._buffer.get(timeout=10)
+        if data is None:
             log.warning("Audio process queue is not being produced")
             self.stop()
             # Empty read indicates completion
             return b""
+        # discord.py only needs a bytes-like object and is done with it before reading again
+        return cast(bytes, data)
 
     def is_opus(self) -> bool:
-        """Produces raw PCM audio data."""
-        return False
+        """Produces Opus packets in passthrough mode, raw PCM audio data otherwise."""
+        return self._passthrough
 
     def cleanup(self) -> None:
         """Cleanup is handled outside the discord.py API."""
         pass
 
     def stop(self) -> None:
-        """Stops any currently running processes."""
+        """Stops any currently running processes.
+
+        Safe to call from any thread, the event loop notices the closed pipe and cleans up the
+        rest of the stream.
+
+        """
         try:
-            # We don't need to kill the thread here since it auto terminates after 10 seconds
-            # without buffer consumption
             self._process.kill()
         except Exception:
             # subprocess.kill() can throw if the process has already ended...
             # But I forget what type of exception it is and it's seemingly undocumented
             pass
         finally:
-            self._is_ready.set()
+            self._is_stopped = True
             atexit.unregister(self.stop)
 
-    async def wait_ready(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
-        """Waits until the first packet of buffered audio data is available to be read.
-
-        Args:
-            loop: Event loop to launch threaded blocking wait task from.
+    async def wait_ready(self) -> None:
+        """Waits until the first packet of buffered audio data is available to be read."""
+        # Shielded so a cancelled waiter doesn't cancel readiness for everyone else
+        await asyncio.shield(self._is_ready, loop=self._loop)
 
-        """
-        async_loop = loop or asyncio.get_event_loop()
-        await async_loop.run_in_executor(None, lambda: self._is_ready.wait())
+    def _set_ready(self) -> None:
+        if not self._is_ready.done():
+            self._is_ready.set_result(None)
 
-    def _buffer_audio_packets(self) -> None:
-        need_set_ready = True
+    def _on_readable(self) -> None:
+        try:
+            if self._passthrough:
+                eof = self._read_opus_packets()
+            else:
+                eof = self._read_pcm_frames()
+        except ValueError as e:
+            # Truncated or mangled pages show up when ffmpeg is killed mid-write
+            log.debug(f"Audio process produced invalid data: {e}")
+            eof = True
+        if eof:
+            self._loop.remove_reader(self._fd)
+            self._write_eof()
+
+    def _read_pcm_frames(self) -> bool:
+        # Only read a limited number of frames per callback so that one stream can't hog the loop
+        for _ in range(50):
+            if self._slot is None:
+                self._slot = self._buffer.reserve(timeout=0)
+                if self._slot is None:
+                    self._wait_for_space()
+                    return False
+                self._slot_length = 0
+            # Read from process stdout straight into the buffer slot. readv accepts any writable
+            # buffer but the stubs only allow bytearray
+            try:
+                length = os.readv(
+                    self._fd,
+                    [self._slot[self._slot_length:]]  # type: ignore
+                )
+            except BlockingIOError:
+                return False
+            if length == 0:
+                return True
+            self._slot_length += length
+            if self._slot_length == self._encoder.FRAME_SIZE:
+                self._buffer.commit(self._slot_length)
+                self._slot = None
+                self._full_since = None
+                self._set_ready()
+        return False
 
-        # Read from process stdout until an empty byte string is returned
-        def read() -> bytes:
-            return cast(bytes, self._process.stdout.read(self._encoder.FRAME_SIZE))
-        for data in iter(read, b""):
+    def _read_opus_packets(self) -> bool:
+        for _ in range(50):
+            # Flush every parsed packet before reading more data from the pipe
+            if not self._flush_opus_packets():
+                self._wait_for_space()
+                return False
             try:
-                # If the buffer fills and times out it means the queue is no longer being
-                # consumed, this likely means we're running in a zombie thread and should
-                # terminate. Ideally Python would let you send cancellation exceptions
-                # to child threads, much like how asyncio works, but hey who cares about
-                # consistency? Just let the timeout clean up our old resources instead...
-                # However! Since we use daemon threads, this method would just leave dangling
-                # ffmpeg processes on exit, and so we must register every spawned process to be
-                # cleaned up on exit. Python is really pretty terrible for concurrency. Chears.
-                if len(data) != self._encoder.FRAME_SIZE:
-                    break
-                self._buffer.put(data, timeout=10)
-                if need_set_ready is True:
-                    self._is_ready.set()
-                    need_set_ready = False
-            except queue.Full:
-                self.stop()
-                return
-        try:
-            # self.read returning an empty byte string indicates EOF
-            self._buffer.put(b"", timeout=5)
-        except queue.Full:
-            pass
-        finally:
-            self.stop()
+                data = os.read(self._fd, 16384)
+            except BlockingIOError:
+                return False
+            if len(data) == 0:
+                return True
+            self._ogg.feed(data)
+        return False
+
+    def _flush_opus_packets(self) -> bool:
+        packet = self._pending_packet or self._ogg.next_packet()
+        while packet is not None:
+            # Ogg Opus header packets carry stream metadata, not audio
+            if packet.startswith(b"OpusHead") or packet.startswith(b"OpusTags"):
+                pass
+            elif len(packet) > self._buffer.frame_size:
+                log.warning(f"Dropped oversized Opus packet of {len(packet)} bytes")
+            elif not self._buffer.put(packet, timeout=0):
+                self._pending_packet = packet
+                return False
+            else:
+                self._full_since = None
+                self._set_ready()
+            packet = self._ogg.next_packet()
+        self._pending_packet = None
+        return True
+
+    def _wait_for_space(self) -> None:
+        # Stop watching the pipe until the player frees up some of the buffer, ffmpeg will block
+        # on its full pipe in the meantime
+        self._loop.remove_reader(self._fd)
+        if self._check_abandoned():
+            return
+        self._loop.call_later(0.1, self._retry_read)
+
+    def _retry_read(self) -> None:
+        if self._is_stopped:
+            self._close()
+            return
+        self._loop.add_reader(self._fd, self._on_readable)
+        self._on_readable()
+
+    def _write_eof(self) -> None:
+        # Flush whatever was parsed before the pipe closed
+        if self._passthrough and not self._flush_opus_packets():
+            if not self._check_abandoned():
+                self._loop.call_later(0.1, self._write_eof)
+            return
+        # self.read returning an empty byte string indicates EOF, partial frames are dropped
+        if self._slot is not None:
+            self._buffer.commit(0)
+            self._slot = None
+        elif not self._buffer.put(b"", timeout=0):
+            if not self._check_abandoned():
+                self._loop.call_later(0.1, self._write_eof)
+            return
+        self._close()
+
+    def _check_abandoned(self) -> bool:
+        # If the buffer stays full after playback has started it means the queue is no longer
+        # being consumed and the stream should be cleaned up. Prefetched streams that have not
+        # been read yet keep waiting until they are played or explicitly stopped
+        if self._full_since is None:
+            self._full_since = time.perf_counter()
+        if self._is_stopped or (
+            self._is_reading and time.perf_counter() - self._full_since > 10
+        ):
+            self._close()
+            return True
+        return False
+
+    def _close(self) -> None:
+        if self._is_closed:
+            return
+        self._is_closed = True
+        self._loop.remove_reader(self._fd)
+        self._process.stdout.close()
+        self.stop()
+        # Wake up anything waiting on a stream that will never have data
+        self._set_ready()
@@ -43,6 +43,8 @@ async def verify_session(
 
     Raises:
         uita.exceptions.AuthenticationError: If authentication fails.
+        uita.exceptions.AuthenticationUnavailable: If the Discord API can't be reached or is
+            rate limiting requests. The session is kept.
 
     """
     loop = loop or asyncio.get_event_loop()
@@ -56,6 +58,9 @@ async def verify_session(
                 avatar=uita.discord_api.avatar_url(user),
                 active_server_id=None
             )
+        except uita.exceptions.AuthenticationUnavailable:
+            # Discord being overloaded says nothing about the session, so keep it for a retry
+            raise
         except uita.exceptions.AuthenticationError:
             database.delete_session(session)
     raise uita.exceptions.AuthenticationError("Session authentication failed")
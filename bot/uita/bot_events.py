@@ -24,7 +24,7 @@ def bot_ready(function: Callable[..., Awaitable[None]]) -> Callable[..., Awaitab
 @uita.bot.event
 async def on_ready() -> None:
     log.info("Bot connected to Discord")
-    uita.state.initialize_from_bot(uita.bot)
+    uita.state.initialize_from_bot(uita.bot, uita.server.config)
     await uita.bot_commands.set_prefix(".")
 
     if uita.server.config.bot.trial_mode.enabled:
@@ -114,7 +114,7 @@ async def on_member_join(member: discord.Member) -> None:
 async def on_member_remove(member: discord.Member) -> None:
     uita.state.server_remove_user(str(member.guild.id), str(member.id))
     # Kick any displaced users
-    await uita.server.verify_active_servers()
+    await uita.server.verify_active_servers(str(member.guild.id), str(member.id))
 
 
 @uita.bot.event
@@ -165,7 +165,7 @@ async def on_guild_join(guild: discord.Guild) -> None:
         users,
         guild.icon
     )
-    uita.state.server_add(discord_server, uita.bot)
+    uita.state.server_add(discord_server, uita.bot, uita.server.config)
     log.info(f"Joined {discord_server.name}")
 
     if (
@@ -193,7 +193,7 @@ async def on_guild_remove(guild: discord.Guild) -> None:
     log.info(f"Leaving {guild.name}")
     uita.state.server_remove(str(guild.id))
     # Kick any displaced users
-    await uita.server.verify_active_servers()
+    await uita.server.verify_active_servers(str(guild.id))
 
 
 @uita.bot.event
@@ -220,11 +220,11 @@ async def on_guild_update(before: discord.Guild, after: discord.Guild) -> None:
         users,
         after.icon
     )
-    uita.state.server_add(discord_server, uita.bot)
+    uita.state.server_add(discord_server, uita.bot, uita.server.config)
     # In case any channel visibilities changed
     _sync_channels(after)
     # Kick any displaced users
-    await uita.server.verify_active_servers()
+    await uita.server.verify_active_servers(str(after.id))
 
 
 @uita.bot.event
@@ -20,6 +20,8 @@ class ConfigDiscord(NamedTuple):
 
 class ConfigYoutube(NamedTuple):
     api_key: str
+    extract_workers: int = 2
+    extract_timeout: float = 60.0
 
 
 class ConfigBotTrialMode(NamedTuple):
@@ -33,6 +35,11 @@ class ConfigBot(NamedTuple):
     database: str
     verbose_logging: bool
     trial_mode: ConfigBotTrialMode
+    broadcast_interval: float = 0.05
+    send_queue_length: int = 256
+    send_max_lag: float = 30.0
+    ping_interval: float = 20.0
+    ping_timeout: float = 20.0
 
 
 class ConfigClient(NamedTuple):
@@ -50,6 +57,13 @@ class ConfigFile(NamedTuple):
     cache_max_size: int
 
 
+class ConfigAudio(NamedTuple):
+    queue_max_length: int = 100
+    opus_passthrough: bool = False
+    prefetch_seconds: float = 5.0
+    resolve_seconds: float = 60.0
+
+
 class Config(NamedTuple):
     """Named tuple carrying configuration options. See :doc:`config` for documentation."""
     discord: ConfigDiscord
@@ -58,6 +72,8 @@ class Config(NamedTuple):
     client: ConfigClient
     ssl: ConfigSSL
     file: ConfigFile
+    # Optional sections need defaults so older config files continue to load
+    audio: ConfigAudio = ConfigAudio()
 
 
 _ConfigType = Union[
@@ -69,7 +85,8 @@ _ConfigType = Union[
     ConfigBotTrialMode,
     ConfigClient,
     ConfigSSL,
-    ConfigFile
+    ConfigFile,
+    ConfigAudio
 ]
 _CONFIGNAMES: Final[Dict[str, Type[_ConfigType]]] = {
     "config": Config,
@@ -80,7 +97,8 @@ _CONFIGNAMES: Final[Dict[str, Type[_ConfigType]]] = {
     "config.bot.trial_mode": ConfigBotTrialMode,
     "config.client": ConfigClient,
     "config.ssl": ConfigSSL,
-    "config.file": ConfigFile
+    "config.file": ConfigFile,
+    "config.audio": ConfigAudio
 }
 
 
@@ -4,7 +4,7 @@ import sqlite3
 import os
 import binascii
 import hmac
-from typing import cast, Optional
+from typing import cast, Dict, Optional
 from typing_extensions import Final
 
 import uita.auth
@@ -112,6 +112,17 @@ class Database():
             return None
         return cast(str, role[0])
 
+    def get_server_roles(self) -> Dict[str, str]:
+        """Retrieves the required role setting of every server in a single query.
+
+        Returns:
+            Role IDs indexed by server ID, for servers that have configured this setting.
+
+        """
+        c = self._connection.cursor()
+        c.execute(_GET_SERVER_ROLES_QUERY)
+        return {server_id: role_id for server_id, role_id in c.fetchall() if role_id is not None}
+
 
 _INIT_DATABASE_QUERY: Final = """
 CREATE TABLE IF NOT EXISTS sessions (
@@ -152,3 +163,6 @@ VALUES(?, ?)"""
 
 _GET_SERVER_ROLE_QUERY: Final = """
 SELECT role_id FROM server_roles WHERE server_id=?"""
+
+_GET_SERVER_ROLES_QUERY: Final = """
+SELECT server_id, role_id FROM server_roles"""
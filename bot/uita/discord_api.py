@@ -1,18 +1,22 @@
 """Async HTTP requests to the Discord API"""
 import asyncio
+import collections
+import math
 import re
-import requests
-from typing import cast, Any, Dict, Optional
+import time
+from typing import cast, Any, Dict, Optional, Tuple
 from typing_extensions import Final
 
 import uita
 import uita.exceptions
+import uita.http_client
 import uita.utils
 
 
 # API config definitions
 BASE_HEADERS: Final = {
     "Content-Type": "application/x-www-form-urlencoded",
+    "X-RateLimit-Precision": "millisecond",
     "User-Agent": f"uitabot ({uita.__url__}, {uita.__version__})"
 }
 BASE_URL: Final = "https://discordapp.com/api"
@@ -20,6 +24,213 @@ AUTH_URL: Final = BASE_URL + "/oauth2/token"
 API_URL: Final = BASE_URL + "/v6"
 CDN_URL: Final = "https://cdn.discordapp.com"
 VALID_CODE_REGEX: Final = re.compile("^([a-zA-Z0-9]+)$")
+# Rate limit definitions
+RATE_LIMIT_RETRIES: Final = 3
+RATE_LIMIT_MAX_WAIT: Final = 30.0
+RATE_LIMIT_MAX_BUCKETS: Final = 4096
+
+
+class _Bucket():
+    """Rate limit state of a route, as last reported by the Discord API.
+
+    ``remaining`` is ``None`` while the limit of the route is unknown, and ``reset`` is infinite
+    while the window that requests are counted against has not been reported yet.
+
+    """
+    __slots__ = ("limit", "remaining", "reset", "pending")
+
+    def __init__(self) -> None:
+        self.limit: Optional[int] = None
+        self.remaining: Optional[int] = None
+        self.reset = 0.0
+        self.pending: Optional["asyncio.Future[None]"] = None
+
+    def release(self) -> None:
+        # A response without rate limit headers leaves the window unknown
+        if self.reset == math.inf:
+            self.remaining = None
+            self.reset = 0.0
+        if self.pending is not None:
+            if not self.pending.done():
+                self.pending.set_result(None)
+            self.pending = None
+
+    def update(self, headers: Any, now: float) -> None:
+        try:
+            if "X-RateLimit-Limit" in headers:
+                self.limit = int(headers["X-RateLimit-Limit"])
+            if "X-RateLimit-Remaining" in headers:
+                self.remaining = int(headers["X-RateLimit-Remaining"])
+            if "X-RateLimit-Reset-After" in headers:
+                self.reset = now + float(headers["X-RateLimit-Reset-After"])
+            elif "X-RateLimit-Reset" in headers:
+                self.reset = now + float(headers["X-RateLimit-Reset"]) - time.time()
+        except ValueError:
+            pass
+
+
+class RateLimiter():
+    """Schedules Discord API requests around rate limits.
+
+    Discord allows a number of requests to each route per reset period, and reports what is left
+    in ``X-RateLimit-*`` response headers. Requests are held back until the bucket of their route
+    resets instead of exhausting it. Responses with status 429 are retried once ``retry_after``
+    has passed, pausing every request if the limit is global.
+
+    A route only has one request in flight until a response reports its limits. When a window
+    expires, only as many requests as the limit allows go out until the next one is reported.
+
+    Limits of user requests are kept per authorization token, since each user is limited
+    separately.
+
+    Args:
+        retries: Number of times a rate limited request is retried.
+        max_wait: Seconds a request can wait for rate limits before giving up.
+
+    Attributes:
+        retries (int): Number of times a rate limited request is retried.
+        max_wait (float): Seconds a request can wait for rate limits before giving up.
+
+    """
+    def __init__(
+        self,
+        retries: int = RATE_LIMIT_RETRIES,
+        max_wait: float = RATE_LIMIT_MAX_WAIT
+    ) -> None:
+        self.retries = retries
+        self.max_wait = max_wait
+        self._buckets: "collections.OrderedDict[Tuple[str, str, str], _Bucket]" = (
+            collections.OrderedDict()
+        )
+        self._global_reset = 0.0
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Dict[str, str],
+        data: Optional[Dict[str, str]] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None
+    ) -> uita.http_client.Response:
+        """Sends a Discord API request once rate limits allow it.
+
+        Args:
+            method: HTTP method, such as ``"GET"``.
+            url: URL to request.
+            headers: HTTP headers to send.
+            data: Form data to send in the request body.
+            loop: Event loop that the request runs in.
+
+        Returns:
+            Response to the request. Status is 429 if the request stayed rate limited.
+
+        Raises:
+            uita.exceptions.HTTPError: If the request could not be completed.
+
+        """
+        loop = loop or asyncio.get_event_loop()
+        bucket = self._get_bucket((method, url, headers.get("Authorization", "")))
+        deadline = loop.time() + self.max_wait
+        for attempt in range(self.retries + 1):
+            if not await self._acquire(bucket, deadline, loop):
+                break
+            try:
+                response = await uita.http_client.client.request(
+                    method, url, headers=headers, data=data, loop=loop
+                )
+                now = loop.time()
+                bucket.update(response.headers, now)
+            finally:
+                bucket.release()
+            if response.status != 429:
+                return response
+            retry_after = self._retry_after(response)
+            if self._is_global(response):
+                self._global_reset = max(self._global_reset, now + retry_after)
+            else:
+                bucket.remaining = 0
+                bucket.reset = max(bucket.reset, now + retry_after)
+        return uita.http_client.Response(429, None)
+
+    def _get_bucket(self, key: Tuple[str, str, str]) -> _Bucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = _Bucket()
+            # Forgetting a bucket only costs a possible 429, so keep the table bounded
+            if len(self._buckets) > RATE_LIMIT_MAX_BUCKETS:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket
+
+    async def _acquire(
+        self,
+        bucket: _Bucket,
+        deadline: float,
+        loop: asyncio.AbstractEventLoop
+    ) -> bool:
+        while True:
+            now = loop.time()
+            if self._global_reset > now:
+                if self._global_reset > deadline:
+                    return False
+                await asyncio.sleep(self._global_reset - now, loop=loop)
+                continue
+            if bucket.remaining is not None and bucket.reset <= now:
+                # Refill the bucket once its window expires, the next response reports when the
+                # new window resets
+                bucket.remaining = bucket.limit
+                bucket.reset = math.inf
+            if bucket.remaining is None:
+                # Limits are unknown until a response reports them, so only one request goes out
+                if bucket.pending is None:
+                    break
+            elif bucket.remaining > 0:
+                break
+            elif bucket.reset < math.inf:
+                if bucket.reset > deadline:
+                    return False
+                await asyncio.sleep(bucket.reset - now, loop=loop)
+                continue
+            elif bucket.pending is None:
+                bucket.release()
+                continue
+            # Wait for the response that reports the current window
+            try:
+                await asyncio.wait_for(asyncio.shield(bucket.pending), deadline - now, loop=loop)
+            except asyncio.TimeoutError:
+                return False
+        # Count the request in advance so concurrent requests space themselves out
+        if bucket.remaining is not None:
+            bucket.remaining -= 1
+        if bucket.pending is None and (bucket.remaining is None or bucket.reset == math.inf):
+            bucket.pending = loop.create_future()
+        return True
+
+    @staticmethod
+    def _retry_after(response: uita.http_client.Response) -> float:
+        if "Retry-After" in response.headers:
+            try:
+                return float(response.headers["Retry-After"])
+            except ValueError:
+                pass
+        if isinstance(response.data, dict) and "retry_after" in response.data:
+            try:
+                # API v6 reports retry_after in milliseconds
+                return float(response.data["retry_after"]) / 1000
+            except (TypeError, ValueError):
+                pass
+        return 1.0
+
+    @staticmethod
+    def _is_global(response: uita.http_client.Response) -> bool:
+        if response.headers.get("X-RateLimit-Global", "").lower() == "true":
+            return True
+        return isinstance(response.data, dict) and response.data.get("global") is True
+
+
+rate_limiter = RateLimiter()
+"""Rate limiter shared by Discord API requests."""
 
 
 async def auth(
@@ -32,16 +243,17 @@ async def auth(
     Args:
         code: Access code presented by redirect URI. Must be alphanumeric.
         config: Configuration options containing API keys.
-        loop: Event loop to attach blocking request threads to.
+        loop: Event loop that the request runs in.
 
     Returns:
         JSON decoded token data of authenticated user.
 
     Raises:
         uita.exceptions.AuthenticationError: If code is invalid.
+        uita.exceptions.AuthenticationUnavailable: If the Discord API can't be reached or is
+            rate limiting requests.
 
     """
-    loop = loop or asyncio.get_event_loop()
     # Since these are passed by the client, sanitize to expected format
     if VALID_CODE_REGEX.match(code) is None:
         raise uita.exceptions.AuthenticationError("Passed an invalidly formatted auth code")
@@ -52,18 +264,10 @@ async def auth(
         "client_secret": config.discord.client.secret,
         "redirect_uri": uita.utils.build_client_url(config)
     }
-    # requests is not asynchronous, so run in another thread and await it
-    response = await loop.run_in_executor(
-        None,
-        lambda: requests.post(
-            AUTH_URL,
-            data=data,
-            headers=BASE_HEADERS
-        )
-    )
-    if response.status_code != 200:
+    response = await _request("POST", AUTH_URL, dict(BASE_HEADERS), data, loop)
+    if response.status != 200:
         raise uita.exceptions.AuthenticationError("Passed an incorrect auth code")
-    return cast(Dict[str, Any], response.json())
+    return cast(Dict[str, Any], response.data)
 
 
 async def get(
@@ -76,29 +280,45 @@ async def get(
     Args:
         end_point: Discord API end point to access.
         token: User authorization token for the Discord API.
-        loop: Event loop to attach blocking request threads to.
+        loop: Event loop that the request runs in.
 
     Returns:
         JSON decoded data of the requested object.
 
     Raises:
         uita.exceptions.AuthenticationError: If request is invalid.
+        uita.exceptions.AuthenticationUnavailable: If the Discord API can't be reached or is
+            rate limiting requests.
 
     """
-    loop = loop or asyncio.get_event_loop()
-    headers = BASE_HEADERS.copy()
+    headers = dict(BASE_HEADERS)
     headers["Authorization"] = f"Bearer {token}"
-    # requests is not asynchronous, so run in another thread and await it
-    response = await loop.run_in_executor(
-        None,
-        lambda: requests.get(
-            BASE_URL + end_point,
-            headers=headers
-        )
-    )
-    if response.status_code != 200:
+    response = await _request("GET", BASE_URL + end_point, headers, None, loop)
+    if response.status != 200:
         raise uita.exceptions.AuthenticationError("Made an invalid Discord API request")
-    return cast(Dict[str, Any], response.json())
+    return cast(Dict[str, Any], response.data)
+
+
+async def _request(
+    method: str,
+    url: str,
+    headers: Dict[str, str],
+    data: Optional[Dict[str, str]],
+    loop: Optional[asyncio.AbstractEventLoop]
+) -> uita.http_client.Response:
+    try:
+        response = await rate_limiter.request(method, url, headers, data, loop)
+    except uita.exceptions.HTTPError as error:
+        raise uita.exceptions.AuthenticationUnavailable(
+            f"Could not reach the Discord API: {error}"
+        )
+    if response.status == 429:
+        raise uita.exceptions.AuthenticationUnavailable("Discord API is rate limiting requests")
+    if response.status >= 500:
+        raise uita.exceptions.AuthenticationUnavailable(
+            f"Discord API responded with status {response.status}"
+        )
+    return response
 
 
 def avatar_url(user: Dict[str, Any]) -> str:
@@ -34,6 +34,23 @@ class AuthenticationError(Exception):
     pass
 
 
+class AuthenticationUnavailable(AuthenticationError):
+    """Occurs when authentication can't be completed because the Discord API is unavailable or
+        rate limiting requests. Unlike other authentication errors, credentials may still be
+        valid."""
+    pass
+
+
+class ExtractorStopped(Exception):
+    """Occurs when a youtube-dl worker process stops before replying to a request."""
+    pass
+
+
+class HTTPError(Exception):
+    """Occurs when an HTTP request to a REST API could not be completed."""
+    pass
+
+
 class MalformedConfig(Exception):
     """Occurs when a config file is malformed."""
     pass
@@ -0,0 +1,109 @@
+"""Pooled async HTTP client shared by REST API requests."""
+import aiohttp
+import asyncio
+from typing import Any, Dict, Mapping, NamedTuple, Optional
+from typing_extensions import Final
+
+import uita.exceptions
+
+
+# Client config definitions
+LIMIT_PER_HOST: Final = 8
+TIMEOUT: Final = 15.0
+
+
+class Response(NamedTuple):
+    """Completed HTTP response.
+
+    Attributes:
+        status (int): HTTP status code.
+        data (Any): JSON decoded response body. ``None`` if the body is not JSON.
+        headers (Mapping[str, str]): Response headers, case-insensitive when returned by
+            :class:`~uita.http_client.HTTPClient`.
+
+    """
+    status: int
+    data: Any
+    headers: Mapping[str, str] = {}
+
+
+class HTTPClient():
+    """Keeps connections to REST APIs alive between requests.
+
+    Consecutive requests to the same host reuse an open connection instead of repeating the TCP
+    and TLS handshakes. The underlying ``aiohttp`` session is bound to an event loop, and is
+    created on first use.
+
+    Args:
+        limit_per_host: Maximum number of open connections to each host.
+        timeout: Seconds a request can take, including reading the response.
+
+    Attributes:
+        limit_per_host (int): Maximum number of open connections to each host.
+        timeout (float): Seconds a request can take, including reading the response.
+
+    """
+    def __init__(self, limit_per_host: int = LIMIT_PER_HOST, timeout: float = TIMEOUT) -> None:
+        self.limit_per_host = limit_per_host
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        headers: Optional[Dict[str, str]] = None,
+        data: Optional[Dict[str, str]] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None
+    ) -> Response:
+        """Sends an HTTP request.
+
+        Args:
+            method: HTTP method, such as ``"GET"``.
+            url: URL to request.
+            headers: HTTP headers to send.
+            data: Form data to send in the request body.
+            loop: Event loop that the request runs in.
+
+        Returns:
+            Status, JSON decoded body and headers of the response.
+
+        Raises:
+            uita.exceptions.HTTPError: If the request could not be completed.
+
+        """
+        session = self._get_session(loop or asyncio.get_event_loop())
+        try:
+            async with session.request(method, url, headers=headers, data=data) as response:
+                try:
+                    body = await response.json(content_type=None)
+                except ValueError:
+                    body = None
+                return Response(response.status, body, response.headers)
+        except (aiohttp.ClientError, asyncio.TimeoutError) as error:
+            raise uita.exceptions.HTTPError(f"{method} {url} failed: {error!r}")
+
+    async def close(self) -> None:
+        """Closes all open connections."""
+        if self._session is not None:
+            await self._session.close()
+        self._session = None
+        self._loop = None
+
+    def _get_session(self, loop: asyncio.AbstractEventLoop) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed or self._loop is not loop:
+            # Sessions of other event loops can only be closed from their own loop
+            if self._session is not None and self._loop is not None and self._loop.is_closed():
+                self._session.detach()
+            self._loop = loop
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit_per_host=self.limit_per_host, loop=loop),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+                loop=loop
+            )
+        return self._session
+
+
+client = HTTPClient()
+"""Client used for Discord and YouTube API requests."""
@@ -1,26 +1,71 @@
 """Builds and parses messages for websocket API."""
 import json
 import math
-from typing import Dict, List, Optional, Tuple, Type
+import msgpack
+import re
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
 from typing_extensions import Final
 
 import uita.exceptions
 import uita.types
 
+# Use a faster JSON encoder when one is installed, they all produce interchangeable JSON
+try:
+    import orjson
+    _json_encoder = "orjson"
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode("utf-8")
+except ImportError:
+    try:
+        import ujson
+        _json_encoder = "ujson"
+
+        def _json_dumps(obj: Any) -> str:
+            return ujson.dumps(obj)
+    except ImportError:
+        _json_encoder = "json"
+
+        def _json_dumps(obj: Any) -> str:
+            return json.dumps(obj)
+
 
 class AbstractMessage():
     """Abstract base class for websocket messaging API.
 
+    Subclasses list their properties in ``__slots__``, which is also the order they are
+    serialized in.
+
     Attributes:
         header (str): Header defining message type
 
     """
     header: str = ""
+    __slots__: Tuple[str, ...] = ()
 
     def __str__(self) -> str:
         """Serializes self to JSON encoded message object for network transfer"""
-        # Appends header to self.__dict__ serialization because it is a class level attribute
-        return json.dumps(dict({"header": self.header}, **self.__dict__))
+        return _json_dumps(self._serializable())
+
+    def __bytes__(self) -> bytes:
+        """Serializes self to MessagePack encoded message object for network transfer"""
+        return msgpack.packb(self._serializable(), use_bin_type=True)
+
+    def properties(self) -> Dict[str, Any]:
+        """Collects message properties.
+
+        Returns:
+            Message properties keyed by name, not including the header.
+
+        """
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def _serializable(self) -> Dict[str, Any]:
+        # Header is added because it is a class level attribute
+        serializable = {"header": self.header}
+        for name in self.__slots__:
+            serializable[name] = getattr(self, name)
+        return serializable
 
 
 class AuthCodeMessage(AbstractMessage):
@@ -34,6 +79,7 @@ class AuthCodeMessage(AbstractMessage):
     """
     header = "auth.code"
     """"""
+    __slots__ = ("code",)
 
     def __init__(self, code: str) -> None:
         self.code = str(code)
@@ -43,6 +89,7 @@ class AuthFailMessage(AbstractMessage):
     """Sent by server when authentication fails."""
     header = "auth.fail"
     """"""
+    __slots__ = ()
 
 
 class AuthSessionMessage(AbstractMessage):
@@ -59,6 +106,7 @@ class AuthSessionMessage(AbstractMessage):
     """
     header = "auth.session"
     """"""
+    __slots__ = ("handle", "secret")
 
     def __init__(self, handle: str, secret: str) -> None:
         self.handle = str(handle)
@@ -83,6 +131,7 @@ class AuthSucceedMessage(AbstractMessage):
     """
     header = "auth.succeed"
     """"""
+    __slots__ = ("user", "session")
 
     def __init__(self, user: uita.types.DiscordUser, session: "uita.auth.Session") -> None:
         self.user = {
@@ -100,6 +149,7 @@ class ChannelActiveGetMessage(AbstractMessage):
     """Sent by client requesting the currently connected voice channel."""
     header = "channel.active.get"
     """"""
+    __slots__ = ()
 
 
 class ChannelActiveSendMessage(AbstractMessage):
@@ -115,6 +165,7 @@ class ChannelActiveSendMessage(AbstractMessage):
     """
     header = "channel.active.send"
     """"""
+    __slots__ = ("channel",)
 
     def __init__(self, channel: Optional[uita.types.DiscordChannel]) -> None:
         self.channel = {
@@ -136,6 +187,7 @@ class ChannelJoinMessage(AbstractMessage):
     """
     header = "channel.join"
     """"""
+    __slots__ = ("channel_id",)
 
     def __init__(self, channel_id: str) -> None:
         self.channel_id = str(channel_id)
@@ -149,12 +201,14 @@ class ChannelLeaveMessage(AbstractMessage):
     """Sent by client containing when leaving a channel."""
     header = "channel.leave"
     """"""
+    __slots__ = ()
 
 
 class ChannelListGetMessage(AbstractMessage):
     """Sent by client requesting a list of every channel the bot can connect to."""
     header = "channel.list.get"
     """"""
+    __slots__ = ()
 
 
 class ChannelListSendMessage(AbstractMessage):
@@ -169,6 +223,7 @@ class ChannelListSendMessage(AbstractMessage):
     """
     header = "channel.list.send"
     """"""
+    __slots__ = ("channels",)
 
     def __init__(self, channels: List[uita.types.DiscordChannel]) -> None:
         self.channels = [{
@@ -192,6 +247,7 @@ class ErrorFileInvalidMessage(AbstractMessage):
     """
     header = "error.file.invalid"
     """"""
+    __slots__ = ("error",)
 
     def __init__(self, error: str) -> None:
         self.error = error
@@ -201,12 +257,14 @@ class ErrorQueueFullMessage(AbstractMessage):
     """Sent when a requested URL cannot be played."""
     header = "error.queue.full"
     """"""
+    __slots__ = ()
 
 
 class ErrorUrlInvalidMessage(AbstractMessage):
     """Sent when a requested URL cannot be played."""
     header = "error.url.invalid"
     """"""
+    __slots__ = ()
 
 
 class FileUploadStartMessage(AbstractMessage):
@@ -221,6 +279,7 @@ class FileUploadStartMessage(AbstractMessage):
     """
     header = "file.upload.start"
     """"""
+    __slots__ = ("size",)
 
     def __init__(self, size: int) -> None:
         self.size = int(size)
@@ -230,18 +289,45 @@ class FileUploadCompleteMessage(AbstractMessage):
     """Sent by server signaling a completed file upload"""
     header = "file.upload.complete"
     """"""
+    __slots__ = ()
 
 
 class HeartbeatMessage(AbstractMessage):
     """Sent by client every 60 seconds to keep connection alive."""
     header = "heartbeat"
     """"""
+    __slots__ = ()
 
 
 class PlayQueueGetMessage(AbstractMessage):
     """Sent by client requesting playback queue state."""
     header = "play.queue.get"
     """"""
+    __slots__ = ()
+
+
+class PlayQueueInsertSendMessage(AbstractMessage):
+    """Sent by server when tracks are added to the playback queue.
+
+    Args:
+        version: Queue version produced by this change.
+        position: Queue index that the tracks were inserted at.
+        tracks: Inserted tracks, in queue order.
+
+    Attributes:
+        version (int): Queue version produced by this change.
+        position (int): Queue index that the tracks were inserted at.
+        tracks (List[uita.audio.Track]): Inserted tracks, in queue order.
+
+    """
+    header = "play.queue.insert.send"
+    """"""
+    __slots__ = ("version", "position", "tracks")
+
+    def __init__(self, version: int, position: int, tracks: List[uita.audio.Track]) -> None:
+        self.version = version
+        self.position = position
+        self.tracks = [_track_dict(track) for track in tracks]
 
 
 class PlayQueueMoveMessage(AbstractMessage):
@@ -258,6 +344,7 @@ class PlayQueueMoveMessage(AbstractMessage):
     """
     header = "play.queue.move"
     """"""
+    __slots__ = ("id", "position")
 
     def __init__(self, id: str, position: int) -> None:
         self.id = str(id)
@@ -268,6 +355,51 @@ class PlayQueueMoveMessage(AbstractMessage):
             raise uita.exceptions.MalformedMessage("Track position is less than 0")
 
 
+class PlayQueueMoveSendMessage(AbstractMessage):
+    """Sent by server when a track is moved to a new position in the playback queue.
+
+    Args:
+        version: Queue version produced by this change.
+        id: ID of track that was moved.
+        position: Queue index that the track was moved to.
+
+    Attributes:
+        version (int): Queue version produced by this change.
+        id (str): ID of track that was moved.
+        position (int): Queue index that the track was moved to.
+
+    """
+    header = "play.queue.move.send"
+    """"""
+    __slots__ = ("version", "id", "position")
+
+    def __init__(self, version: int, id: str, position: int) -> None:
+        self.version = version
+        self.id = id
+        self.position = position
+
+
+class PlayQueuePlaySendMessage(AbstractMessage):
+    """Sent by server when the first track in the playback queue starts playing.
+
+    Args:
+        version: Queue version produced by this change.
+        track: Track that started playing, with its current playback offset.
+
+    Attributes:
+        version (int): Queue version produced by this change.
+        track (uita.audio.Track): Track that started playing, with its current playback offset.
+
+    """
+    header = "play.queue.play.send"
+    """"""
+    __slots__ = ("version", "track")
+
+    def __init__(self, version: int, track: uita.audio.Track) -> None:
+        self.version = version
+        self.track = _track_dict(track)
+
+
 class PlayQueueRemoveMessage(AbstractMessage):
     """Sent by client containing track ID to be removed.
 
@@ -280,6 +412,7 @@ class PlayQueueRemoveMessage(AbstractMessage):
     """
     header = "play.queue.remove"
     """"""
+    __slots__ = ("id",)
 
     def __init__(self, id: str) -> None:
         self.id = str(id)
@@ -287,35 +420,97 @@ class PlayQueueRemoveMessage(AbstractMessage):
             raise uita.exceptions.MalformedMessage("Track ID exceeds max possible length")
 
 
+class PlayQueueRemoveSendMessage(AbstractMessage):
+    """Sent by server when a track is removed from the playback queue.
+
+    Args:
+        version: Queue version produced by this change.
+        id: ID of track that was removed.
+
+    Attributes:
+        version (int): Queue version produced by this change.
+        id (str): ID of track that was removed.
+
+    """
+    header = "play.queue.remove.send"
+    """"""
+    __slots__ = ("version", "id")
+
+    def __init__(self, version: int, id: str) -> None:
+        self.version = version
+        self.id = id
+
+
 class PlayQueueSendMessage(AbstractMessage):
     """Sent by server containing playback queue state.
 
+    Clients only receive this when requesting the queue, after that they are kept up to date by
+    messages describing each change. Every change increments the queue version by one, so a
+    client that sees a version gap has missed a change and should request the queue again.
+
     Args:
         queue: List of tracks that are currently queued.
+        version: Queue version that this state belongs to.
 
     Attributes:
         queue (List[uita.audio.Track]): List of tracks that are currently queued.
+        version (int): Queue version that this state belongs to.
 
     """
     header = "play.queue.send"
     """"""
-
-    def __init__(self, queue: List[uita.audio.Track]) -> None:
-        self.queue = [{
-            "id": track.id,
-            "url": track.url or "",
-            "title": track.title,
-            "duration": track.duration,
-            "live": track.live,
-            "thumbnail": track.user.avatar,
-            "offset": track.offset
-        } for track in queue]
+    __slots__ = ("queue", "version")
+
+    def __init__(self, queue: List[uita.audio.Track], version: int) -> None:
+        self.queue = [_track_dict(track) for track in queue]
+        self.version = version
+
+    @classmethod
+    def serialize(
+        cls,
+        snapshot: uita.audio.QueueSnapshot,
+        subprotocol: Optional[str] = None
+    ) -> Union[str, bytes]:
+        """Serializes a queue snapshot the same way as ``encode(PlayQueueSendMessage(...))``.
+
+        Every track but the first is only encoded once per snapshot, the first track is encoded
+        on every call because its playback offset keeps changing while it plays.
+
+        Args:
+            snapshot: Snapshot of the queue to be sent.
+            subprotocol: Websocket subprotocol to encode for, see :func:`~uita.message.encode`.
+
+        Returns:
+            JSON or MessagePack encoded message.
+
+        """
+        if subprotocol == MSGPACK_SUBPROTOCOL:
+            packer = msgpack.Packer(use_bin_type=True)
+            packed = [
+                packer.pack_map_header(3),
+                packer.pack("header"), packer.pack(cls.header),
+                packer.pack("queue"), packer.pack_array_header(len(snapshot))
+            ]
+            if len(snapshot) > 0:
+                packed.append(packer.pack(_track_dict(snapshot.track(0))))
+                packed.extend(_pack_tracks(snapshot))
+            packed.extend((packer.pack("version"), packer.pack(snapshot.version)))
+            return b"".join(packed)
+        tracks: List[str] = []
+        if len(snapshot) > 0:
+            tracks.append(_json_dumps(_track_dict(snapshot.track(0))))
+            tracks.extend(_serialize_tracks(snapshot))
+        return (
+            f'{{"header": {_json_dumps(cls.header)}, "queue": [{", ".join(tracks)}], '
+            f'"version": {snapshot.version}}}'
+        )
 
 
 class PlayStatusGetMessage(AbstractMessage):
     """Sent by client requesting current playback status."""
     header = "play.status.get"
     """"""
+    __slots__ = ()
 
 
 class PlayStatusSendMessage(AbstractMessage):
@@ -330,6 +525,7 @@ class PlayStatusSendMessage(AbstractMessage):
     """
     header = "play.status.send"
     """"""
+    __slots__ = ("status",)
 
     def __init__(self, status: uita.audio.Status) -> None:
         self.status = status
@@ -347,6 +543,7 @@ class PlayURLMessage(AbstractMessage):
     """
     header = "play.url"
     """"""
+    __slots__ = ("url",)
 
     def __init__(self, url: str) -> None:
         self.url = str(url)
@@ -366,6 +563,7 @@ class ServerJoinMessage(AbstractMessage):
     """
     header = "server.join"
     """"""
+    __slots__ = ("server_id",)
 
     def __init__(self, server_id: str) -> None:
         self.server_id = str(server_id)
@@ -379,28 +577,34 @@ class ServerKickMessage(AbstractMessage):
     """Sent by server when user can no longer access their current Discord server.."""
     header = "server.kick"
     """"""
+    __slots__ = ()
 
 
 class ServerListGetMessage(AbstractMessage):
     """Sent by client requesting a list of every server it can connect to."""
     header = "server.list.get"
     """"""
+    __slots__ = ()
 
 
 class ServerListSendMessage(AbstractMessage):
     """Sent by server containing a list of every server a user can connect to.
 
     Args:
-        servers: List of servers to connect to.
+        servers: List of servers or server summaries to connect to.
 
     Attributes:
-        servers (List[uita.types.DiscordServer]): List of servers to connect to.
+        servers (List[Dict[str, Any]]): List of servers to connect to.
 
     """
     header = "server.list.send"
     """"""
+    __slots__ = ("servers",)
 
-    def __init__(self, servers: List[uita.types.DiscordServer]) -> None:
+    def __init__(
+        self,
+        servers: Sequence[Union[uita.types.DiscordServer, uita.types.DiscordServerSummary]]
+    ) -> None:
         self.servers = [{
             "id": server.id,
             "name": server.name,
@@ -408,6 +612,48 @@ class ServerListSendMessage(AbstractMessage):
         } for server in servers]
 
 
+class ServerStateSendMessage(AbstractMessage):
+    """Sent by server after joining a Discord server, containing everything the dashboard shows.
+
+    Saves the client from requesting each part of the server state separately, the fields match
+    :class:`~uita.message.ChannelListSendMessage`, :class:`~uita.message.ChannelActiveSendMessage`,
+    :class:`~uita.message.PlayQueueSendMessage` and :class:`~uita.message.PlayStatusSendMessage`.
+
+    Args:
+        channels: List of channels to connect to.
+        channel: Voice channel currently connected to. ``None`` if not connected.
+        queue: List of tracks that are currently queued.
+        version: Queue version that this state belongs to.
+        status: Enum of current playback status.
+
+    Attributes:
+        channels (List[uita.types.DiscordChannel]): List of channels to connect to.
+        channel (Optional[uita.types.DiscordChannel]): Voice channel currently connected to.
+            ``None`` if not connected.
+        queue (List[uita.audio.Track]): List of tracks that are currently queued.
+        version (int): Queue version that this state belongs to.
+        status (uita.audio.Status): Enum of current playback status.
+
+    """
+    header = "server.state.send"
+    """"""
+    __slots__ = ("channels", "channel", "queue", "version", "status")
+
+    def __init__(
+        self,
+        channels: List[uita.types.DiscordChannel],
+        channel: Optional[uita.types.DiscordChannel],
+        queue: List[uita.audio.Track],
+        version: int,
+        status: uita.audio.Status
+    ) -> None:
+        self.channels = ChannelListSendMessage(channels).channels
+        self.channel = ChannelActiveSendMessage(channel).channel
+        self.queue = [_track_dict(track) for track in queue]
+        self.version = version
+        self.status = status
+
+
 # Dictionary for validating message data provided by clients
 VALID_MESSAGES: Final[Dict[str, Tuple[Type[AbstractMessage], List[str]]]] = {
     AuthCodeMessage.header: (AuthCodeMessage, ["code"]),
@@ -427,18 +673,114 @@ VALID_MESSAGES: Final[Dict[str, Tuple[Type[AbstractMessage], List[str]]]] = {
     FileUploadCompleteMessage.header: (FileUploadCompleteMessage, []),
     HeartbeatMessage.header: (HeartbeatMessage, []),
     PlayQueueGetMessage.header: (PlayQueueGetMessage, []),
+    PlayQueueInsertSendMessage.header: (
+        PlayQueueInsertSendMessage, ["version", "position", "tracks"]
+    ),
     PlayQueueMoveMessage.header: (PlayQueueMoveMessage, ["id", "position"]),
+    PlayQueueMoveSendMessage.header: (PlayQueueMoveSendMessage, ["version", "id", "position"]),
+    PlayQueuePlaySendMessage.header: (PlayQueuePlaySendMessage, ["version", "track"]),
     PlayQueueRemoveMessage.header: (PlayQueueRemoveMessage, ["id"]),
-    PlayQueueSendMessage.header: (PlayQueueSendMessage, ["queue"]),
+    PlayQueueRemoveSendMessage.header: (PlayQueueRemoveSendMessage, ["version", "id"]),
+    PlayQueueSendMessage.header: (PlayQueueSendMessage, ["queue", "version"]),
     PlayStatusGetMessage.header: (PlayStatusGetMessage, []),
     PlayStatusSendMessage.header: (PlayStatusSendMessage, ["status"]),
     PlayURLMessage.header: (PlayURLMessage, ["url"]),
     ServerJoinMessage.header: (ServerJoinMessage, ["server_id"]),
     ServerKickMessage.header: (ServerKickMessage, []),
     ServerListGetMessage.header: (ServerListGetMessage, []),
-    ServerListSendMessage.header: (ServerListSendMessage, ["servers"])
+    ServerListSendMessage.header: (ServerListSendMessage, ["servers"]),
+    ServerStateSendMessage.header: (
+        ServerStateSendMessage, ["channels", "channel", "queue", "version", "status"]
+    )
+}
+
+# Decoded types accepted for every property in VALID_MESSAGES, anything else is rejected before
+# constructing a message. JSON numbers are decoded as strings. Properties only sent by the server
+# are accepted in their encoded form, but their constructors expect Discord and queue objects
+_PROPERTY_TYPES: Final[Dict[str, Tuple[type, ...]]] = {
+    "channel": (dict, type(None)),
+    "channel_id": (str, int),
+    "channels": (list,),
+    "code": (str,),
+    "error": (str,),
+    "handle": (str, int),
+    "id": (str, int),
+    "position": (str, int),
+    "queue": (list,),
+    "secret": (str,),
+    "server_id": (str, int),
+    "servers": (list,),
+    "session": (dict,),
+    "size": (str, int),
+    "status": (str, int),
+    "track": (dict,),
+    "tracks": (list,),
+    "url": (str,),
+    "user": (dict,),
+    "version": (str, int)
 }
 
+_Validator = Callable[[Dict[str, Any]], AbstractMessage]
+
+
+def _compile_validator(message_type: Type[AbstractMessage], properties: List[str]) -> _Validator:
+    """Builds a function that validates decoded message properties and constructs the message.
+
+    Property types are checked up front, while value and length limits are enforced by the
+    message constructor.
+
+    Raises:
+        KeyError: If a property has no entry in ``_PROPERTY_TYPES``.
+
+    """
+    if len(properties) == 0:
+        def validate_constant(msg: Dict[str, Any]) -> AbstractMessage:
+            return message_type()
+        return validate_constant
+
+    checks = tuple((name, _PROPERTY_TYPES[name]) for name in properties)
+
+    def validate(msg: Dict[str, Any]) -> AbstractMessage:
+        args = []
+        for name, types in checks:
+            if name not in msg:
+                raise uita.exceptions.MalformedMessage(f"Missing {name} property")
+            value = msg[name]
+            if not isinstance(value, types):
+                raise uita.exceptions.MalformedMessage(f"Invalid {name} property")
+            args.append(value)
+        try:
+            # Use a type: ignore because the arguments are only known at run time
+            return message_type(*args)  # type: ignore
+        except (AttributeError, TypeError, ValueError):
+            raise uita.exceptions.MalformedMessage("Invalid property values")
+    return validate
+
+
+_VALIDATORS: Final[Dict[str, _Validator]] = {
+    header: _compile_validator(message_type, properties)
+    for header, (message_type, properties) in VALID_MESSAGES.items()
+}
+
+# Finds the header of a JSON message without decoding it, so that unknown message types are
+# rejected cheaply. Escaped headers are left for the full decode to validate
+_JSON_HEADER_PATTERN: Final = re.compile(r'"header"\s*:\s*"([^"\\]*)"')
+
+# Numbers are kept as strings since IDs exceed the precision of JSON numbers in the web client.
+# json.loads builds a new decoder for every call given these options, so one is shared instead
+_JSON_DECODER: Final = json.JSONDecoder(parse_int=str, parse_float=str)
+
+# Messages without properties always encode the same way, so their frames are only built once
+_CONSTANT_FRAMES: Final[Dict[Type[AbstractMessage], Tuple[str, bytes]]] = {
+    message_type: (str(message_type()), bytes(message_type()))
+    for message_type, properties in VALID_MESSAGES.values()
+    if len(properties) == 0
+}
+
+# Websocket subprotocol for MessagePack encoded messages, connections without one use JSON
+MSGPACK_SUBPROTOCOL: Final = "uita.msgpack"
+SUBPROTOCOLS: Final = [MSGPACK_SUBPROTOCOL]
+
 # Mild length sanitization on any input that is used for indexing
 MAX_CLIENT_MESSAGE_LENGTH: Final = 5000
 MAX_DIGITS_64BIT: Final = math.ceil(64 * math.log10(2))  # 64 * log 2 = log (2^64)
@@ -448,11 +790,34 @@ MAX_TRACK_ID_LENGTH: Final = 32
 MAX_URL_LENGTH: Final = 2000
 
 
-def parse(message: str) -> AbstractMessage:
+def encode(message: AbstractMessage, subprotocol: Optional[str] = None) -> Union[str, bytes]:
+    """Serializes a message for the websocket subprotocol a client negotiated.
+
+    Args:
+        message: Message to be serialized.
+        subprotocol: Subprotocol of the receiving websocket. MessagePack is used for
+            :data:`~uita.message.MSGPACK_SUBPROTOCOL`, anything else uses JSON.
+
+    Returns:
+        MessagePack encoded bytes or JSON encoded string.
+
+    """
+    frames = _CONSTANT_FRAMES.get(type(message))
+    if frames is not None:
+        return frames[1] if subprotocol == MSGPACK_SUBPROTOCOL else frames[0]
+    if subprotocol == MSGPACK_SUBPROTOCOL:
+        return bytes(message)
+    return str(message)
+
+
+def parse(message: Union[str, bytes]) -> AbstractMessage:
     """Parse and validate raw message strings.
 
+    Text frames are decoded as JSON and binary frames as MessagePack, regardless of the
+    negotiated subprotocol.
+
     Args:
-        message: JSON encoded message to be parsed.
+        message: JSON or MessagePack encoded message to be parsed.
 
     Returns:
         A subclass of :class:`~uita.message.AbstractMessage` containing a header and associated
@@ -463,29 +828,65 @@ def parse(message: str) -> AbstractMessage:
     """
     if len(message) > MAX_CLIENT_MESSAGE_LENGTH:
         raise uita.exceptions.MalformedMessage("Message exceeded maximum length")
-    try:
-        msg = json.loads(message, parse_int=str, parse_float=str)
-    except (json.JSONDecodeError, TypeError):
-        raise uita.exceptions.MalformedMessage("Expected JSON encoded object")
+    if isinstance(message, bytes):
+        try:
+            msg = msgpack.unpackb(message, raw=False)
+        except (ValueError, TypeError):
+            raise uita.exceptions.MalformedMessage("Expected MessagePack encoded object")
+        if not isinstance(msg, dict):
+            raise uita.exceptions.MalformedMessage("Expected MessagePack encoded object")
+    else:
+        match = _JSON_HEADER_PATTERN.search(message)
+        if match is not None and match.group(1) not in _VALIDATORS:
+            raise uita.exceptions.MalformedMessage("Invalid header")
+        try:
+            msg = _JSON_DECODER.decode(message)
+        except (json.JSONDecodeError, TypeError):
+            raise uita.exceptions.MalformedMessage("Expected JSON encoded object")
+        if not isinstance(msg, dict):
+            raise uita.exceptions.MalformedMessage("Expected JSON encoded object")
 
     # Ensure message header exists and is properly formatted
-    if "header" not in msg or not isinstance(msg["header"], str) or not len(msg["header"]):
+    header = msg.get("header")
+    if not isinstance(header, str) or len(header) == 0:
         raise uita.exceptions.MalformedMessage("Has no header property")
-    if len(msg["header"]) > MAX_HEADER_LENGTH:
+    if len(header) > MAX_HEADER_LENGTH:
         raise uita.exceptions.MalformedMessage("Header exceeds maximum length")
 
-    try:
-        header = msg["header"]
-        # Validate that all the required properties for a given message type are here
-        for prop in VALID_MESSAGES[header][1]:
-            if prop not in msg:
-                raise uita.exceptions.MalformedMessage(f"Missing {prop} property")
-        # Construct a message directly with the JSON decoded dictionary
-        # Header is hardcoded in and constructor will not accept it
-        del msg["header"]
-        # Use a type: ignore because VALID_MESSAGES is a dict making it invariant.
-        # We use run time checks to ensure our arguments match the constructor params, but that
-        # can't be statically verified
-        return VALID_MESSAGES[header][0](**msg)  # type: ignore
-    except KeyError:
+    validator = _VALIDATORS.get(header)
+    if validator is None:
         raise uita.exceptions.MalformedMessage("Invalid header")
+    return validator(msg)
+
+
+def _track_dict(track: uita.audio.Track) -> Dict[str, Any]:
+    return {
+        "id": track.id,
+        "url": track.url or "",
+        "title": track.title,
+        "duration": track.duration,
+        "live": track.live,
+        "thumbnail": track.user.avatar,
+        "offset": track.offset
+    }
+
+
+def _serialize_tracks(snapshot: uita.audio.QueueSnapshot) -> Tuple[str, ...]:
+    # Snapshots are immutable, so their encoded tracks can be shared by every client that
+    # requests the same queue. The first track is left out since its offset is applied lazily
+    encoded = snapshot.encoded_tracks.get("json")
+    if encoded is None:
+        encoded = snapshot.encoded_tracks["json"] = tuple(
+            _json_dumps(_track_dict(track)) for track in snapshot.tracks[1:]
+        )
+    return encoded
+
+
+def _pack_tracks(snapshot: uita.audio.QueueSnapshot) -> Tuple[bytes, ...]:
+    encoded = snapshot.encoded_tracks.get(MSGPACK_SUBPROTOCOL)
+    if encoded is None:
+        packer = msgpack.Packer(use_bin_type=True)
+        encoded = snapshot.encoded_tracks[MSGPACK_SUBPROTOCOL] = tuple(
+            packer.pack(_track_dict(track)) for track in snapshot.tracks[1:]
+        )
+    return encoded
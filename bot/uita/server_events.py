@@ -2,22 +2,24 @@
 import asyncio
 import os
 import uuid
+from typing import Union
 
 import uita
 import uita.message
 import uita.types
 import uita.utils
-from uita.ui_server import Event
+from uita.ui_server import Event, Query
 
 
-@uita.server.on_message(uita.message.ChannelActiveGetMessage)
-async def channel_active_get(event: Event[uita.message.ChannelActiveGetMessage]) -> None:
+@uita.server.on_query(uita.message.ChannelActiveGetMessage)
+def channel_active_get(query: Query) -> Union[str, bytes]:
     """Get the actively connected voice channel for a current server."""
-    # mypy doesn't (can't?) recognize that event.active_server is always safe to access when
-    # @on_message(require_active_server=True)
-    assert event.active_server is not None
-    voice = uita.state.voice_connections[event.active_server.id]
-    await event.socket.send(str(uita.message.ChannelActiveSendMessage(voice.active_channel)))
+    # mypy doesn't (can't?) recognize that query.active_server is always safe to access when
+    # @on_query(require_active_server=True)
+    assert query.active_server is not None
+    voice = uita.state.voice_connections[query.active_server.id]
+    message = uita.message.ChannelActiveSendMessage(voice.active_channel)
+    return uita.message.encode(message, query.subprotocol)
 
 
 @uita.server.on_message(uita.message.ChannelJoinMessage)
@@ -36,14 +38,15 @@ async def channel_leave(event: Event[uita.message.ChannelLeaveMessage]) -> None:
     await voice.disconnect()
 
 
-@uita.server.on_message(uita.message.ChannelListGetMessage)
-async def channel_list_get(event: Event[uita.message.ChannelListGetMessage]) -> None:
+@uita.server.on_query(uita.message.ChannelListGetMessage)
+def channel_list_get(query: Query) -> Union[str, bytes]:
     """Provide a list of available voice channels to client."""
-    assert event.active_server is not None
+    assert query.active_server is not None
     discord_channels = [
-        channel for channel in event.active_server.channels.values()
+        channel for channel in query.active_server.channels.values()
     ]
-    await event.socket.send(str(uita.message.ChannelListSendMessage(discord_channels)))
+    message = uita.message.ChannelListSendMessage(discord_channels)
+    return uita.message.encode(message, query.subprotocol)
 
 
 @uita.server.on_message(uita.message.FileUploadStartMessage, block=True)
@@ -79,7 +82,9 @@ async def file_upload_start(event: Event[uita.message.FileUploadStartMessage]) -
             bytes_read = 0
             while bytes_read < file_size:
                 # Return the original message to signal next file slice
-                await event.socket.send(str(event.message))
+                await event.socket.send(
+                    uita.message.encode(event.message, event.socket.subprotocol)
+                )
                 data = await asyncio.wait_for(event.socket.recv(), 30, loop=event.loop)
                 if isinstance(data, str):
                     raise uita.exceptions.MalformedFile("Non-binary data transferred unexpectedly")
@@ -96,42 +101,53 @@ async def file_upload_start(event: Event[uita.message.FileUploadStartMessage]) -
             os.remove(file_path)
             raise
         # Signal the successful file upload
-        await event.socket.send(str(uita.message.FileUploadCompleteMessage()))
+        message = uita.message.FileUploadCompleteMessage()
+        await event.socket.send(uita.message.encode(message, event.socket.subprotocol))
 
 
 @uita.server.on_message(uita.message.ServerJoinMessage, require_active_server=False)
 async def server_join(event: Event[uita.message.ServerJoinMessage]) -> None:
-    """Connect a user to the web client interface for a given Discord server."""
+    """Connect a user to the web client interface for a given Discord server.
+
+    Sends the state of the joined server right away, so the client doesn't have to request it.
+
+    """
     # Check that user has access to this server
     if (
         event.message.server_id in uita.state.servers and
         event.user.id in uita.state.servers[event.message.server_id].users
     ):
-        event.user.active_server_id = event.message.server_id
+        uita.server.set_active_server(event.user, event.message.server_id)
+        discord_server = uita.state.servers[event.message.server_id]
+        voice = uita.state.voice_connections[discord_server.id]
+        snapshot = voice.queue_snapshot()
+        message = uita.message.ServerStateSendMessage(
+            list(discord_server.channels.values()),
+            voice.active_channel,
+            snapshot.to_list(),
+            snapshot.version,
+            voice.status()
+        )
+        # Queued behind any broadcasts of the previous server, so they can't arrive after it
+        uita.server.send(message, event.socket)
     else:
-        event.user.active_server_id = None
-        await event.socket.send(str(uita.message.ServerKickMessage()))
+        uita.server.set_active_server(event.user, None)
+        uita.server.send(uita.message.ServerKickMessage(), event.socket)
 
 
-@uita.server.on_message(uita.message.ServerListGetMessage, require_active_server=False)
-async def server_list_get(event: Event[uita.message.ServerListGetMessage]) -> None:
+@uita.server.on_query(uita.message.ServerListGetMessage, require_active_server=False)
+def server_list_get(query: Query) -> Union[str, bytes]:
     """Provide a list of all servers that the user and uitabot share membership in."""
-    discord_servers = [
-        uita.types.DiscordServer(
-            discord_server.id, discord_server.name, {}, {}, discord_server.icon
-        )
-        for key, discord_server in uita.state.servers.items()
-        if event.user.id in discord_server.users
-    ]
-    await event.socket.send(str(uita.message.ServerListSendMessage(discord_servers)))
+    message = uita.message.ServerListSendMessage(uita.state.user_servers(query.user.id))
+    return uita.message.encode(message, query.subprotocol)
 
 
-@uita.server.on_message(uita.message.PlayQueueGetMessage)
-async def play_queue_get(event: Event[uita.message.PlayQueueGetMessage]) -> None:
+@uita.server.on_query(uita.message.PlayQueueGetMessage)
+def play_queue_get(query: Query) -> Union[str, bytes]:
     """Requests the queued playlist for the active server."""
-    assert event.active_server is not None
-    voice = uita.state.voice_connections[event.active_server.id]
-    await event.socket.send(str(uita.message.PlayQueueSendMessage(voice.queue())))
+    assert query.active_server is not None
+    voice = uita.state.voice_connections[query.active_server.id]
+    return uita.message.PlayQueueSendMessage.serialize(voice.queue_snapshot(), query.subprotocol)
 
 
 @uita.server.on_message(uita.message.PlayQueueMoveMessage)
@@ -150,12 +166,13 @@ async def play_queue_remove(event: Event[uita.message.PlayQueueRemoveMessage]) -
     await voice.remove(event.message.id)
 
 
-@uita.server.on_message(uita.message.PlayStatusGetMessage)
-async def play_status_get(event: Event[uita.message.PlayStatusGetMessage]) -> None:
+@uita.server.on_query(uita.message.PlayStatusGetMessage)
+def play_status_get(query: Query) -> Union[str, bytes]:
     """Requests the current playback status from the active server."""
-    assert event.active_server is not None
-    voice = uita.state.voice_connections[event.active_server.id]
-    await event.socket.send(str(uita.message.PlayStatusSendMessage(voice.status())))
+    assert query.active_server is not None
+    voice = uita.state.voice_connections[query.active_server.id]
+    message = uita.message.PlayStatusSendMessage(voice.status())
+    return uita.message.encode(message, query.subprotocol)
 
 
 @uita.server.on_message(uita.message.PlayURLMessage)
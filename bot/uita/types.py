@@ -1,9 +1,10 @@
 """Defines various container and running state types for the Discord API."""
 import asyncio
 import discord
-from typing import Dict, List, Optional
+from typing import Dict, List, NamedTuple, Optional
 
 import uita.audio
+import uita.config
 import uita.utils
 
 import logging
@@ -23,6 +24,11 @@ class DiscordState():
     def __init__(self) -> None:
         self.servers: Dict[str, DiscordServer] = {}
         self.voice_connections: Dict[str, DiscordVoiceClient] = {}
+        # Servers each user can access indexed by user ID, so server lists don't scan every server
+        self._user_servers: Dict[str, Dict[str, DiscordServerSummary]] = {}
+        # Required roles indexed by server ID, loaded from the database on first use and written
+        # through by server_set_role so permission checks don't query the database
+        self._roles: Optional[Dict[str, str]] = None
 
     def __str__(self) -> str:
         dump_str = f"DiscordState() {hash(self)}:\n"
@@ -37,12 +43,41 @@ class DiscordState():
     def _clear(self) -> None:
         self.servers = {}
         self.voice_connections = {}
-
-    def initialize_from_bot(self, bot: discord.Client) -> None:
+        self._user_servers = {}
+        self._roles = None
+
+    def _role_table(self) -> Dict[str, str]:
+        if self._roles is None:
+            self._roles = uita.server.database.get_server_roles()
+        return self._roles
+
+    def _index_server(self, server: "DiscordServer") -> None:
+        summary = DiscordServerSummary(server.id, server.name, server.icon)
+        for user_id in server.users:
+            self._user_servers.setdefault(user_id, {})[server.id] = summary
+
+    def _unindex_server(self, server: "DiscordServer") -> None:
+        for user_id in server.users:
+            self._unindex_user(server.id, user_id)
+
+    def _unindex_user(self, server_id: str, user_id: str) -> None:
+        user_servers = self._user_servers.get(user_id)
+        if user_servers is None:
+            return
+        user_servers.pop(server_id, None)
+        if not user_servers:
+            del self._user_servers[user_id]
+
+    def initialize_from_bot(
+        self,
+        bot: discord.Client,
+        config: Optional[uita.config.Config] = None
+    ) -> None:
         """Initialize Discord state from a ``discord.Client``
 
         Args:
             bot: Bot containing initial Discord state to copy.
+            config: Configuration options for voice connections. ``None`` uses defaults.
 
         """
         # Clear data before initializing
@@ -60,35 +95,49 @@ class DiscordState():
                 for channel in server.channels
                 if uita.utils.verify_channel_visibility(channel, server.me)
             }
-            role = uita.server.database.get_server_role(str(server.id))
+            role = self.server_get_role(str(server.id))
             discord_users = {
                 str(user.id):
                 user.name for user in server.members
                 if uita.utils.verify_user_permissions(user, role)
             }
-            self.servers[str(server.id)] = DiscordServer(
+            discord_server = DiscordServer(
                 str(server.id),
                 server.name,
                 discord_channels,
                 discord_users,
                 server.icon
             )
-            self.voice_connections[str(server.id)] = DiscordVoiceClient(str(server.id), bot.loop)
+            self.servers[discord_server.id] = discord_server
+            self._index_server(discord_server)
+            self.voice_connections[str(server.id)] = DiscordVoiceClient(
+                str(server.id), bot.loop, config
+            )
         log.info("Bot state synced to Discord")
 
-    def server_add(self, server: "DiscordServer", bot: discord.Client) -> None:
+    def server_add(
+        self,
+        server: "DiscordServer",
+        bot: discord.Client,
+        config: Optional[uita.config.Config] = None
+    ) -> None:
         """Add an accessible server to Discord state.
 
         Args:
             server: Server that bot has joined.
             bot: Bot that handles voice client connections.
+            config: Configuration options for voice connections. ``None`` uses defaults.
 
         """
         log.debug(f"server_add {server.id}")
+        # Servers are replaced when updated, so users and summaries of the old one are dropped
+        if server.id in self.servers:
+            self._unindex_server(self.servers[server.id])
         self.servers[server.id] = server
+        self._index_server(server)
         # Non-POD type with persistent connections, doesn't need to be updated
         if server.id not in self.voice_connections:
-            self.voice_connections[server.id] = DiscordVoiceClient(server.id, bot.loop)
+            self.voice_connections[server.id] = DiscordVoiceClient(server.id, bot.loop, config)
 
     def server_remove(self, server_id: str) -> None:
         """Remove an accessible server from Discord state.
@@ -98,7 +147,7 @@ class DiscordState():
 
         """
         log.debug(f"server_remove {server_id}")
-        del self.servers[server_id]
+        self._unindex_server(self.servers.pop(server_id))
         del self.voice_connections[server_id]
 
     def server_add_channel(self, server_id: str, channel: "DiscordChannel") -> None:
@@ -132,7 +181,11 @@ class DiscordState():
             user_name: New username.
 
         """
-        self.servers[server_id].users[user_id] = user_name
+        server = self.servers[server_id]
+        server.users[user_id] = user_name
+        self._user_servers.setdefault(user_id, {})[server_id] = DiscordServerSummary(
+            server.id, server.name, server.icon
+        )
 
     def server_remove_user(self, server_id: str, user_id: str) -> None:
         """Remove an inaccessible server for a user.
@@ -143,6 +196,19 @@ class DiscordState():
 
         """
         del self.servers[server_id].users[user_id]
+        self._unindex_user(server_id, user_id)
+
+    def user_servers(self, user_id: str) -> List["DiscordServerSummary"]:
+        """Get every server that a user can access.
+
+        Args:
+            user_id: User to get servers of.
+
+        Returns:
+            Summaries of accessible servers, in the order they were added.
+
+        """
+        return list(self._user_servers.get(user_id, {}).values())
 
     def server_get_role(self, server_id: str) -> Optional[str]:
         """Get the role required to use bot commands.
@@ -154,12 +220,8 @@ class DiscordState():
             ID of required role. Can be ``None`` for no requirement.
 
         """
-        try:
-            return self.servers[server_id].role
-        except KeyError:
-            pass
-        # Get database value if server is not stored in state yet (like in on_guild_join)
-        return uita.server.database.get_server_role(server_id)
+        # Covers servers that are not stored in state yet too (like in on_guild_join)
+        return self._role_table().get(server_id)
 
     def server_set_role(self, server_id: str, role_id: Optional[str]) -> None:
         """Set a role required to use bot commands. ``None`` for free access.
@@ -170,10 +232,10 @@ class DiscordState():
 
         """
         uita.server.database.set_server_role(server_id, role_id)
-        try:
-            self.servers[server_id].role = role_id
-        except KeyError:
-            pass
+        if role_id is None:
+            self._role_table().pop(server_id, None)
+        else:
+            self._role_table()[server_id] = role_id
 
 
 class DiscordChannel():
@@ -226,8 +288,6 @@ class DiscordServer():
         channels (Dict[str, uita.types.DiscordChannel]): Dictionary of channels in server.
         users (Dict[str, str]): Dictionary of usernames in server with access to bot commands.
         icon (Optional[str]): Server icon hash. ``None`` if no custom icon exists.
-        role (Optional[str]): Role ID needed to use bot commands. Set to ``None`` for unrestricted
-            access.
 
     """
     def __init__(
@@ -243,7 +303,20 @@ class DiscordServer():
         self.channels = channels
         self.users = users
         self.icon = icon
-        self.role: Optional[str] = uita.server.database.get_server_role(self.id)
+
+
+class DiscordServerSummary(NamedTuple):
+    """Lightweight summary of a Discord server, containing what is shown in server lists.
+
+    Attributes:
+        id (str): Unique server ID.
+        name (str): Server name.
+        icon (Optional[str]): Server icon hash. ``None`` if no custom icon exists.
+
+    """
+    id: str
+    name: str
+    icon: Optional[str]
 
 
 class DiscordUser():
@@ -285,20 +358,31 @@ class DiscordVoiceClient():
     Args:
         server_id: Server ID to connect to.
         loop: Event loop for audio tasks to run in.
+        config: Configuration options for audio playback. ``None`` uses defaults.
 
     Attributes:
         server_id (str): Server ID to connect to.
         loop (Optional[asyncio.AbstractEventLoop]): Event loop for audio tasks to run in.
 
     """
-    def __init__(self, server_id: str, loop: Optional[asyncio.AbstractEventLoop] = None) -> None:
+    def __init__(
+        self,
+        server_id: str,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        config: Optional[uita.config.Config] = None
+    ) -> None:
         self.server_id = server_id
         self.loop = loop or asyncio.get_event_loop()
+        audio_config = config.audio if config is not None else uita.config.ConfigAudio()
 
         async def on_queue_change(
-            queue: List[uita.audio.Track],
+            queue: uita.audio.QueueSnapshot,
+            changes: List[uita.audio.QueueChange],
             user: Optional[DiscordUser] = None
         ) -> None:
+            # Clients only receive the changes, the full queue is sent on request
+            for change in changes:
+                uita.server.send_all(self._queue_change_message(change), self.server_id)
             # If the queue is changed and the bot is not connected to a voice channel, find the
             # voice channel of the user who most recently changed the queue and join it.
             # User is None for queue change callbacks that should not cause the bot to join a
@@ -312,18 +396,19 @@ class DiscordVoiceClient():
                         await self.connect(str(channel.id))
             elif len(queue) == 0:
                 await self.disconnect()
-            message = uita.message.PlayQueueSendMessage(queue)
-            uita.server.send_all(message, self.server_id)
 
         def on_status_change(status: uita.audio.Status) -> None:
             message = uita.message.PlayStatusSendMessage(status)
             uita.server.send_all(message, self.server_id)
 
         self._playlist = uita.audio.Queue(
-            maxlen=100,
+            maxlen=audio_config.queue_max_length,
             on_queue_change=on_queue_change,
             on_status_change=on_status_change,
-            loop=self.loop
+            loop=self.loop,
+            opus_passthrough=audio_config.opus_passthrough,
+            prefetch_seconds=audio_config.prefetch_seconds,
+            resolve_seconds=audio_config.resolve_seconds
         )
 
         self._voice: Optional[discord.VoiceClient] = None
@@ -415,6 +500,15 @@ class DiscordVoiceClient():
         """
         return self._playlist.queue()
 
+    def queue_snapshot(self) -> uita.audio.QueueSnapshot:
+        """Retrieves a read-only view of the currently queued audio resources for this connection.
+
+        Returns:
+            Snapshot of the queue, which is shared until the queue changes.
+
+        """
+        return self._playlist.snapshot()
+
     def queue_full(self) -> bool:
         """Tests if the queue is at capacity.
 
@@ -451,3 +545,18 @@ class DiscordVoiceClient():
 
         """
         await self._playlist.remove(track_id)
+
+    def _queue_change_message(
+        self,
+        change: uita.audio.QueueChange
+    ) -> "uita.message.AbstractMessage":
+        track = change.tracks[0]
+        if change.type == uita.audio.QueueChangeType.INSERT:
+            return uita.message.PlayQueueInsertSendMessage(
+                change.version, change.position, change.tracks
+            )
+        elif change.type == uita.audio.QueueChangeType.REMOVE:
+            return uita.message.PlayQueueRemoveSendMessage(change.version, track.id)
+        elif change.type == uita.audio.QueueChangeType.MOVE:
+            return uita.message.PlayQueueMoveSendMessage(change.version, track.id, change.position)
+        return uita.message.PlayQueuePlaySendMessage(change.version, track)
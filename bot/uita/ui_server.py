@@ -1,11 +1,15 @@
 """Manages connections from UI frontend."""
 
 import asyncio
+import collections
+import logging
 import ssl
 import websockets
 from typing import (
-    Any, Awaitable, Callable, Coroutine, Dict, Generic, List, Optional, Set, Tuple, Type, TypeVar
+    Any, Awaitable, Callable, Coroutine, Deque, Dict, Generic, Iterable, List, NamedTuple,
+    Optional, Set, Tuple, Type, TypeVar, Union
 )
+from typing_extensions import Final
 
 import uita.auth
 import uita.config
@@ -13,32 +17,140 @@ import uita.database
 import uita.exceptions
 import uita.message
 import uita.utils
+import uita.youtube_api
 import uita
 
-import logging
 log = logging.getLogger(__name__)
 
 
+# State messages where only the latest one matters, these are coalesced by Server.send_all
+COALESCED_HEADERS: Final = frozenset({
+    uita.message.ChannelActiveSendMessage.header,
+    uita.message.ChannelListSendMessage.header,
+    uita.message.PlayStatusSendMessage.header
+})
+
+
+# Websocket close code for clients that should retry authentication later with the same
+# credentials, mirrors 1013 (Try Again Later) in the range reserved for applications
+CLOSE_TRY_AGAIN_LATER: Final = 4013
+
+
 class Connection():
     """Container for Server connections.
 
+    Broadcasts are queued up per connection and written out in order by
+    :meth:`~uita.ui_server.Connection.write_loop`, instead of creating a task for every send. The
+    queue is bounded so that a stalled client can't grow memory use without limit.
+
     Args:
         user: User connected to server. Can be ``None`` while connection is unauthenticated.
         socket: Websocket connected to user.
+        loop: Event loop that the connection writer will run in.
+        maxlen: Maximum number of messages waiting to be sent.
+        max_lag: Seconds the oldest waiting message can be held in a full queue before the
+            client is considered too slow to keep.
 
     Attributes:
         user (Optional[uita.types.DiscordUser]): User connected to server. Can be ``None`` while
             connection is unauthenticated.
         socket (websockets.WebSocketServerProtocol): Websocket connected to user.
+        maxlen (int): Maximum number of messages waiting to be sent.
+        max_lag (float): Seconds the oldest waiting message can be held in a full queue.
+        dropped (int): Number of messages dropped because the queue was full.
+        evicted (bool): ``True`` once the connection is being closed for falling behind.
 
     """
     def __init__(
         self,
         user: Optional[uita.types.DiscordUser],
-        socket: websockets.WebSocketServerProtocol
+        socket: websockets.WebSocketServerProtocol,
+        loop: Optional[asyncio.AbstractEventLoop] = None,
+        maxlen: int = 256,
+        max_lag: float = 30.0
     ) -> None:
         self.user = user
         self.socket = socket
+        self.maxlen = maxlen
+        self.max_lag = max_lag
+        self.dropped = 0
+        self.evicted = False
+        self._loop = loop or asyncio.get_event_loop()
+        # Header, encoded data and time queued for each waiting message
+        self._outbox: Deque[Tuple[str, Union[str, bytes], float]] = collections.deque()
+        self._outbox_ready = asyncio.Event(loop=self._loop)
+
+    @property
+    def queued(self) -> int:
+        """Number of messages waiting to be sent."""
+        return len(self._outbox)
+
+    def send(self, data: Union[str, bytes], header: str = "") -> bool:
+        """Queues encoded data to be sent to the socket.
+
+        When the queue is full an older message with the same header is dropped if it is
+        superseded, listed in :data:`~uita.ui_server.COALESCED_HEADERS`. Otherwise the new
+        message is dropped, and clients that miss anything other than superseded state, such as a
+        queue delta or a reply, can't recover without reconnecting.
+
+        Args:
+            data: Encoded message, may be shared with other connections.
+            header: Header of the encoded message.
+
+        Returns:
+            ``False`` if a message that is not superseded state was dropped, or if the queue is
+            full and has not been drained for longer than
+            :attr:`~uita.ui_server.Connection.max_lag`, meaning the client should be
+            disconnected.
+
+        """
+        now = self._loop.time()
+        if len(self._outbox) >= self.maxlen:
+            if header in COALESCED_HEADERS:
+                for i, (queued_header, _, _) in enumerate(self._outbox):
+                    if queued_header == header:
+                        del self._outbox[i]
+                        self.dropped += 1
+                        break
+            if len(self._outbox) >= self.maxlen:
+                self.dropped += 1
+                if header not in COALESCED_HEADERS:
+                    return False
+                return not self._outbox or now - self._outbox[0][2] <= self.max_lag
+        self._outbox.append((header, data, now))
+        self._outbox_ready.set()
+        return True
+
+    async def write_loop(self) -> None:
+        """Sends queued data to the socket until the connection closes."""
+        try:
+            while True:
+                if not self._outbox:
+                    self._outbox_ready.clear()
+                    await self._outbox_ready.wait()
+                    continue
+                _, data, _ = self._outbox.popleft()
+                await self.socket.send(data)
+        except websockets.exceptions.ConnectionClosed:
+            pass
+
+
+class SendQueueStats(NamedTuple):
+    """Outbound queue metrics for all connections to a :class:`~uita.ui_server.Server`.
+
+    Attributes:
+        connections (int): Number of open connections.
+        queued (int): Total messages waiting to be sent.
+        max_queued (int): Most messages waiting to be sent on a single connection.
+        dropped (int): Messages dropped because a queue was full, since the server started.
+        evicted (int): Connections closed for falling behind, since the server started.
+
+    """
+    connections: int
+    queued: int
+    max_queued: int
+    dropped: int
+    evicted: int
 
 
 _AbstractMessageType = TypeVar("_AbstractMessageType", bound=uita.message.AbstractMessage)
@@ -100,6 +212,29 @@ class Event(Generic[_AbstractMessageType]):
         await self._block_flag.wait()
 
 
+class Query(NamedTuple):
+    """Container for Server query callbacks.
+
+    Queries are messages without side effects that are answered inline by the connection loop,
+    see :meth:`~uita.ui_server.Server.on_query`.
+
+    Attributes:
+        message (uita.message.AbstractMessage): Message that triggered query.
+        user (uita.types.DiscordUser): User that triggered query.
+        subprotocol (Optional[str]): Websocket subprotocol that the reply is encoded for.
+        active_server (Optional[uita.types.DiscordServer]): Server that user is active in.
+            ``None`` if not yet selected.
+
+    """
+    message: uita.message.AbstractMessage
+    user: uita.types.DiscordUser
+    subprotocol: Optional[str]
+    active_server: Optional[uita.types.DiscordServer]
+
+
+QueryCallbackType = Callable[[Query], Union[str, bytes]]
+
+
 class Server():
     """Manages connections from UI frontend.
 
@@ -115,8 +250,19 @@ class Server():
     def __init__(self) -> None:
         self._server: Optional[websockets.server.WebSocketServer] = None
         self._event_callbacks: Dict[str, Event.CallbackType] = {}
+        self._query_callbacks: Dict[str, QueryCallbackType] = {}
         self._active_events: Set[asyncio.Task[None]] = set()
         self.connections: Dict[websockets.WebSocketServerProtocol, Connection] = {}
+        # Indexes so broadcasts and permission checks only touch affected connections
+        self._server_connections: Dict[str, Set[Connection]] = {}
+        self._user_connections: Dict[str, Set[Connection]] = {}
+        self._subscriptions: Dict[Connection, str] = {}
+        # Coalesced state messages waiting to be broadcast, keyed by server ID then header
+        self._coalesced: Dict[str, Dict[str, uita.message.AbstractMessage]] = {}
+        self._coalesce_timers: Dict[str, asyncio.TimerHandle] = {}
+        # Counters of closed connections are added here so that stats don't go backwards
+        self._dropped = 0
+        self._evicted = 0
 
     async def start(
         self,
@@ -158,13 +304,21 @@ class Server():
             while True:
                 whitelist = []
                 for _, v in uita.state.voice_connections.items():
-                    for track in v.queue():
-                        if track.local:
+                    for track in v.queue_snapshot().tracks:
+                        if track.local and track.path is not None:
                             whitelist.append(track.path)
                 await uita.utils.prune_cache_dir(whitelist=whitelist)
                 await asyncio.sleep(60, loop=self.loop)
         self._create_task(cache_prune())
 
+        # Setup an endless stats reporting task to run every minute
+        async def stats_report() -> None:
+            stats = self.send_stats()
+            while True:
+                await asyncio.sleep(60, loop=self.loop)
+                stats = self._report_stats(stats)
+        self._create_task(stats_report())
+
         ssl_context = None
         # Don't need to check ssl_key_file
         # If it is None load_cert_chain will attempt to find it in the cert file
@@ -173,7 +327,9 @@ class Server():
             ssl_context.load_cert_chain(config.ssl.cert_file, config.ssl.key_file)
         self._server = await websockets.serve(
             self._on_connect, port=config.bot.port,
-            loop=self.loop, origins=origins, ssl=ssl_context
+            loop=self.loop, origins=origins, ssl=ssl_context,
+            ping_interval=config.bot.ping_interval, ping_timeout=config.bot.ping_timeout,
+            subprotocols=[websockets.Subprotocol(p) for p in uita.message.SUBPROTOCOLS]
         )
         log.info(f"Server listening on {uita.utils.build_websocket_url(self.config)}")
 
@@ -183,6 +339,10 @@ class Server():
             return
         # Cancel active events first so they can access server internals before they are reset
         await self._cancel_active_events()
+        for timer in self._coalesce_timers.values():
+            timer.cancel()
+        self._coalesce_timers.clear()
+        self._coalesced.clear()
         self._server.close()
         await self._server.wait_closed()
         # Close all active connections
@@ -190,6 +350,9 @@ class Server():
             await conn.close()
         self._server = None
         self.connections.clear()
+        self._server_connections.clear()
+        self._user_connections.clear()
+        self._subscriptions.clear()
         log.info("Server closed")
 
     def on_message(
@@ -222,52 +385,175 @@ class Server():
                     event.finish()
                 await function(event)
             self._event_callbacks[message_type.header] = wrapper
+            self._query_callbacks.pop(message_type.header, None)
+            return wrapper
+        return decorator
+
+    def on_query(
+        self,
+        message_type: Type[uita.message.AbstractMessage],
+        require_active_server: bool = True
+    ) -> Callable[[QueryCallbackType], QueryCallbackType]:
+        """Decorator to bind query callbacks.
+
+        Queries are requests without side effects, such as fetching state. They are answered
+        inline by the connection loop instead of creating an :class:`~uita.ui_server.Event` and
+        task. Callback function should accept a :class:`~uita.ui_server.Query` as its only
+        parameter and return an encoded reply, which is queued on the connection in order with
+        broadcasts.
+
+        Args:
+            message_type: Message type to wait for.
+            require_active_server: Verify that :attr:`~uita.ui_server.Query.active_server` is
+                valid, default ``True``.
+
+        Raises:
+            uita.exceptions.NoActiveServer: If ``require_active_server`` was set to ``True`` and
+                callback is sent an :attr:`~uita.ui_server.Query.active_server` of ``None``.
+
+        """
+        def decorator(function: QueryCallbackType) -> QueryCallbackType:
+            def wrapper(query: Query) -> Union[str, bytes]:
+                if require_active_server is True and query.active_server is None:
+                    raise uita.exceptions.NoActiveServer
+                return function(query)
+            self._query_callbacks[message_type.header] = wrapper
+            self._event_callbacks.pop(message_type.header, None)
             return wrapper
         return decorator
 
+    def send(
+        self,
+        message: uita.message.AbstractMessage,
+        socket: websockets.WebSocketServerProtocol
+    ) -> None:
+        """Sends a :class:`~uita.message.AbstractMessage` to a single connection.
+
+        The message is queued in order with broadcasts, so that it can't overtake messages that
+        were sent to the connection before it.
+
+        Args:
+            message: Message to send to user.
+            socket: Websocket of the connection to send to.
+
+        """
+        conn = self.connections.get(socket)
+        if conn is None:
+            return
+        data = uita.message.encode(message, socket.subprotocol)
+        if not conn.send(data, message.header):
+            self._evict(conn)
+
     def send_all(self, message: uita.message.AbstractMessage, server_id: str) -> None:
         """Sends a :class:`~uita.message.AbstractMessage` to all :class:`~uita.types.DiscordUser`
         in a server.
 
+        State messages listed in :data:`~uita.ui_server.COALESCED_HEADERS` are held for
+        ``config.bot.broadcast_interval`` seconds, and only the latest of each type is sent.
+
         Args:
             message: Message to send to user.
             server_id: Discord server ID to broadcast to.
 
         """
-        for socket, conn in self.connections.items():
-            if conn.user is not None and conn.user.active_server_id == server_id:
-                async def try_send(s: websockets.WebSocketServerProtocol, m: str) -> None:
-                    try:
-                        await s.send(m)
-                    except websockets.exceptions.ConnectionClosed:
-                        pass
-                    except asyncio.CancelledError:
-                        pass
-                self._create_task(try_send(socket, str(message)))
-
-    async def verify_active_servers(self) -> None:
+        interval = self.config.bot.broadcast_interval
+        if interval > 0 and message.header in COALESCED_HEADERS:
+            self._coalesced.setdefault(server_id, {})[message.header] = message
+            if server_id not in self._coalesce_timers:
+                self._coalesce_timers[server_id] = self.loop.call_later(
+                    interval, self._flush_coalesced, server_id
+                )
+            return
+        self._broadcast(message, server_id)
+
+    def _broadcast(self, message: uita.message.AbstractMessage, server_id: str) -> None:
+        """Sends a message to every connection subscribed to a server."""
+        subscribers = self._server_connections.get(server_id)
+        if not subscribers:
+            return
+        # Messages are encoded once per subprotocol and the same data is queued for every
+        # connection using it
+        encoded: Dict[Optional[str], Union[str, bytes]] = {}
+        for conn in subscribers:
+            subprotocol = conn.socket.subprotocol
+            data = encoded.get(subprotocol)
+            if data is None:
+                data = encoded[subprotocol] = uita.message.encode(message, subprotocol)
+            if not conn.send(data, message.header):
+                self._evict(conn)
+
+    def send_stats(self) -> SendQueueStats:
+        """Collects outbound queue metrics.
+
+        Returns:
+            Queue depth and drop counts for all connections.
+
+        """
+        queued = [conn.queued for conn in self.connections.values()]
+        return SendQueueStats(
+            connections=len(queued),
+            queued=sum(queued),
+            max_queued=max(queued, default=0),
+            dropped=self._dropped + sum(conn.dropped for conn in self.connections.values()),
+            evicted=self._evicted
+        )
+
+    def set_active_server(self, user: uita.types.DiscordUser, server_id: Optional[str]) -> None:
+        """Sets the Discord server a user has joined and subscribes them to its broadcasts.
+
+        Args:
+            user: User to update, as given to event callbacks.
+            server_id: Discord server ID that the user joined, ``None`` to leave their active
+                server.
+
+        """
+        user.active_server_id = server_id
+        for conn in self._user_connections.get(user.id, ()):
+            if conn.user is user:
+                self._subscribe(conn, server_id)
+
+    async def verify_active_servers(
+        self,
+        server_id: Optional[str] = None,
+        user_id: Optional[str] = None
+    ) -> None:
         """Checks if any user is connected to an active server that is no longer accessible.
 
         If so, will force them back to the server select screen.
 
+        Args:
+            server_id: Only check users connected to this Discord server, defaults to checking
+                every server.
+            user_id: Only check connections belonging to this user, defaults to checking every
+                user.
+
         """
-        # Might help to have an individual user check, but since connections aren't stored in a
-        # hash table (and the server lookups they need are), it probably wouldn't be much faster
-        # without reworking how data is stored. Also I don't expect many simultaneous active
-        # connections. So optimize this if it ever gets to be slow, but I don't think it will.
-        for socket, conn in self.connections.items():
-            if conn.user is None:
+        connections: Iterable[Connection]
+        if user_id is not None:
+            connections = self._user_connections.get(user_id, ())
+        elif server_id is not None:
+            connections = self._server_connections.get(server_id, ())
+        else:
+            connections = self._subscriptions.keys()
+        # Collected first since kicking a connection modifies the indexes being iterated
+        kicked: List[Tuple[Connection, uita.types.DiscordUser]] = []
+        for conn in connections:
+            active_server_id = self._subscriptions.get(conn)
+            if conn.user is None or active_server_id is None:
                 continue
-            if conn.user.active_server_id is None:
+            if server_id is not None and active_server_id != server_id:
                 continue
             if (
-                conn.user.active_server_id not in uita.state.servers
-                or conn.user.id not in uita.state.servers[conn.user.active_server_id].users
+                active_server_id not in uita.state.servers
+                or conn.user.id not in uita.state.servers[active_server_id].users
             ):
-                conn.user.active_server_id = None
-                self._create_task(
-                    socket.send(str(uita.message.ServerKickMessage()))
-                )
+                kicked.append((conn, conn.user))
+        for conn, user in kicked:
+            self.set_active_server(user, None)
+            message = uita.message.ServerKickMessage()
+            data = uita.message.encode(message, conn.socket.subprotocol)
+            if not conn.send(data, message.header):
+                self._evict(conn)
 
     async def _authenticate(
         self,
@@ -277,8 +563,6 @@ class Server():
         # Start by waiting for a data with either session info or an auth code for the Discord API
         try:
             data = await asyncio.wait_for(websocket.recv(), timeout=5, loop=self.loop)
-            if isinstance(data, bytes):
-                raise uita.exceptions.MalformedMessage("Websocket sent bytes unexpectedly")
         # If it takes more than 5 seconds, kick them out
         except asyncio.TimeoutError:
             raise uita.exceptions.AuthenticationError("Authentication timed out")
@@ -313,11 +597,112 @@ class Server():
         except asyncio.CancelledError:
             pass
 
-    def _create_task(self, coroutine: Coroutine[Any, Any, None]) -> None:
+    def _flush_coalesced(self, server_id: str) -> None:
+        """Broadcasts the coalesced state messages of a server."""
+        del self._coalesce_timers[server_id]
+        for message in self._coalesced.pop(server_id, {}).values():
+            self._broadcast(message, server_id)
+
+    def _evict(self, conn: Connection) -> None:
+        """Closes a connection that is not keeping up with the messages sent to it."""
+        if conn.evicted:
+            return
+        conn.evicted = True
+        self._evicted += 1
+        name = f"{conn.user.name}:{conn.user.id}" if conn.user is not None else "unauthenticated"
+        log.warning(f"[{name}] disconnected for falling behind, {conn.queued} messages queued")
+        self._create_task(conn.socket.close(code=1008, reason="Client fell too far behind"))
+
+    def _report_stats(self, previous: SendQueueStats) -> SendQueueStats:
+        """Logs outbound queue metrics since the previous report, and scrape cache metrics.
+
+        Queue reports are logged at info level when messages were dropped or clients evicted,
+        otherwise at debug level.
+
+        """
+        stats = self.send_stats()
+        dropped = stats.dropped - previous.dropped
+        evicted = stats.evicted - previous.evicted
+        log.log(
+            logging.INFO if dropped > 0 or evicted > 0 else logging.DEBUG,
+            f"Send queues: {stats.connections} connections, {stats.queued} messages queued "
+            f"(max {stats.max_queued}), {dropped} dropped, {evicted} evicted"
+        )
+        cache_stats = uita.youtube_api.cache.stats()
+        log.debug(
+            f"Scrape cache: {cache_stats.entries} entries, {cache_stats.hits} hits, "
+            f"{cache_stats.misses} misses"
+        )
+        return stats
+
+    def _subscribe(self, conn: Connection, server_id: Optional[str]) -> None:
+        """Moves a connection to the broadcast index of a different Discord server."""
+        previous_id = self._subscriptions.pop(conn, None)
+        if previous_id is not None:
+            subscribers = self._server_connections[previous_id]
+            subscribers.discard(conn)
+            if not subscribers:
+                del self._server_connections[previous_id]
+        if server_id is not None:
+            self._subscriptions[conn] = server_id
+            self._server_connections.setdefault(server_id, set()).add(conn)
+
+    def _create_task(self, coroutine: Coroutine[Any, Any, None]) -> "asyncio.Task[None]":
         """Creates a managed task that will be tracked and cancelled on server shutdown."""
         task = self.loop.create_task(coroutine)
         task.add_done_callback(lambda f: self._active_events.remove(f))
         self._active_events.add(task)
+        return task
+
+    def _log_message(
+        self,
+        message: uita.message.AbstractMessage,
+        user: uita.types.DiscordUser,
+        active_server: Optional[uita.types.DiscordServer]
+    ) -> None:
+        """Logs a message received from a client, only formatted if debug logging is enabled."""
+        if log.isEnabledFor(logging.DEBUG):
+            log.debug("[{}:{}] {} {} -> {}".format(
+                user.name,
+                user.id,
+                message.header,
+                message.properties(),
+                "No server" if not active_server else active_server.name
+            ))
+
+    def _dispatch_query(
+        self,
+        callback: QueryCallbackType,
+        message: uita.message.AbstractMessage,
+        conn: Connection
+    ) -> None:
+        """Calls a query callback and queues its reply on the connection.
+
+        If a query raises an exception it is logged and the connection is closed.
+
+        """
+        assert conn.user is not None
+        active_server = (
+            uita.state.servers.get(conn.user.active_server_id)
+            if conn.user.active_server_id is not None else None
+        )
+        self._log_message(message, conn.user, active_server)
+        subprotocol = conn.socket.subprotocol
+        try:
+            data = callback(Query(message, conn.user, subprotocol, active_server))
+        except uita.exceptions.ClientError as e:
+            log.debug(f"ClientError {e}")
+            data = uita.message.encode(e.message, subprotocol)
+        except uita.exceptions.NoActiveServer:
+            data = uita.message.encode(uita.message.ServerKickMessage(), subprotocol)
+        except Exception:
+            log.warning("Uncaught exception in query", exc_info=True)
+            self._create_task(
+                conn.socket.close(code=1001, reason="Event callback caused exception")
+            )
+            return
+        if not conn.send(data, message.header):
+            self._evict(conn)
 
     def _dispatch_event(self, event: Event[Any]) -> None:
         """Finds and calls aproppriate callback for given event message.
@@ -325,15 +710,7 @@ class Server():
         If an event raises an exception it is logged and the connection is closed.
 
         """
-        # Log all events except heartbeats since they happen so often and aren't very useful
-        if event.message.header != "heartbeat":
-            log.debug("[{}:{}] {} {} -> {}".format(
-                event.user.name,
-                event.user.id,
-                event.message.header,
-                event.message.__dict__,
-                "No server" if not event.active_server else event.active_server.name
-            ))
+        self._log_message(event.message, event.user, event.active_server)
         # Process the event
         if event.message.header in self._event_callbacks:
             async def wrapper() -> None:
@@ -343,9 +720,9 @@ class Server():
                     pass
                 except uita.exceptions.ClientError as e:
                     log.debug(f"ClientError {e}")
-                    await event.socket.send(str(e))
+                    self.send(e.message, event.socket)
                 except uita.exceptions.NoActiveServer:
-                    await event.socket.send(str(uita.message.ServerKickMessage()))
+                    self.send(uita.message.ServerKickMessage(), event.socket)
                 except Exception:
                     log.warning("Uncaught exception in event", exc_info=True)
                     await event.socket.close(
@@ -363,22 +740,39 @@ class Server():
         log.debug(f"Websocket connected {websocket.remote_address[0]} {path}")
         try:
             # Connection stub in case server stops during authentication
-            conn = Connection(None, websocket)
+            conn = Connection(
+                None,
+                websocket,
+                self.loop,
+                maxlen=self.config.bot.send_queue_length,
+                max_lag=self.config.bot.send_max_lag
+            )
             self.connections[websocket] = conn
+            writer = self._create_task(conn.write_loop())
             # Initialize user and connection data
             user, session = await self._authenticate(websocket)
             conn.user = user
+            self._user_connections.setdefault(user.id, set()).add(conn)
             # Notify client that they authenticated successfully
-            await websocket.send(str(uita.message.AuthSucceedMessage(user, session)))
+            await websocket.send(uita.message.encode(
+                uita.message.AuthSucceedMessage(user, session), websocket.subprotocol
+            ))
             log.info(f"[{user.name}:{user.id}] connected ({websocket.remote_address[0]})")
-            # Main loop, runs for the life of each connection
+            # Main loop, runs for the life of each connection. Zombie connections are closed by
+            # websocket pings that go unanswered
             while True:
-                # 90 second timeout to cull zombie connections, expects client heartbeats
-                data = await asyncio.wait_for(websocket.recv(), 90, loop=self.loop)
-                if isinstance(data, bytes):
-                    raise uita.exceptions.MalformedMessage("Websocket sent bytes unexpectedly")
-                # Parse data into message and dispatch to aproppriate event callback
+                data = await websocket.recv()
+                # Parse data into message and dispatch to aproppriate event callback, bytes are
+                # MessagePack encoded
                 message = uita.message.parse(data)
+                # Queries are answered without waiting on a task
+                query_callback = self._query_callbacks.get(message.header)
+                if query_callback is not None:
+                    self._dispatch_query(query_callback, message, conn)
+                    continue
+                # Nothing to do for messages without callbacks, such as heartbeats
+                if message.header not in self._event_callbacks:
+                    continue
                 # mypy gets confused passing None to .get(), so here's a redundant ternary check
                 active_server = (
                     uita.state.servers.get(user.active_server_id)
@@ -391,14 +785,22 @@ class Server():
             log.debug(f"Websocket disconnected: code {error.code},reason {error.reason}")
         except asyncio.CancelledError:
             log.debug("Websocket cancelled")
-        except asyncio.TimeoutError:
-            log.debug("Websocket missed heartbeat")
+        except uita.exceptions.AuthenticationUnavailable as error:
+            log.debug(f"Websocket authentication unavailable: {error}")
+            # Credentials may still be valid, so have the client retry them later instead of
+            # logging in again
+            await websocket.close(
+                code=CLOSE_TRY_AGAIN_LATER,
+                reason="Authentication unavailable"
+            )
         except uita.exceptions.AuthenticationError as error:
             log.debug(f"Websocket failed to authenticate: {error}")
             try:
                 # Notify client that their authentication failed before closing connection
                 await asyncio.wait_for(
-                    websocket.send(str(uita.message.AuthFailMessage())),
+                    websocket.send(
+                        uita.message.encode(uita.message.AuthFailMessage(), websocket.subprotocol)
+                    ),
                     timeout=5,
                     loop=self.loop
                 )
@@ -417,5 +819,13 @@ class Server():
             if conn.user is not None:
                 log.info(f"[{conn.user.name}:{conn.user.id}] disconnected")
             del self.connections[websocket]
+            self._dropped += conn.dropped
+            self._subscribe(conn, None)
+            if conn.user is not None:
+                user_connections = self._user_connections[conn.user.id]
+                user_connections.discard(conn)
+                if not user_connections:
+                    del self._user_connections[conn.user.id]
+            writer.cancel()
             await websocket.close()
             log.debug("Websocket closed")
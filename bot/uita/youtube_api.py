@@ -1,13 +1,22 @@
 """Async HTTP requests to the Youtube API"""
 import asyncio
+import collections
+import functools
+import multiprocessing
+import multiprocessing.connection
+import os
 import re
-import requests
+import signal
+import threading
+import time
 import urllib.parse
 import youtube_dl
-from typing import Any, Dict, List, Optional
+import youtube_dl.extractor
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, NamedTuple, Optional, Tuple
 from typing_extensions import Final
 
 import uita.exceptions
+import uita.http_client
 
 import logging
 log = logging.getLogger(__name__)
@@ -20,13 +29,469 @@ BASE_HEADERS: Final = {
 }
 API_URL: Final = "https://www.googleapis.com/youtube/v3"
 
+# Extraction definitions
+EXTRACT_WORKERS: Final = 2
+EXTRACT_TIMEOUT: Final = 60.0
 
-async def scrape(url: str, loop: Optional[asyncio.AbstractEventLoop] = None) -> Dict[str, Any]:
+# youtube-dl options for each kind of extraction, workers keep one YoutubeDL instance per kind
+_EXTRACT_OPTIONS: Final[Dict[str, Dict[str, Any]]] = {
+    "scrape": {
+        # bestaudio prefers videoless streams, which often have a lower bitrate
+        # ironically not the best audio
+        # also highly values lower bitrate vorbis streams over higher bitrate opus?? why.
+        "format": "best[acodec=opus]/bestaudio[acodec=opus]/bestaudio/best",
+        "quiet": True,
+        "no_warnings": True,
+        "extract_flat": "in_playlist",
+        "skip_download": True
+    },
+    "search": {
+        "quiet": True,
+        "no_warnings": True,
+        "skip_download": True
+    }
+}
+# Extractors tried in order when scraping a URL
+_SCRAPE_EXTRACTORS: Final = ("Youtube", "YoutubePlaylist")
+
+# Scrape cache definitions
+CACHE_MAX_ENTRIES: Final = 1024
+CACHE_TTL: Final = 3600.0
+CACHE_STREAM_TTL: Final = 1800.0
+CACHE_INVALID_TTL: Final = 60.0
+# Cached stream URLs are only reused if they stay valid for at least this many seconds
+CACHE_STREAM_MARGIN: Final = 300.0
+
+_VIDEO_ID_PATTERN: Final = re.compile(r"[\w-]{11}")
+_YOUTUBE_HOSTS: Final = frozenset({
+    "youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com"
+})
+
+
+class ScrapeCacheStats(NamedTuple):
+    """Metrics for a :class:`~uita.youtube_api.ScrapeCache`.
+
+    Attributes:
+        entries (int): Number of cached URLs.
+        hits (int): Lookups answered from the cache, including cached invalid URLs.
+        misses (int): Lookups that needed a scrape.
+
+    """
+    entries: int
+    hits: int
+    misses: int
+
+
+class ScrapeCache():
+    """Bounded LRU cache of :func:`~uita.youtube_api.scrape` results.
+
+    Results are keyed by YouTube video or playlist ID where the URL contains one, so that
+    different links to the same video share an entry. Metadata is kept for ``ttl`` seconds, but
+    the stream URL of a video expires sooner and is only reused for ``stream_ttl`` seconds.
+    URLs that could not be scraped are remembered for ``invalid_ttl`` seconds.
+
+    Args:
+        max_entries: Maximum number of cached URLs, least recently used ones are evicted first.
+        ttl: Seconds that metadata stays cached.
+        stream_ttl: Seconds that stream URLs stay cached.
+        invalid_ttl: Seconds that invalid URLs stay cached.
+
+    Attributes:
+        hits (int): Lookups answered from the cache, including cached invalid URLs.
+        misses (int): Lookups that needed a scrape.
+
+    """
+    def __init__(
+        self,
+        max_entries: int = CACHE_MAX_ENTRIES,
+        ttl: float = CACHE_TTL,
+        stream_ttl: float = CACHE_STREAM_TTL,
+        invalid_ttl: float = CACHE_INVALID_TTL
+    ) -> None:
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stream_ttl = stream_ttl
+        self.invalid_ttl = invalid_ttl
+        self.hits = 0
+        self.misses = 0
+        # Scrape result, or None for invalid URLs, and the monotonic time it was cached
+        self._entries: "collections.OrderedDict[str, Tuple[Optional[Dict[str, Any]], float]]" = (
+            collections.OrderedDict()
+        )
+
+    def get(self, url: str, stream: bool = True) -> Optional[Dict[str, Any]]:
+        """Looks up a cached scrape result.
+
+        Args:
+            url: URL that was scraped.
+            stream: Require a usable stream URL for videos, default ``True``. Otherwise video
+                metadata is returned without the ``url`` field once the stream URL expires.
+
+        Returns:
+            Copy of the scrape result, or ``None`` if it needs to be scraped.
+
+        Raises:
+            uita.exceptions.ClientError: If the URL was recently found to be invalid.
+
+        """
+        key = cache_key(url)
+        entry = self._entries.get(key)
+        try:
+            info = self._lookup(key, entry, stream) if entry is not None else None
+        except uita.exceptions.ClientError:
+            self.hits += 1
+            raise
+        if info is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return info
+
+    def put(self, url: str, info: Optional[Dict[str, Any]]) -> None:
+        """Caches a scrape result.
+
+        Args:
+            url: URL that was scraped.
+            info: Scrape result, ``None`` if the URL is invalid.
+
+        """
+        now = time.monotonic()
+        keys = [cache_key(url)]
+        # Videos are also cached by their ID in case the URL couldn't be keyed by it
+        if info is not None and info.get("extractor") == "Youtube":
+            keys.append(f"video:{info['id']}")
+        for key in keys:
+            self._entries[key] = (info, now)
+            self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Removes all cached results, counters are kept."""
+        self._entries.clear()
+
+    def stats(self) -> ScrapeCacheStats:
+        """Collects cache metrics.
+
+        Returns:
+            Size and hit counts of the cache.
+
+        """
+        return ScrapeCacheStats(entries=len(self._entries), hits=self.hits, misses=self.misses)
+
+    def _lookup(
+        self,
+        key: str,
+        entry: Tuple[Optional[Dict[str, Any]], float],
+        stream: bool
+    ) -> Optional[Dict[str, Any]]:
+        info, cached_time = entry
+        age = time.monotonic() - cached_time
+        if info is None:
+            if age < self.invalid_ttl:
+                raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
+            del self._entries[key]
+            return None
+        if age >= self.ttl:
+            del self._entries[key]
+            return None
+        if info.get("extractor") != "Youtube" or self._stream_valid(info, age):
+            return dict(info)
+        # Livestreams don't have metadata to queue them without a stream URL
+        if stream or info.get("is_live"):
+            return None
+        info = dict(info)
+        del info["url"]
+        return info
+
+    def _stream_valid(self, info: Dict[str, Any], age: float) -> bool:
+        if age >= self.stream_ttl:
+            return False
+        expires = stream_expiry(info["url"])
+        return expires is None or expires - time.time() > CACHE_STREAM_MARGIN
+
+
+cache = ScrapeCache()
+"""Cache used by :func:`~uita.youtube_api.scrape`."""
+
+
+class _ExtractorWorker():
+    """Worker process running :func:`~uita.youtube_api._extractor_main`."""
+    def __init__(self, context: Any) -> None:
+        self.connection, child_connection = context.Pipe()
+        self.process = context.Process(
+            target=_extractor_main, args=(child_connection,), name="uita-extractor", daemon=True
+        )
+        self.process.start()
+        child_connection.close()
+
+    def call(self, request: Tuple[str, str, Optional[str]]) -> Tuple[bool, Any]:
+        """Sends a request and blocks until the worker replies, run from a thread."""
+        try:
+            self.connection.send(request)
+            reply: Tuple[bool, Any] = self.connection.recv()
+            return reply
+        # Worker was killed while extracting
+        except (EOFError, OSError):
+            self.connection.close()
+            raise
+
+    def kill(self) -> None:
+        self.process.terminate()
+        # Reap the worker so it doesn't linger as a zombie
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            # Process.kill() is only available from Python 3.7
+            os.kill(self.process.pid, getattr(signal, "SIGKILL", signal.SIGTERM))
+            self.process.join()
+
+    def close(self) -> None:
+        # Workers exit once their connection is closed
+        self.connection.close()
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.kill()
+
+
+class ExtractorPool():
+    """Runs youtube-dl extraction in worker processes.
+
+    Extraction is CPU heavy Python that holds the GIL, so running it in the bot process stalls
+    the event loop and audio threads. Workers are started on demand and keep their YoutubeDL
+    instances between requests. A worker whose request times out or is cancelled is killed and
+    replaced, so abandoned extractions stop using CPU.
+
+    Args:
+        workers: Maximum number of concurrent extractions and worker processes. ``0`` extracts in
+            threads of the bot process instead, where extractions can't be stopped early.
+        timeout: Seconds an extraction can take before it is abandoned.
+
+    Attributes:
+        workers (int): Maximum number of concurrent extractions and worker processes.
+        timeout (float): Seconds an extraction can take before it is abandoned.
+
+    """
+    def __init__(self, workers: int = EXTRACT_WORKERS, timeout: float = EXTRACT_TIMEOUT) -> None:
+        self.workers = workers
+        self.timeout = timeout
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: List[_ExtractorWorker] = []
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._slots_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def configure(self, workers: int, timeout: float) -> None:
+        """Changes pool settings, idle workers are stopped.
+
+        Args:
+            workers: Maximum number of concurrent extractions and worker processes. ``0``
+                extracts in threads of the bot process instead.
+            timeout: Seconds an extraction can take before it is abandoned.
+
+        """
+        self.close()
+        self.workers = workers
+        self.timeout = timeout
+        self._slots = None
+
+    def close(self) -> None:
+        """Stops idle workers, busy workers are stopped once their extraction finishes."""
+        for worker in self._idle:
+            worker.close()
+        self._idle.clear()
+
+    async def extract(
+        self,
+        kind: str,
+        query: str,
+        ie_key: Optional[str] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None
+    ) -> Dict[str, Any]:
+        """Calls ``YoutubeDL.extract_info``.
+
+        Args:
+            kind: Options to extract with, either ``"scrape"`` or ``"search"``.
+            query: URL or search query to extract.
+            ie_key: Name of the extractor to use, defaults to any that match.
+            loop: Event loop to attach to launch worker threads from.
+
+        Returns:
+            YoutubeDL dict soup response.
+
+        Raises:
+            youtube_dl.utils.DownloadError: If extraction failed.
+            asyncio.TimeoutError: If extraction took longer than
+                :attr:`~uita.youtube_api.ExtractorPool.timeout`.
+            uita.exceptions.ExtractorStopped: If the worker process stopped unexpectedly.
+
+        """
+        loop = loop or asyncio.get_event_loop()
+        request = (kind, query, ie_key)
+        if self.workers <= 0:
+            return await asyncio.wait_for(
+                loop.run_in_executor(None, _extract, *request), self.timeout, loop=loop
+            )
+        if self._slots is None or self._slots_loop is not loop:
+            self._slots = asyncio.Semaphore(self.workers, loop=loop)
+            self._slots_loop = loop
+        async with self._slots:
+            worker = self._idle.pop() if self._idle else _ExtractorWorker(self._context)
+            try:
+                succeeded, result = await asyncio.wait_for(
+                    loop.run_in_executor(None, worker.call, request), self.timeout, loop=loop
+                )
+            except (EOFError, OSError):
+                worker.kill()
+                # Replace the worker right away, so the next request doesn't wait on its startup
+                self._idle.append(_ExtractorWorker(self._context))
+                raise uita.exceptions.ExtractorStopped("Extractor worker stopped unexpectedly")
+            except BaseException:
+                worker.kill()
+                raise
+            self._idle.append(worker)
+        if not succeeded:
+            raise youtube_dl.utils.DownloadError(result)
+        info: Dict[str, Any] = result
+        return info
+
+
+extractor_pool = ExtractorPool()
+"""Pool used for youtube-dl extraction."""
+
+
+class _Flight():
+    """Request in progress, shared by every caller asking for the same thing."""
+    __slots__ = ["task", "loop", "waiters"]
+
+    def __init__(self, task: "asyncio.Task[Any]", loop: asyncio.AbstractEventLoop) -> None:
+        self.task = task
+        self.loop = loop
+        self.waiters = 0
+
+
+# Requests in progress indexed by what they look up, so concurrent callers share one request
+_flights: Dict[Hashable, _Flight] = {}
+
+
+async def _share(
+    key: Hashable,
+    request: Callable[[], Awaitable[Any]],
+    loop: asyncio.AbstractEventLoop
+) -> Any:
+    """Awaits a request, or the same request already in progress.
+
+    The request is cancelled only if every caller waiting on it is cancelled.
+
+    """
+    flight = _flights.get(key)
+    if flight is None or flight.loop is not loop:
+        new_flight = _flights[key] = _Flight(loop.create_task(request()), loop)
+
+        def finish(task: "asyncio.Task[Any]") -> None:
+            if _flights.get(key) is new_flight:
+                del _flights[key]
+        new_flight.task.add_done_callback(finish)
+        flight = new_flight
+    flight.waiters += 1
+    try:
+        return await asyncio.shield(flight.task, loop=loop)
+    except asyncio.CancelledError:
+        if flight.waiters == 1:
+            flight.task.cancel()
+        raise
+    finally:
+        flight.waiters -= 1
+
+
+# YoutubeDL instances aren't thread-safe, so threads extracting in the bot process keep their own
+_extract_local = threading.local()
+
+
+def _extract(kind: str, query: str, ie_key: Optional[str]) -> Dict[str, Any]:
+    scrapers: Optional[Dict[str, youtube_dl.YoutubeDL]] = getattr(
+        _extract_local, "scrapers", None
+    )
+    if scrapers is None:
+        scrapers = _extract_local.scrapers = {}
+    scraper = scrapers.get(kind)
+    if scraper is None:
+        null_log = logging.Logger("dummy")
+        null_log.addHandler(logging.NullHandler())
+        scraper = scrapers[kind] = youtube_dl.YoutubeDL(
+            dict(_EXTRACT_OPTIONS[kind], logger=null_log)
+        )
+    info: Dict[str, Any] = scraper.extract_info(query, download=False, ie_key=ie_key)
+    # Playlist entries can be generators, which can't be sent between processes
+    if "entries" in info:
+        info["entries"] = list(info["entries"])
+    return info
+
+
+def _extractor_main(connection: multiprocessing.connection.Connection) -> None:
+    """Entry point of extractor worker processes."""
+    # Interrupts are handled by the bot process, which stops its workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    while True:
+        try:
+            kind, query, ie_key = connection.recv()
+        except (EOFError, OSError):
+            return
+        try:
+            reply: Tuple[bool, Any] = (True, _extract(kind, query, ie_key))
+        except Exception as e:
+            reply = (False, str(e))
+        try:
+            connection.send(reply)
+        except Exception as e:
+            # Results that can't be pickled
+            connection.send((False, str(e)))
+
+
+def cache_key(url: str) -> str:
+    """Finds the key that a URL is cached under.
+
+    Args:
+        url: URL for audio resource to be played.
+
+    Returns:
+        ``video:<id>`` or ``playlist:<id>`` for YouTube links, otherwise the URL itself.
+
+    """
+    parsed_url = urllib.parse.urlparse(url.strip())
+    host = parsed_url.netloc.lower()
+    query = urllib.parse.parse_qs(parsed_url.query)
+    path = parsed_url.path.rstrip("/")
+    video_id: Optional[str] = None
+    if host == "youtu.be":
+        video_id = path[1:]
+    elif host in _YOUTUBE_HOSTS:
+        if path == "/playlist" and len(query.get("list", [])) == 1:
+            return f"playlist:{query['list'][0]}"
+        if path == "/watch" and len(query.get("v", [])) == 1:
+            video_id = query["v"][0]
+        elif path.startswith(("/embed/", "/shorts/", "/v/")):
+            video_id = path.rsplit("/", 1)[1]
+    # Links to a video in a playlist may be scraped as the playlist instead
+    if video_id is not None and "list" not in query and _VIDEO_ID_PATTERN.fullmatch(video_id):
+        return f"video:{video_id}"
+    return url
+
+
+async def scrape(
+    url: str,
+    loop: Optional[asyncio.AbstractEventLoop] = None,
+    stream: bool = True
+) -> Dict[str, Any]:
     """Queries YouTube for URL metadata.
 
+    Results are cached by :data:`~uita.youtube_api.cache`, repeated lookups skip scraping.
+    Concurrent lookups of the same video or playlist share one scrape.
+
     Args:
         url: URL for audio resource to be played.
         loop: Event loop to attach to launch worker threads from.
+        stream: Require a usable stream URL for videos, default ``True``. Otherwise cached video
+            metadata can be returned without the ``url`` field, to be scraped again later.
 
     Returns:
         YoutubeDL dict soup response.
@@ -36,33 +501,41 @@ async def scrape(url: str, loop: Optional[asyncio.AbstractEventLoop] = None) ->
 
     """
     loop = loop or asyncio.get_event_loop()
-    null_log = logging.Logger("dummy")
-    null_log.addHandler(logging.NullHandler())
+    cached_info = cache.get(url, stream=stream)
+    if cached_info is not None:
+        return cached_info
+    # Fresh scrapes have a usable stream URL, so they can be shared regardless of stream
+    info: Dict[str, Any] = await _share(
+        ("scrape", cache_key(url)), functools.partial(_scrape_uncached, url, loop), loop
+    )
+    return dict(info)
 
-    opts = {
-        # bestaudio prefers videoless streams, which often have a lower bitrate
-        # ironically not the best audio
-        # also highly values lower bitrate vorbis streams over higher bitrate opus?? why.
-        "format": "best[acodec=opus]/bestaudio[acodec=opus]/bestaudio/best",
-        "quiet": True,
-        "no_warnings": True,
-        "extract_flat": "in_playlist",
-        "logger": null_log,
-        "skip_download": True
-    }
-    scraper = youtube_dl.YoutubeDL(opts)
-    valid_extractors = ["Youtube", "YoutubePlaylist"]
-    for extractor in valid_extractors:
+
+async def _scrape_uncached(url: str, loop: asyncio.AbstractEventLoop) -> Dict[str, Any]:
+    # Only URLs that no extractor accepts are cached as invalid. Extraction can fail for reasons
+    # that pass, such as network errors or throttling, which youtube-dl reports the same way
+    extractors = [
+        extractor for extractor in _SCRAPE_EXTRACTORS
+        if youtube_dl.extractor.get_info_extractor(extractor).suitable(url)
+    ]
+    if not extractors:
+        cache.put(url, None)
+        raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
+    for extractor in extractors:
         try:
-            info = await loop.run_in_executor(
-                None,
-                lambda: scraper.extract_info(url, download=False, ie_key=extractor)
-            )
+            info = await extractor_pool.extract("scrape", url, ie_key=extractor, loop=loop)
             info["extractor"] = extractor
+            cache.put(url, info)
             return info
-        # Triggers when URL doesnt match extractor used
-        except youtube_dl.utils.DownloadError:
-            pass
+        except youtube_dl.utils.DownloadError as error:
+            log.warning(f"Failed scraping {url}: {error}")
+        # Not cached as invalid, since it may only be slow right now
+        except asyncio.TimeoutError:
+            log.warning(f"Timed out scraping {url}")
+            raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
+        except uita.exceptions.ExtractorStopped as error:
+            log.warning(f"Failed scraping {url}: {error}")
+            raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
     raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
 
 
@@ -91,6 +564,21 @@ async def search(
 
     """
     loop = loop or asyncio.get_event_loop()
+    # Concurrent searches for the same thing share one request
+    key = ("search", " ".join(query.lower().split()), api_key, referrer, results)
+    search_results: List[Dict[str, Any]] = await _share(
+        key, functools.partial(_search_uncached, query, api_key, referrer, results, loop), loop
+    )
+    return [dict(result) for result in search_results]
+
+
+async def _search_uncached(
+    query: str,
+    api_key: Optional[str],
+    referrer: Optional[str],
+    results: int,
+    loop: asyncio.AbstractEventLoop
+) -> List[Dict[str, Any]]:
     # Without an API key we take the much slower path using youtube-dl
     if api_key is None:
         return await _search_slow(query, results, loop)
@@ -103,31 +591,33 @@ async def search(
         f"&type=video"
         f"&key={api_key}"
     )
-    headers = BASE_HEADERS
+    # Copied so that the referrer isn't added to every later request
+    headers = dict(BASE_HEADERS)
     if referrer is not None:
         headers["referer"] = referrer
-    response = await loop.run_in_executor(
-        None,
-        lambda: requests.get(url, headers=headers)
-    )
-    if response.status_code != 200:
-        raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
-    search_results = response.json()["items"]
-    # Request detailed results for each video (to get the duration)
-    video_ids = [r["id"]["videoId"] for r in search_results]
-    details_url = (
-        f"{API_URL}/videos/?"
-        f"id={','.join(video_ids)}"
-        f"&part=contentDetails"
-        f"&key={api_key}"
-    )
-    details_response = await loop.run_in_executor(
-        None,
-        lambda: requests.get(details_url, headers=headers)
-    )
-    if details_response.status_code != 200:
+    try:
+        response = await uita.http_client.client.request("GET", url, headers=headers, loop=loop)
+        if response.status != 200:
+            raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
+        search_results = response.data["items"]
+        # Request detailed results for each video (to get the duration)
+        video_ids = [r["id"]["videoId"] for r in search_results]
+        details_url = (
+            f"{API_URL}/videos/?"
+            f"id={','.join(video_ids)}"
+            f"&part=contentDetails"
+            f"&key={api_key}"
+        )
+        # Sent over the same connection as the search request
+        details_response = await uita.http_client.client.request(
+            "GET", details_url, headers=headers, loop=loop
+        )
+        if details_response.status != 200:
+            raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
+        details_results = details_response.data["items"]
+    except uita.exceptions.HTTPError as error:
+        log.warning(f"YouTube search failed: {error}")
         raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
-    details_results = details_response.json()["items"]
     # Build and return the final query results
     durations = {r["id"]: parse_time(r["contentDetails"]["duration"]) for r in details_results}
     return [{
@@ -165,6 +655,27 @@ def parse_time(time: str) -> int:
     return duration
 
 
+def stream_expiry(stream_url: str) -> Optional[float]:
+    """Finds when a resolved YouTube stream URL stops working.
+
+    Args:
+        stream_url: Stream URL retrieved by :func:`~uita.youtube_api.scrape`.
+
+    Returns:
+        Expiry time as a Unix timestamp, or ``None`` if the URL does not carry one.
+
+    """
+    parsed_url = urllib.parse.urlparse(stream_url)
+    expire = urllib.parse.parse_qs(parsed_url.query).get("expire")
+    if expire is not None:
+        return float(expire[0])
+    # Livestream manifests carry their parameters in the path instead
+    match = re.search("/expire/(\\d+)", parsed_url.path)
+    if match is not None:
+        return float(match.group(1))
+    return None
+
+
 def build_url(video_id: str) -> str:
     """Converts a YouTube video ID into a valid URL.
 
@@ -183,20 +694,9 @@ async def _search_slow(
     results: int,
     loop: asyncio.AbstractEventLoop
 ) -> List[Dict[str, Any]]:
-    null_log = logging.Logger("dummy")
-    null_log.addHandler(logging.NullHandler())
-
-    opts = {
-        "quiet": True,
-        "no_warnings": True,
-        "logger": null_log,
-        "skip_download": True
-    }
-    scraper = youtube_dl.YoutubeDL(opts)
     try:
-        search_results = await loop.run_in_executor(
-            None,
-            lambda: scraper.extract_info(f"ytsearch{results}:{query}", download=False)
+        search_results = await extractor_pool.extract(
+            "search", f"ytsearch{results}:{query}", loop=loop
         )
         # Filter out any entries that aren't in this whitelist
         whitelist = set([
@@ -219,4 +719,8 @@ async def _search_slow(
     # Triggers when query doesnt match extractor used
     except youtube_dl.utils.DownloadError:
         pass
+    except asyncio.TimeoutError:
+        log.warning(f"Timed out searching {query}")
+    except uita.exceptions.ExtractorStopped as error:
+        log.warning(f"Failed searching {query}: {error}")
     raise uita.exceptions.ClientError(uita.message.ErrorUrlInvalidMessage())
@@ -5,7 +5,9 @@ try:
 
     import uita
     import uita.config
+    import uita.http_client
     import uita.utils
+    import uita.youtube_api
 
     import logging
     log = logging.getLogger("uita")
@@ -44,6 +46,9 @@ if __name__ == "__main__":
         config = uita.config.load(uita.utils.config_file())
         initialize_logging(level=logging.INFO if not config.bot.verbose_logging else logging.DEBUG)
         check_ffmpeg()
+        uita.youtube_api.extractor_pool.configure(
+            config.youtube.extract_workers, config.youtube.extract_timeout
+        )
         # Main loop
         uita.loop.create_task(uita.server.start(
             config.bot.database,
@@ -73,7 +78,9 @@ if __name__ == "__main__":
             # Additional cleanup to handle buggy asyncio cleanup
             for task in task_list:
                 del task
-        # Clear cache folder
+        # Stop extractor workers, close HTTP connections and clear cache folder
+        uita.youtube_api.extractor_pool.close()
+        uita.loop.run_until_complete(uita.http_client.client.close())
         uita.loop.run_until_complete(uita.utils.prune_cache_dir())
         # Finalize shutdown
         uita.loop.close()
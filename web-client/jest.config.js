@@ -8,5 +8,5 @@ module.exports = {
         // CSS imports
         "\\.scss$": "<rootDir>/test/css.mock.js"
     },
-    setupFilesAfterEnv: ["<rootDir>/test/crypto.mock.js"]
+    setupFilesAfterEnv: ["<rootDir>/test/crypto.mock.js", "<rootDir>/test/text-decoder.mock.js"]
 };
@@ -16,6 +16,13 @@ import Loading from "./Loading/Loading";
 import Login from "./Login/Login";
 import ServerSelect from "./ServerSelect/ServerSelect";
 
+// Close code the server uses when authentication is temporarily unavailable, such as while it is
+// rate limited by Discord. The stored session is still valid, so reconnect and try it again
+const CLOSE_TRY_AGAIN_LATER = 4013;
+// Reconnect delays in milliseconds, doubled on each attempt up to the maximum
+const RECONNECT_DELAY = 2000;
+const RECONNECT_DELAY_MAX = 60000;
+
 export default class App extends React.Component {
     constructor(props) {
         super(props);
@@ -31,6 +38,11 @@ export default class App extends React.Component {
 
         // Interval callback handler for sending heartbeat packets to server
         this.heartbeatInterval = null;
+
+        // Timeout callback handler and next delay for reconnecting after authentication was
+        // temporarily unavailable
+        this.reconnectTimeout = null;
+        this.reconnectDelay = RECONNECT_DELAY;
     }
 
     componentDidMount() {
@@ -45,8 +57,10 @@ export default class App extends React.Component {
         // Handler for authentication success
         this.eventDispatcher.setMessageHandler("auth.succeed", m => {
             Session.store({handle: m.session.handle, secret: m.session.secret});
+            this.reconnectDelay = RECONNECT_DELAY;
             this.setState({discordUser: m.user});
-            // Server will close connection if it doesn't receive a packet after 90 seconds
+            // Keeps idle connections open through proxies, the server checks that the client is
+            // still alive with websocket pings
             this.heartbeatInterval = setInterval(
                 () => this.socket.send(new Message.HeartbeatMessage().str()),
                 60000
@@ -59,17 +73,7 @@ export default class App extends React.Component {
         });
 
         // Setup the websocket after we're ready to receive and act on messages
-        try {
-            this.socket = new WebSocket(Config.bot_url);
-            this.socket.onmessage = e => this.eventDispatcher.dispatch(Message.parse(e.data));
-            this.socket.onclose = e => this.onSocketClose();
-            this.socket.onopen = e => this.onSocketOpen();
-            this.setState({connection: this.socket.readyState});
-        }
-        catch (e) {
-            this.onError(e.message);
-            this.setState({connection: WebSocket.CLOSED});
-        }
+        this.connect();
     }
 
     componentWillUnmount() {
@@ -77,12 +81,28 @@ export default class App extends React.Component {
         if (this.socket) {
             this.socket.close();
         }
+        clearTimeout(this.reconnectTimeout);
         this.setState({errors: Array()});
         this.eventDispatcher.clearMessageHandler("auth.fail");
         this.eventDispatcher.clearMessageHandler("auth.succeed");
         this.eventDispatcher.clearMessageHandler("server.kick");
     }
 
+    connect() {
+        try {
+            this.socket = new WebSocket(Config.bot_url, Message.SUBPROTOCOLS);
+            this.socket.binaryType = "arraybuffer";
+            this.socket.onmessage = e => this.eventDispatcher.dispatch(Message.parse(e.data));
+            this.socket.onclose = e => this.onSocketClose(e);
+            this.socket.onopen = e => this.onSocketOpen();
+            this.setState({connection: this.socket.readyState});
+        }
+        catch (e) {
+            this.onError(e.message);
+            this.setState({connection: WebSocket.CLOSED});
+        }
+    }
+
     onError(message) {
         const error = {
             id: RandomString(16),
@@ -107,9 +127,17 @@ export default class App extends React.Component {
         this.setState({connection: WebSocket.OPEN});
     }
 
-    onSocketClose() {
-        this.setState({connection: WebSocket.CLOSED});
+    onSocketClose(e) {
         clearInterval(this.heartbeatInterval);
+        if (e.code == CLOSE_TRY_AGAIN_LATER) {
+            // Randomize the delay so that clients turned away together don't all come back at once
+            const delay = this.reconnectDelay * (0.5 + Math.random());
+            this.reconnectDelay = Math.min(this.reconnectDelay * 2, RECONNECT_DELAY_MAX);
+            this.reconnectTimeout = setTimeout(() => this.connect(), delay);
+            this.setState({connection: WebSocket.CONNECTING});
+            return;
+        }
+        this.setState({connection: WebSocket.CLOSED});
     }
 
     // Big, messy state machine acting as a view router
@@ -18,6 +18,10 @@ export default class LivePlaylist extends React.Component {
             playCurrentTime: 0
         };
 
+        // Version of the server queue that this.state.queue reflects, null until the full queue has
+        // been received
+        this.queueVersion = null;
+
         this.isPlaying = false;
         this.playStartTime = 0;
         this.playUpdateTask = null;
@@ -29,7 +33,37 @@ export default class LivePlaylist extends React.Component {
     componentDidMount() {
         // Once mounted, bind the event dispatchers callback for play queue queries
         this.props.eventDispatcher.setMessageHandler("play.queue.send", m => {
-            this.handleQueueChange(m.queue);
+            this.handleQueueChange(m.queue, m.version);
+        });
+        // After the initial queue is received, the server only sends what changed
+        this.props.eventDispatcher.setMessageHandler("play.queue.insert.send", m => {
+            this.handleQueueDelta(m.version, queue => {
+                queue.splice(m.position, 0, ...m.tracks);
+                return queue;
+            });
+        });
+        this.props.eventDispatcher.setMessageHandler("play.queue.move.send", m => {
+            this.handleQueueDelta(m.version, queue => {
+                const track = queue.find(t => t.id == m.id);
+                if (track === undefined) {
+                    return null;
+                }
+                queue = queue.filter(t => t.id != m.id);
+                queue.splice(m.position, 0, track);
+                return queue;
+            });
+        });
+        this.props.eventDispatcher.setMessageHandler("play.queue.play.send", m => {
+            this.handleQueueDelta(m.version, queue => {
+                if (queue.length == 0 || queue[0].id != m.track.id) {
+                    return null;
+                }
+                queue[0] = m.track;
+                return queue;
+            });
+        });
+        this.props.eventDispatcher.setMessageHandler("play.queue.remove.send", m => {
+            this.handleQueueDelta(m.version, queue => queue.filter(t => t.id != m.id));
         });
         this.props.eventDispatcher.setMessageHandler("play.status.send", m => {
             switch (m.status) {
@@ -43,25 +77,53 @@ export default class LivePlaylist extends React.Component {
                     throw new Error("play.status.send enum had unexpected value");
             }
         });
-        // Request the initial queue state
-        this.props.socket.send(new Message.PlayQueueGetMessage().str());
-        this.props.socket.send(new Message.PlayStatusGetMessage().str());
+        // The initial queue state is sent by the server after joining, see ServerStateSendMessage
     }
 
     componentWillUnmount() {
         this.props.eventDispatcher.clearMessageHandler("play.queue.send");
+        this.props.eventDispatcher.clearMessageHandler("play.queue.insert.send");
+        this.props.eventDispatcher.clearMessageHandler("play.queue.move.send");
+        this.props.eventDispatcher.clearMessageHandler("play.queue.play.send");
+        this.props.eventDispatcher.clearMessageHandler("play.queue.remove.send");
         this.props.eventDispatcher.clearMessageHandler("play.status.send");
 
         this.setState({queue: Array()});
+        this.queueVersion = null;
 
         this.pausePlayProgress();
     }
 
-    handleQueueChange(newQueue) {
+    handleQueueChange(newQueue, version) {
+        this.queueVersion = version;
         this.setState({queue: newQueue});
         this.resetPlayProgress();
     }
 
+    handleQueueDelta(version, applyChange) {
+        // Ignore changes that arrive before the full queue, or that it already contains
+        if (this.queueVersion == null || version <= this.queueVersion) {
+            return;
+        }
+        // Every change increments the version by one, a gap means a change was missed
+        const queue = version == this.queueVersion + 1 ?
+            applyChange([...this.state.queue]) :
+            null;
+        if (queue == null) {
+            this.queueVersion = null;
+            this.props.socket.send(new Message.PlayQueueGetMessage().str());
+            return;
+        }
+        this.queueVersion = version;
+        // Only the first track shows play progress, which restarts whenever it changes
+        const headChanged = queue.length == 0 || this.state.queue.length == 0 ||
+            queue[0] !== this.state.queue[0];
+        this.setState({queue: queue});
+        if (headChanged) {
+            this.resetPlayProgress();
+        }
+    }
+
     handleSortStart() {
         this.skipPlayUpdateTask = true;
     }
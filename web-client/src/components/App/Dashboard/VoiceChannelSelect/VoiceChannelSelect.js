@@ -30,7 +30,7 @@ export default class VoiceChannelSelect extends React.Component {
                 this.setState({activeChannelId: null});
             }
         });
-        this.getChannelList();
+        // The initial channel list is sent by the server after joining, see ServerStateSendMessage
     }
 
     componentWillUnmount() {
@@ -46,11 +46,6 @@ export default class VoiceChannelSelect extends React.Component {
         this.props.socket.send(new Message.ChannelLeaveMessage().str());
     }
 
-    getChannelList() {
-        this.props.socket.send(new Message.ChannelListGetMessage().str());
-        this.props.socket.send(new Message.ChannelActiveGetMessage().str());
-    }
-
     toggleCategoryHidden(id) {
         let categories = new Set(this.state.hiddenCategoryIds);
         if (categories.has(id)) {
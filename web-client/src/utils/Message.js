@@ -2,6 +2,12 @@
 // Utility classes for parsing and building network packets
 // For detailed breakdown on protocol uses, see /bot/uita/message.py
 
+import * as MessagePack from "utils/MessagePack";
+
+// Websocket subprotocols the client accepts, the bot sends MessagePack encoded binary frames when
+// one is negotiated and JSON encoded text frames otherwise
+export const SUBPROTOCOLS = ["uita.msgpack"];
+
 // Abstract base class for network messages
 export class AbstractMessage {
     static get header() {
@@ -159,6 +165,19 @@ export class PlayQueueGetMessage extends AbstractMessage {
     }
 }
 
+export class PlayQueueInsertSendMessage extends AbstractMessage {
+    static get header() {
+        return "play.queue.insert.send";
+    }
+
+    constructor(version, position, tracks) {
+        super();
+        this.version = version;
+        this.position = position;
+        this.tracks = tracks;
+    }
+}
+
 export class PlayQueueMoveMessage extends AbstractMessage {
     static get header() {
         return "play.queue.move";
@@ -171,6 +190,31 @@ export class PlayQueueMoveMessage extends AbstractMessage {
     }
 }
 
+export class PlayQueueMoveSendMessage extends AbstractMessage {
+    static get header() {
+        return "play.queue.move.send";
+    }
+
+    constructor(version, id, position) {
+        super();
+        this.version = version;
+        this.id = id;
+        this.position = position;
+    }
+}
+
+export class PlayQueuePlaySendMessage extends AbstractMessage {
+    static get header() {
+        return "play.queue.play.send";
+    }
+
+    constructor(version, track) {
+        super();
+        this.version = version;
+        this.track = track;
+    }
+}
+
 export class PlayQueueRemoveMessage extends AbstractMessage {
     static get header() {
         return "play.queue.remove";
@@ -182,14 +226,27 @@ export class PlayQueueRemoveMessage extends AbstractMessage {
     }
 }
 
+export class PlayQueueRemoveSendMessage extends AbstractMessage {
+    static get header() {
+        return "play.queue.remove.send";
+    }
+
+    constructor(version, id) {
+        super();
+        this.version = version;
+        this.id = id;
+    }
+}
+
 export class PlayQueueSendMessage extends AbstractMessage {
     static get header() {
         return "play.queue.send";
     }
 
-    constructor(queue) {
+    constructor(queue, version) {
         super();
         this.queue = queue;
+        this.version = version;
     }
 }
 
@@ -264,6 +321,32 @@ export class ServerListSendMessage extends AbstractMessage {
     }
 }
 
+// Sent after joining a server, bundles the state messages that would otherwise be requested
+export class ServerStateSendMessage extends AbstractMessage {
+    static get header() {
+        return "server.state.send";
+    }
+
+    constructor(channels, channel, queue, version, status) {
+        super();
+        this.channels = channels;
+        this.channel = channel;
+        this.queue = queue;
+        this.version = version;
+        this.status = status;
+    }
+
+    // Splits the bundle into the individual state messages it replaces
+    messages() {
+        return [
+            new ChannelListSendMessage(this.channels),
+            new ChannelActiveSendMessage(this.channel),
+            new PlayQueueSendMessage(this.queue, this.version),
+            new PlayStatusSendMessage(this.status)
+        ];
+    }
+}
+
 // Hash map linking message headers to class constructors, along with expected input values
 const VALID_MESSAGES = {
     "auth.code": [AuthCodeMessage, ["code"]],
@@ -283,16 +366,23 @@ const VALID_MESSAGES = {
     "file.upload.complete": [FileUploadCompleteMessage, []],
     "heartbeat": [HeartbeatMessage, []],
     "play.queue.get": [PlayQueueGetMessage, []],
+    "play.queue.insert.send": [PlayQueueInsertSendMessage, ["version", "position", "tracks"]],
     "play.queue.move": [PlayQueueMoveMessage, ["id", "position"]],
+    "play.queue.move.send": [PlayQueueMoveSendMessage, ["version", "id", "position"]],
+    "play.queue.play.send": [PlayQueuePlaySendMessage, ["version", "track"]],
     "play.queue.remove": [PlayQueueRemoveMessage, ["id"]],
-    "play.queue.send": [PlayQueueSendMessage, ["queue"]],
+    "play.queue.remove.send": [PlayQueueRemoveSendMessage, ["version", "id"]],
+    "play.queue.send": [PlayQueueSendMessage, ["queue", "version"]],
     "play.status.get": [PlayStatusGetMessage, []],
     "play.status.send": [PlayStatusSendMessage, ["status"]],
     "play.url": [PlayURLMessage, ["url"]],
     "server.kick": [ServerKickMessage, []],
     "server.join": [ServerJoinMessage, ["server_id"]],
     "server.list.get": [ServerListGetMessage, []],
-    "server.list.send": [ServerListSendMessage, ["servers"]]
+    "server.list.send": [ServerListSendMessage, ["servers"]],
+    "server.state.send": [
+        ServerStateSendMessage, ["channels", "channel", "queue", "version", "status"]
+    ]
 };
 
 // Translates input messages into client callbacks
@@ -320,12 +410,19 @@ export class EventDispatcher {
         if (header in this.handlers) {
             this.handlers[header](message);
         }
+        // Bundled state is handled by the same callbacks as each of its parts
+        if (message instanceof ServerStateSendMessage) {
+            for (const part of message.messages()) {
+                this.dispatch(part);
+            }
+        }
     }
 }
 
 // Turns raw network data into Message classes
 export function parse(message) {
-    let obj = JSON.parse(message);
+    // Binary frames are MessagePack encoded, text frames are JSON encoded
+    let obj = typeof message === "string" ? JSON.parse(message) : MessagePack.decode(message);
     let args = Array();
     // Verify that the expected arguments match with what is in the message
     for (let arg of VALID_MESSAGES[obj.header][1]) {
@@ -0,0 +1,117 @@
+// --- MessagePack.js ----------------------------------------------------------
+// Decodes MessagePack data sent by the bot over the uita.msgpack websocket subprotocol
+// Only covers the types the bot sends, extension types are not supported
+
+export function decode(buffer) {
+    const bytes = buffer instanceof Uint8Array ? buffer : new Uint8Array(buffer);
+    const view = new DataView(bytes.buffer, bytes.byteOffset, bytes.byteLength);
+    const textDecoder = new TextDecoder("utf-8");
+    let offset = 0;
+
+    // Moves past a value of the given size, returning where it started
+    const skip = size => {
+        const start = offset;
+        offset += size;
+        if (offset > bytes.length) {
+            throw new TypeError("MessagePack data ended unexpectedly");
+        }
+        return start;
+    };
+    const uint = size => {
+        switch (size) {
+            case 1: return view.getUint8(skip(1));
+            case 2: return view.getUint16(skip(2));
+            case 4: return view.getUint32(skip(4));
+            default: {
+                const start = skip(8);
+                return view.getUint32(start) * 2 ** 32 + view.getUint32(start + 4);
+            }
+        }
+    };
+    const int = size => {
+        switch (size) {
+            case 1: return view.getInt8(skip(1));
+            case 2: return view.getInt16(skip(2));
+            case 4: return view.getInt32(skip(4));
+            default: {
+                const start = skip(8);
+                return view.getInt32(start) * 2 ** 32 + view.getUint32(start + 4);
+            }
+        }
+    };
+    const str = length => {
+        const start = skip(length);
+        return textDecoder.decode(bytes.subarray(start, start + length));
+    };
+    const bin = length => {
+        const start = skip(length);
+        return bytes.slice(start, start + length);
+    };
+    const array = length => {
+        const result = new Array(length);
+        for (let i = 0; i < length; i++) {
+            result[i] = value();
+        }
+        return result;
+    };
+    const map = length => {
+        const result = {};
+        for (let i = 0; i < length; i++) {
+            const key = value();
+            result[key] = value();
+        }
+        return result;
+    };
+    const value = () => {
+        const type = uint(1);
+        // Types that store their value or length in the type byte itself
+        if (type <= 0x7f) {
+            return type;
+        }
+        if (type <= 0x8f) {
+            return map(type & 0x0f);
+        }
+        if (type <= 0x9f) {
+            return array(type & 0x0f);
+        }
+        if (type <= 0xbf) {
+            return str(type & 0x1f);
+        }
+        if (type >= 0xe0) {
+            return type - 0x100;
+        }
+        switch (type) {
+            case 0xc0: return null;
+            case 0xc2: return false;
+            case 0xc3: return true;
+            case 0xc4: return bin(uint(1));
+            case 0xc5: return bin(uint(2));
+            case 0xc6: return bin(uint(4));
+            case 0xca: return view.getFloat32(skip(4));
+            case 0xcb: return view.getFloat64(skip(8));
+            case 0xcc: return uint(1);
+            case 0xcd: return uint(2);
+            case 0xce: return uint(4);
+            case 0xcf: return uint(8);
+            case 0xd0: return int(1);
+            case 0xd1: return int(2);
+            case 0xd2: return int(4);
+            case 0xd3: return int(8);
+            case 0xd9: return str(uint(1));
+            case 0xda: return str(uint(2));
+            case 0xdb: return str(uint(4));
+            case 0xdc: return array(uint(2));
+            case 0xdd: return array(uint(4));
+            case 0xde: return map(uint(2));
+            case 0xdf: return map(uint(4));
+            default:
+                throw new TypeError(`Unsupported MessagePack type 0x${type.toString(16)}`);
+        }
+    };
+
+    const result = value();
+    if (offset != bytes.length) {
+        throw new TypeError("MessagePack data has trailing bytes");
+    }
+    return result;
+}
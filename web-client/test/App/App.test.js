@@ -40,10 +40,31 @@ test("shows initial attempted connection", () => {
 test("shows failed connection", () => {
     const {container} = render(<App/>);
 
-    MockWebSocket.instance.onclose();
+    MockWebSocket.instance.onclose({code: 1006});
     expect(container.textContent).toMatch(/connection error/i);
 });
 
+test("reconnects with the stored session when authentication is unavailable", () => {
+    jest.useFakeTimers();
+    const {container} = render(<App/>);
+    const socket = MockWebSocket.instance;
+    Session.store(session);
+
+    socket.readyState = WebSocket.OPEN;
+    socket.onopen();
+    expect(container.textContent).toMatch(/authenticating/i);
+
+    // Server turned the session away for now, without failing it
+    socket.onclose({code: 4013});
+    expect(container.textContent).toMatch(/connecting/i);
+    expect(container.textContent).not.toMatch(/login/i);
+
+    jest.runOnlyPendingTimers();
+    expect(MockWebSocket.instance).not.toBe(socket);
+    authenticate(MockWebSocket.instance);
+    expect(container.textContent).toMatch(/future server/i);
+});
+
 test("shows login dialog without a stored session", () => {
     const {container} = render(<App/>);
 
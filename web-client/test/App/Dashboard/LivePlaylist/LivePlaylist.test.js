@@ -33,15 +33,18 @@ afterEach(() => {
     socket = null;
 });
 
-test("requests play queue and status", () => {
-    render(<LivePlaylist eventDispatcher={eventDispatcher} socket={socket}/>);
-    expect(socket.send).toBeCalledWith(new Message.PlayQueueGetMessage().str());
-    expect(socket.send).toBeCalledWith(new Message.PlayStatusGetMessage().str());
+test("receives play queue from server state", () => {
+    const {container} = render(<LivePlaylist eventDispatcher={eventDispatcher} socket={socket}/>);
+    expect(socket.send).not.toBeCalled();
+    eventDispatcher.dispatch(new Message.ServerStateSendMessage(
+        [], null, [makeTrack("1")], 0, Message.PlayStatusSendMessage.PAUSED
+    ));
+    expect(container.querySelectorAll(".LivePlaylist-Track").length).toBe(1);
 });
 
 test("has 2 track list items", () => {
     const {container} = render(<LivePlaylist eventDispatcher={eventDispatcher} socket={socket}/>);
-    eventDispatcher.dispatch(new Message.PlayQueueSendMessage([makeTrack("1"), makeTrack("2")]));
+    eventDispatcher.dispatch(new Message.PlayQueueSendMessage([makeTrack("1"), makeTrack("2")], 0));
     const items = container.querySelectorAll(".LivePlaylist-Track");
     expect(items.length).toBe(2);
 });
@@ -49,7 +52,7 @@ test("has 2 track list items", () => {
 test("displays track metadata", () => {
     const {container} = render(<LivePlaylist eventDispatcher={eventDispatcher} socket={socket}/>);
     const track = makeTrack("1");
-    eventDispatcher.dispatch(new Message.PlayQueueSendMessage([track]));
+    eventDispatcher.dispatch(new Message.PlayQueueSendMessage([track], 0));
     const trackNode = container.querySelector(".LivePlaylist-Track");
 
     expect(track.live).toBe(true);
@@ -62,7 +65,7 @@ test("displays track metadata", () => {
 test("remove track button", () => {
     const {container} = render(<LivePlaylist eventDispatcher={eventDispatcher} socket={socket}/>);
     const tracks = [makeTrack("1"), makeTrack("2")];
-    eventDispatcher.dispatch(new Message.PlayQueueSendMessage(tracks));
+    eventDispatcher.dispatch(new Message.PlayQueueSendMessage(tracks, 0));
     const items = container.querySelectorAll(".LivePlaylist-Track");
 
     fireEvent.click(items[1].querySelector("button"));
@@ -70,3 +73,34 @@ test("remove track button", () => {
         new Message.PlayQueueRemoveMessage(tracks[1].id).str()
     );
 });
+
+test("applies queue changes", () => {
+    const {container} = render(<LivePlaylist eventDispatcher={eventDispatcher} socket={socket}/>);
+    const titles = () => Array.from(container.querySelectorAll(".TrackTitle"))
+        .map(node => node.textContent);
+    // Changes are ignored until the full queue is received
+    eventDispatcher.dispatch(new Message.PlayQueueInsertSendMessage(1, 0, [makeTrack("0")]));
+    eventDispatcher.dispatch(new Message.PlayQueueSendMessage([makeTrack("1")], 1));
+    expect(titles()).toEqual(["Track Title 1"]);
+
+    eventDispatcher.dispatch(
+        new Message.PlayQueueInsertSendMessage(2, 1, [makeTrack("2"), makeTrack("3")])
+    );
+    expect(titles()).toEqual(["Track Title 1", "Track Title 2", "Track Title 3"]);
+    eventDispatcher.dispatch(new Message.PlayQueueMoveSendMessage(3, "3", 0));
+    expect(titles()).toEqual(["Track Title 3", "Track Title 1", "Track Title 2"]);
+    eventDispatcher.dispatch(new Message.PlayQueueRemoveSendMessage(4, "1"));
+    expect(titles()).toEqual(["Track Title 3", "Track Title 2"]);
+    // Stale changes are ignored
+    eventDispatcher.dispatch(new Message.PlayQueueRemoveSendMessage(4, "2"));
+    expect(titles()).toEqual(["Track Title 3", "Track Title 2"]);
+});
+
+test("requests play queue after missing a change", () => {
+    render(<LivePlaylist eventDispatcher={eventDispatcher} socket={socket}/>);
+    eventDispatcher.dispatch(new Message.PlayQueueSendMessage([makeTrack("1")], 1));
+    socket.send.mockClear();
+
+    eventDispatcher.dispatch(new Message.PlayQueueRemoveSendMessage(3, "1"));
+    expect(socket.send).toHaveBeenLastCalledWith(new Message.PlayQueueGetMessage().str());
+});
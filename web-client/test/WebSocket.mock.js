@@ -13,7 +13,7 @@ export default class MockWebSocket extends WebSocket {
 
         this.send = jest.fn();
         this.close = jest.fn().mockImplementation(() => {
-            this.onclose();
+            this.onclose({code: 1000});
             this.onclose = () => {};
         });
         this._readyState = MockWebSocket.CONNECTING;
@@ -0,0 +1,4 @@
+// Reminder in case jsdom adds TextDecoder support eventually
+expect(window.TextDecoder).not.toBeDefined();
+// Node ships the same API that browsers do
+window.TextDecoder = require("util").TextDecoder;
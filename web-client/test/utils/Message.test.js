@@ -44,3 +44,30 @@ test("parse throws on invalid object parameters", () => {
     const missingParams = () => Message.parse(`{"header":"server.join"}`);
     expect(missingParams).toThrow(TypeError);
 });
+
+test("event dispatcher splits server state into its parts", () => {
+    const dispatcher = new Message.EventDispatcher();
+    const channelCallback = jest.fn();
+    const queueCallback = jest.fn();
+
+    dispatcher.setMessageHandler("channel.list.send", channelCallback);
+    dispatcher.setMessageHandler("play.queue.send", queueCallback);
+    dispatcher.dispatch(Message.parse(
+        `{"header":"server.state.send","channels":[],"channel":null,"queue":[],"version":3,` +
+        `"status":2}`
+    ));
+    expect(channelCallback).toHaveBeenCalledWith(new Message.ChannelListSendMessage([]));
+    expect(queueCallback).toHaveBeenCalledWith(new Message.PlayQueueSendMessage([], 3));
+});
+
+test("parse decodes MessagePack binary frames", () => {
+    // {"header": "server.join", "server_id": "1a1a1a1a1a"} as encoded by the bot
+    const data = new Uint8Array([
+        0x82, 0xa6, 0x68, 0x65, 0x61, 0x64, 0x65, 0x72, 0xab, 0x73, 0x65, 0x72, 0x76, 0x65, 0x72,
+        0x2e, 0x6a, 0x6f, 0x69, 0x6e, 0xa9, 0x73, 0x65, 0x72, 0x76, 0x65, 0x72, 0x5f, 0x69, 0x64,
+        0xaa, 0x31, 0x61, 0x31, 0x61, 0x31, 0x61, 0x31, 0x61, 0x31, 0x61
+    ]);
+    const message = Message.parse(data.buffer);
+    expect(message instanceof Message.ServerJoinMessage).toBe(true);
+    expect(message.server_id).toBe(mockServerId);
+});